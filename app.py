@@ -2,7 +2,7 @@
 Todo Application - Main Entry Point
 A full-stack Todo application for workshop contributors
 """
-from flask import Flask, send_from_directory
+from flask import Flask, Response, send_from_directory
 from flask_cors import CORS
 from flask_mail import Mail
 from dotenv import load_dotenv
@@ -19,6 +19,18 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-pro
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///todo.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Connection pool settings, and WAL/busy-timeout pragmas for SQLite
+from backend.engine import engine_options, register_sqlite_pragmas
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+register_sqlite_pragmas()
+
+# Optional read replicas for GET requests, e.g.
+# DATABASE_REPLICA_URLS=sqlite:///replica1.db,sqlite:///replica2.db
+from backend.replicas import register_replica_routing, replica_binds
+app.config['SQLALCHEMY_BINDS'] = replica_binds(
+    os.getenv('DATABASE_REPLICA_URLS', ''), lambda url: engine_options(url, read_only=True)
+)
+
 # Email configuration
 app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
 app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
@@ -31,6 +43,7 @@ app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', '')
 # Initialize extensions
 from backend.database import db
 db.init_app(app)
+register_replica_routing(app)
 
 CORS(app)  # Enable CORS for frontend
 mail = Mail(app)
@@ -43,9 +56,52 @@ app.register_blueprint(todo_bp, url_prefix='/api/todos')
 app.register_blueprint(notification_bp, url_prefix='/api/notifications')
 app.register_blueprint(user_bp, url_prefix='/api/users')
 
-# Create database tables
+# Record request, SQL and email metrics for /metrics
+from backend.metrics import metrics, register_metrics
+register_metrics(app)
+
+# Per-request SQL profiling, N+1 warnings and the slow-query log
+from backend.profiler import register_profiler
+register_profiler(app)
+
+# Register CLI commands
+from backend.cli import register_commands
+register_commands(app)
+
+# Create database tables and bring existing ones up to date
+from backend.migrations import run_migrations
+from backend.services.etag_service import ETagService
+from backend.services.search_service import SearchService
+from backend.services.stats_service import StatsService
+from backend.services.unread_service import UnreadService
+StatsService.register_listeners()
+ETagService.register_listeners()
+UnreadService.register_listeners()
 with app.app_context():
-    db.create_all()
+    # Only the primary; replicas get the schema through replication
+    db.create_all(bind_key=None)
+    run_migrations()
+    SearchService.setup()
+    StatsService.setup()
+    UnreadService.setup()
+
+# Optionally deliver queued emails from a thread in this process instead of
+# running 'flask outbox-worker' separately
+if os.getenv('OUTBOX_WORKER_IN_PROCESS', 'False').lower() == 'true':
+    from backend.services.outbox_worker import OutboxWorker
+    OutboxWorker(app, workers=int(os.getenv('OUTBOX_WORKERS', 2))).start()
+
+# Fire due-soon reminders from a scheduler thread in this process, kept up to
+# date by the todo routes, instead of running 'flask reminder-scheduler'
+if os.getenv('REMINDER_SCHEDULER_IN_PROCESS', 'False').lower() == 'true':
+    from backend.services.reminder_scheduler import reminder_scheduler
+    reminder_scheduler.start(app)
+
+# Apply the notification retention policy from a thread in this process
+# instead of running 'flask prune-notifications --interval' separately
+if os.getenv('NOTIFICATION_PRUNE_IN_PROCESS', 'False').lower() == 'true':
+    from backend.services.retention_service import RetentionService
+    RetentionService.start(app, interval=int(os.getenv('NOTIFICATION_PRUNE_INTERVAL', 3600)))
 
 @app.route('/')
 def index():
@@ -62,6 +118,14 @@ def health():
     """Health check endpoint"""
     return {'status': 'healthy', 'message': 'Todo API is running'}
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    from backend.services.outbox_worker import OutboxWorker
+    outbox = [((('status', status),), count) for status, count in OutboxWorker.depth_by_status().items()]
+    gauges = [('email_outbox_entries', 'Email outbox entries awaiting delivery by status', outbox)]
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -0,0 +1,9 @@
+"""
+ASGI entry point for serving many concurrent connections
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+from app import app
+from backend.asgi import AsgiApp
+
+application = AsgiApp(app)
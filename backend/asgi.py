@@ -0,0 +1,168 @@
+"""
+ASGI serving mode: notification streams on the event loop, every other
+request on a bounded thread pool
+"""
+from a2wsgi import WSGIMiddleware
+from backend.routes.notification_routes import STREAM_KEEPALIVE_SECONDS, _live_event, _sse_event
+from backend.services.notification_broker import AsyncSubscription, notification_broker
+from backend.services.notification_service import NotificationService
+from urllib.parse import parse_qs
+import asyncio
+import json
+import os
+
+# Threads running the Flask routes and stream replays, per process
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 16))
+STREAM_PATH = '/api/notifications/stream'
+
+
+def _int(value):
+    """Parse an optional integer header or query value, None if invalid"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def _wait_for_disconnect(receive):
+    """Return once the client has gone away"""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+class AsgiApp:
+    """
+    ASGI application wrapping the Flask app
+
+    Notification streams are served by coroutines, so an idle stream
+    costs a queue instead of a thread and one process can hold thousands
+    of them. All other requests run the unchanged Flask app on a pool of
+    at most `threads` threads.
+    """
+
+    def __init__(self, flask_app, threads=ASGI_THREADS):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=threads)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] == STREAM_PATH:
+            await self.stream_notifications(scope, receive, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    def _missed_notifications(self, user_id, last_id):
+        """Load the notifications a stream missed (runs in the pool)"""
+        with self.flask_app.app_context():
+            return NotificationService.get_notifications_after(user_id, last_id)
+
+    def _latest_notification_id(self, user_id):
+        """Load the id a new stream starts after (runs in the pool)"""
+        with self.flask_app.app_context():
+            return NotificationService.latest_notification_id(user_id)
+
+    async def stream_notifications(self, scope, receive, send):
+        """
+        Stream new browser notifications for a user as Server-Sent Events
+
+        Same protocol as the Flask route: clients reconnecting with a
+        Last-Event-ID header (or last_event_id query parameter) first
+        receive the notifications they missed, and notifications created
+        by other processes are picked up from the database every
+        STREAM_KEEPALIVE_SECONDS.
+        """
+        params = parse_qs(scope['query_string'].decode('latin-1'))
+        headers = dict(scope['headers'])
+        user_id = _int(params.get('user_id', [None])[0])
+        if not user_id:
+            await self._send_json(send, 400, {'error': 'user_id is required'})
+            return
+        last_id = _int(headers.get(b'last-event-id')) or _int(params.get('last_event_id', [None])[0]) or 0
+
+        loop = asyncio.get_running_loop()
+        # Subscribe before replaying so nothing published in between is lost
+        subscription = notification_broker.subscribe(user_id, AsyncSubscription(loop))
+        disconnected = event = None
+        try:
+            missed = []
+            try:
+                if last_id:
+                    missed = await loop.run_in_executor(
+                        self.wsgi.executor, self._missed_notifications, user_id, last_id
+                    )
+                else:
+                    last_id = await loop.run_in_executor(
+                        self.wsgi.executor, self._latest_notification_id, user_id
+                    )
+            except Exception as e:
+                await self._send_json(send, 500, {'error': str(e)})
+                return
+
+            response_headers = [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ]
+            if b'origin' in headers:
+                response_headers.append((b'access-control-allow-origin', b'*'))
+            await send({'type': 'http.response.start', 'status': 200, 'headers': response_headers})
+            await self._send_text(send, 'retry: 5000\n\n')
+            replayed = {}
+            for notification in missed:
+                replayed[notification['id']] = notification
+                last_id = notification['id']
+                await self._send_text(send, _sse_event(notification))
+
+            disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+            next_poll = loop.time() + STREAM_KEEPALIVE_SECONDS
+            while True:
+                if event is None:
+                    event = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait(
+                    {event, disconnected}, timeout=max(0, next_poll - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if disconnected in done:
+                    return
+                if not done:
+                    next_poll = loop.time() + STREAM_KEEPALIVE_SECONDS
+                    polled = await loop.run_in_executor(
+                        self.wsgi.executor, self._missed_notifications, user_id, last_id
+                    )
+                    # Only the latest poll can still race with the broker
+                    replayed = {notification['id']: notification for notification in polled}
+                    for notification in polled:
+                        last_id = notification['id']
+                        await self._send_text(send, _sse_event(notification))
+                    if not polled:
+                        await self._send_text(send, ': keepalive\n\n')
+                    continue
+                notification, event = event.result(), None
+                if notification is None:
+                    # Fell too far behind; the client will reconnect and replay
+                    await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+                    return
+                text = _live_event(notification, replayed, last_id)
+                if text is not None:
+                    last_id = max(last_id, notification['id'])
+                    await self._send_text(send, text)
+        finally:
+            notification_broker.unsubscribe(user_id, subscription)
+            for task in (event, disconnected):
+                if task is not None:
+                    task.cancel()
+
+    @staticmethod
+    async def _send_text(send, text):
+        """Send one chunk of a streaming response"""
+        await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+    @staticmethod
+    async def _send_json(send, status, payload):
+        """Send a complete JSON response"""
+        body = json.dumps(payload).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+        })
+        await send({'type': 'http.response.body', 'body': body})
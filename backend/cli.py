@@ -0,0 +1,120 @@
+"""
+Flask CLI commands for maintenance tasks
+"""
+import click
+import time
+from datetime import datetime, timedelta
+from backend.migrations import pending_migrations, run_migrations
+from backend.services.outbox_worker import OutboxWorker
+from backend.services.reminder_scheduler import reminder_scheduler
+from backend.services.retention_service import RetentionService
+from backend.services.search_service import SearchService
+from backend.services.stats_service import StatsService
+from backend.services.unread_service import UnreadService
+
+
+def register_commands(app):
+    """Register maintenance commands on the Flask app"""
+
+    @app.cli.command('migrate')
+    @click.option('--status', is_flag=True, help='List pending migrations without applying them')
+    def migrate(status):
+        """Apply pending schema migrations"""
+        if status:
+            pending = pending_migrations()
+            for version, description, _ in pending:
+                click.echo(f'{version:04d} {description}')
+            click.echo(f'{len(pending)} pending migration(s)')
+            return
+        applied = run_migrations()
+        for version, description in applied:
+            click.echo(f'Applied {version:04d} {description}')
+        click.echo(f'{len(applied)} migration(s) applied')
+
+    @app.cli.command('outbox-worker')
+    @click.option('--workers', default=4, show_default=True, help='Delivery threads')
+    @click.option('--batch-size', default=50, show_default=True, help='Entries claimed per poll')
+    @click.option('--interval', default=5.0, show_default=True, help='Seconds to wait when idle')
+    @click.option('--once', is_flag=True, help='Deliver one batch and exit')
+    def outbox_worker(workers, batch_size, interval, once):
+        """Deliver queued emails from the outbox"""
+        worker = OutboxWorker(app, workers=workers, batch_size=batch_size, poll_interval=interval)
+        if once:
+            delivered = worker.drain_once()
+            click.echo(f'Delivered {delivered} email(s)')
+            return
+        click.echo('Outbox worker running, press Ctrl+C to stop')
+        try:
+            worker.run()
+        except KeyboardInterrupt:
+            worker.stop()
+
+    @app.cli.command('prune-notifications')
+    @click.option('--retention-days', type=int, default=None,
+                  help='Prune sent notifications older than this (default NOTIFICATION_RETENTION_DAYS)')
+    @click.option('--unsent-retention-days', type=int, default=None,
+                  help='Prune unsent notifications older than this (default NOTIFICATION_UNSENT_RETENTION_DAYS)')
+    @click.option('--max-per-user', type=int, default=None,
+                  help='Sent notifications kept per user (default NOTIFICATION_MAX_PER_USER)')
+    @click.option('--archive/--delete', default=None,
+                  help='Move pruned rows to notifications_archive or delete them (default NOTIFICATION_ARCHIVE)')
+    @click.option('--batch-size', type=int, default=None, help='Rows removed per transaction')
+    @click.option('--pause', default=0.0, show_default=True, help='Seconds to sleep between chunks')
+    @click.option('--interval', default=0.0, show_default=True,
+                  help='Keep running and prune every this many seconds (0 runs once)')
+    def prune_notifications(retention_days, unsent_retention_days, max_per_user, archive, batch_size,
+                            pause, interval):
+        """Apply the notification retention policy"""
+        options = {
+            'retention_days': retention_days,
+            'unsent_retention_days': unsent_retention_days,
+            'max_per_user': max_per_user,
+            'archive': archive,
+            'batch_size': batch_size,
+        }
+        options = {name: value for name, value in options.items() if value is not None}
+        try:
+            while True:
+                result = RetentionService.prune(pause=pause, **options)
+                action = 'archived' if result['archived'] else 'deleted'
+                click.echo(f"Pruned notifications: {result['expired']} expired, "
+                           f"{result['over_cap']} over the per-user cap, "
+                           f"{result['expired_unsent']} unsent and expired ({action})")
+                if not interval:
+                    return
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+    @app.cli.command('rebuild-search')
+    def rebuild_search():
+        """Rebuild the full-text search index for todos"""
+        backend = SearchService.rebuild()
+        click.echo(f'Search index rebuilt ({backend})')
+
+    @app.cli.command('reconcile-stats')
+    @click.option('--user-id', type=int, default=None, help='Only reconcile this user')
+    def reconcile_stats(user_id):
+        """Recompute materialized todo statistics and unread notification counts"""
+        corrected = StatsService.reconcile(user_id)
+        click.echo(f'Reconciled todo stats, {corrected} row(s) corrected')
+        corrected = UnreadService.reconcile(user_id)
+        click.echo(f'Reconciled unread notification counts, {corrected} row(s) corrected')
+
+    @app.cli.command('reminder-scheduler')
+    @click.option('--poll-interval', default=60.0, show_default=True,
+                  help='Seconds between checks for todos changed by other processes')
+    def run_reminder_scheduler(poll_interval):
+        """Fire due-soon reminders as todos enter the reminder window"""
+        scan_started = datetime.utcnow()
+        reminder_scheduler.start(app)
+        click.echo('Reminder scheduler running, press Ctrl+C to stop')
+        try:
+            while True:
+                time.sleep(poll_interval)
+                # Overlap scans slightly; rescheduling an unchanged todo is a no-op
+                since, scan_started = scan_started - timedelta(seconds=poll_interval), datetime.utcnow()
+                with app.app_context():
+                    reminder_scheduler.rescan(since=since)
+        except KeyboardInterrupt:
+            reminder_scheduler.stop()
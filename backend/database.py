@@ -2,6 +2,22 @@
 Database configuration and initialization
 """
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
+from backend.replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
+
+def dialect_insert(conn, table):
+    """
+    INSERT for the connection's database with on_conflict_do_update() and
+    on_conflict_do_nothing(), for upserts that are safe under concurrency
+
+    Raises:
+        NotImplementedError: For databases other than SQLite and PostgreSQL
+    """
+    if conn.dialect.name == 'postgresql':
+        return postgresql.insert(table)
+    if conn.dialect.name == 'sqlite':
+        return sqlite.insert(table)
+    raise NotImplementedError(f'Upserts are not supported on {conn.dialect.name}')
@@ -0,0 +1,89 @@
+"""
+Database engine tuning for SQLite and server databases
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import os
+import sqlite3
+
+# Set to False to keep SQLite's defaults (rollback journal, full fsync)
+SQLITE_TUNING = os.getenv('SQLITE_TUNING', 'True').lower() == 'true'
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+# How long a writer waits for the database lock before 'database is locked'
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+# Negative values are KiB, so -65536 is a 64 MiB page cache per connection
+SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -65536))
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+# Reconnect connections older than this many seconds, before the server drops them
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+
+
+class ReadOnlySQLiteConnection(sqlite3.Connection):
+    """SQLite connection that refuses to write, used for read replicas"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.execute('PRAGMA query_only=ON')
+
+
+def engine_options(database_url, read_only=False):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for a database URL
+
+    SQLite gets a busy timeout on connect (the pragmas are applied by
+    register_sqlite_pragmas()); server databases get a sized, pre-pinged,
+    recycled connection pool.
+
+    Args:
+        database_url: SQLAlchemy database URL
+        read_only: Open connections that reject writes, for read replicas
+    """
+    if database_url.startswith('sqlite'):
+        connect_args = {}
+        if SQLITE_TUNING:
+            connect_args['timeout'] = SQLITE_BUSY_TIMEOUT_MS / 1000
+        if read_only:
+            connect_args['factory'] = ReadOnlySQLiteConnection
+        return {'connect_args': connect_args} if connect_args else {}
+
+    options = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+    if read_only and database_url.startswith('postgresql'):
+        options['connect_args'] = {'options': '-c default_transaction_read_only=on'}
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        # WAL lets readers run alongside the single writer; it is stored in
+        # the database file, so in-memory databases keep their own mode.
+        # Replicas keep the mode their writer chose.
+        if not isinstance(dbapi_connection, ReadOnlySQLiteConnection):
+            cursor.execute(f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}')
+            cursor.execute(f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}')
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+        cursor.execute(f'PRAGMA cache_size={SQLITE_CACHE_SIZE}')
+    finally:
+        cursor.close()
+
+
+def register_sqlite_pragmas():
+    """Apply the SQLite pragmas to every connection opened from now on"""
+    if SQLITE_TUNING and not event.contains(Engine, 'connect', _apply_sqlite_pragmas):
+        event.listen(Engine, 'connect', _apply_sqlite_pragmas)
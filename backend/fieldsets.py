@@ -0,0 +1,82 @@
+"""
+Sparse fieldsets (?fields=) for list endpoints
+"""
+from sqlalchemy.orm import load_only
+from backend.models import Notification, Todo
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+# Field name -> (column to load or None, serializer)
+TODO_FIELDS = {
+    'id': (Todo.id, lambda todo: todo.id),
+    'title': (Todo.title, lambda todo: todo.title),
+    'description': (Todo.description, lambda todo: todo.description),
+    'completed': (Todo.completed, lambda todo: todo.completed),
+    'priority': (Todo.priority, lambda todo: todo.priority),
+    'due_date': (Todo.due_date, lambda todo: _isoformat(todo.due_date)),
+    'created_at': (Todo.created_at, lambda todo: _isoformat(todo.created_at)),
+    'updated_at': (Todo.updated_at, lambda todo: _isoformat(todo.updated_at)),
+    'user_id': (Todo.user_id, lambda todo: todo.user_id),
+    'category': (Todo.category, lambda todo: todo.category),
+    'tags': (None, lambda todo: [tag.name for tag in todo.tags]),
+}
+
+NOTIFICATION_FIELDS = {
+    'id': (Notification.id, lambda n: n.id),
+    'todo_id': (Notification.todo_id, lambda n: n.todo_id),
+    'user_id': (Notification.user_id, lambda n: n.user_id),
+    'message': (Notification.message, lambda n: n.message),
+    'type': (Notification.type, lambda n: n.type),
+    'sent': (Notification.sent, lambda n: n.sent),
+    'sent_at': (Notification.sent_at, lambda n: _isoformat(n.sent_at)),
+    'created_at': (Notification.created_at, lambda n: _isoformat(n.created_at)),
+}
+
+
+def parse_fields(value, field_map):
+    """
+    Parse a comma-separated fields parameter
+
+    Returns:
+        List of field names, or None when every field was requested
+
+    Raises:
+        ValueError: If a field name is unknown
+    """
+    if not value:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in field_map]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def project(query, field_map, fields, always=()):
+    """
+    Load only the columns behind the requested fields
+
+    Args:
+        query: Query to restrict
+        field_map: TODO_FIELDS or NOTIFICATION_FIELDS
+        fields: Requested field names
+        always: Extra columns the caller needs, e.g. for pagination cursors
+    """
+    columns = [field_map[name][0] for name in fields if field_map[name][0] is not None]
+    columns.extend(always)
+    if not columns:
+        return query
+    return query.options(load_only(*columns))
+
+
+def serializer(field_map, fields):
+    """Build a function serializing just the requested fields of a row"""
+    getters = [(name, field_map[name][1]) for name in fields]
+
+    def serialize(obj):
+        return {name: getter(obj) for name, getter in getters}
+
+    return serialize
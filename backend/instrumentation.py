@@ -0,0 +1,44 @@
+"""
+Shared SQL statement timing for the metrics registry and the profiler
+"""
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import time
+
+_observers = []
+
+
+def endpoint():
+    """Endpoint of the current request, or 'background' outside one"""
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    return 'background'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Remember when a statement started on its execution context"""
+    context.statement_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Hand a finished statement and its duration to every observer"""
+    started = getattr(context, 'statement_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    for observer in _observers:
+        observer(statement, elapsed)
+
+
+def observe_statements(observer):
+    """
+    Call observer(statement, elapsed_seconds) after every SQL statement
+
+    The engine hooks are registered once, however many observers there are.
+    """
+    if observer not in _observers:
+        _observers.append(observer)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
@@ -0,0 +1,316 @@
+"""
+Request, SQL and email metrics exposed in the Prometheus text format
+"""
+from flask import g, request
+from backend.instrumentation import endpoint, observe_statements
+from contextlib import contextmanager
+import atexit
+import glob
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshots of exited processes are never folded
+    fcntl = None
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+# Directory shared by all worker processes; each one writes its own
+# snapshot there and /metrics sums them. Unset for a single process.
+METRICS_DIR = os.getenv('METRICS_DIR')
+# Minimum seconds between snapshot writes of one process
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1.0))
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+EMAIL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Running total of every exited process' snapshot in METRICS_DIR
+EXITED_FILE = 'metrics-exited.json'
+
+DEFINITIONS = {
+    'http_requests_total': ('counter', 'HTTP requests by endpoint, method and status', None),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by endpoint and method', REQUEST_BUCKETS),
+    'db_queries_total': ('counter', 'SQL statements executed by endpoint', None),
+    'db_query_duration_seconds': ('histogram', 'SQL statement latency by statement type', QUERY_BUCKETS),
+    'email_sends_total': ('counter', 'Emails handed to the SMTP server by result', None),
+    'email_send_duration_seconds': ('histogram', 'SMTP send latency', EMAIL_BUCKETS),
+}
+
+
+def _format_labels(labels):
+    """Render label pairs as {name="value",...}"""
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _process_alive(pid):
+    """Whether a process with this id exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, but belongs to another user
+    return True
+
+
+def _merge(snapshots):
+    """Sum snapshots into (counters, histograms) keyed by (name, labels)"""
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot['histograms']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            total = histograms.setdefault(key, [0] * len(values))
+            for i, value in enumerate(values):
+                total[i] += value
+    return counters, histograms
+
+
+def _format_value(value):
+    """Prometheus number formatting"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and histograms for one process
+
+    Labels are passed as a tuple of (name, value) pairs. With METRICS_DIR
+    set, the process writes a JSON snapshot of its values there at most
+    every METRICS_FLUSH_INTERVAL seconds and at exit, and render() adds up
+    the snapshots of every process. Snapshot file names carry a random
+    token besides the pid, so a new process that reuses an old pid does
+    not overwrite the old snapshot. render() folds the snapshots of exited
+    processes on this host into EXITED_FILE, so counters stay monotonic
+    without the directory filling up.
+    """
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.host = socket.gethostname()
+        self._reset()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush)
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        """
+        Start empty under a new snapshot name
+
+        Runs in forked children too, whose inherited values are already
+        in the parent's snapshot.
+        """
+        self.pid = os.getpid()
+        self.filename = f'metrics-{self.pid}-{uuid.uuid4().hex[:12]}.json'
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        self._flushed_at = 0
+
+    def inc(self, name, labels=(), amount=1):
+        """Increment a counter"""
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+        self._maybe_flush()
+
+    def observe(self, name, labels, value):
+        """Record one histogram observation"""
+        buckets = DEFINITIONS[name][2]
+        key = (name, tuple(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+        self._maybe_flush()
+
+    def snapshot(self):
+        """JSON-serializable copy of this process' values"""
+        with self._lock:
+            return {
+                'host': self.host,
+                'pid': self.pid,
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), list(values)] for (name, labels), values in self._histograms.items()],
+            }
+
+    def _maybe_flush(self):
+        """Write a snapshot if the last one is older than flush_interval"""
+        if self.directory and time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Atomically write this process' snapshot to the metrics directory"""
+        if not self.directory:
+            return
+        self._flushed_at = time.monotonic()
+        self._write(self.filename, self.snapshot())
+
+    def _write(self, filename, snapshot):
+        """Atomically replace a file in the metrics directory"""
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(path, os.path.join(self.directory, filename))
+
+    def _read_snapshots(self):
+        """Snapshots in the metrics directory by file name"""
+        snapshots = {}
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path) as f:
+                    snapshots[os.path.basename(path)] = json.load(f)
+            except (OSError, ValueError):
+                continue  # Replaced or removed while reading
+        return snapshots
+
+    @contextmanager
+    def _directory_lock(self):
+        """Serialize folding across the processes sharing the directory"""
+        with open(os.path.join(self.directory, 'metrics.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _fold_exited(self, snapshots):
+        """
+        Add the snapshots of exited processes on this host to EXITED_FILE
+
+        The folded file names are recorded in EXITED_FILE before the files
+        are removed, so a crash in between cannot count them twice.
+
+        Args:
+            snapshots: Dict from _read_snapshots(), updated in place
+        """
+        exited = snapshots.get(EXITED_FILE, {'counters': [], 'histograms': []})
+        for name in exited.get('folded', ()):
+            if snapshots.pop(name, None) is not None:
+                os.remove(os.path.join(self.directory, name))
+
+        dead = [
+            name for name, snapshot in snapshots.items()
+            if name != EXITED_FILE and snapshot.get('host') == self.host
+            and snapshot.get('pid') != self.pid and not _process_alive(snapshot['pid'])
+        ]
+        if not dead:
+            return
+        counters, histograms = _merge([exited] + [snapshots.pop(name) for name in dead])
+        snapshots[EXITED_FILE] = {
+            'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+            'histograms': [[name, list(labels), values] for (name, labels), values in histograms.items()],
+            'folded': dead,
+        }
+        self._write(EXITED_FILE, snapshots[EXITED_FILE])
+        for name in dead:
+            os.remove(os.path.join(self.directory, name))
+
+    def _collect(self):
+        """Values summed over every process sharing the metrics directory"""
+        if not self.directory:
+            return _merge([self.snapshot()])
+        self.flush()
+        if fcntl is None:
+            return _merge(self._read_snapshots().values())
+        with self._directory_lock():
+            snapshots = self._read_snapshots()
+            self._fold_exited(snapshots)
+        return _merge(snapshots.values())
+
+    def render(self, gauges=()):
+        """
+        Prometheus text exposition of every metric
+
+        Args:
+            gauges: (name, help, [(labels, value), ...]) computed at scrape
+                time, such as queue depths read from the database
+        """
+        counters, histograms = self._collect()
+        lines = []
+        for name, (kind, help_text, buckets) in DEFINITIONS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                # Bucket counts are already cumulative, observe() counts
+                # every bucket a value fits in
+                for bound, count in zip(buckets, values):
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", _format_value(float(bound))),))} {count}')
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {values[-1]}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(float(values[-2]))}')
+                lines.append(f'{name}_count{_format_labels(labels)} {values[-1]}')
+        for name, help_text, samples in gauges:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            for labels, value in samples:
+                lines.append(f'{name}{_format_labels(tuple(labels))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry(METRICS_DIR, METRICS_FLUSH_INTERVAL)
+
+
+def _record_statement(statement, elapsed):
+    """Count a finished statement and record its latency"""
+    statement_type = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+    metrics.inc('db_queries_total', (('endpoint', endpoint()),))
+    metrics.observe('db_query_duration_seconds', (('statement', statement_type),), elapsed)
+
+
+def _start_timer():
+    """Mark the start of a request"""
+    g.metrics_started = time.perf_counter()
+
+
+def _record_request(response):
+    """Count a request and record its latency"""
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        name = endpoint()
+        metrics.inc('http_requests_total', (
+            ('endpoint', name), ('method', request.method), ('status', str(response.status_code))
+        ))
+        metrics.observe('http_request_duration_seconds', (
+            ('endpoint', name), ('method', request.method)
+        ), time.perf_counter() - started)
+    return response
+
+
+def register_metrics(app):
+    """Record request and SQL metrics for this app"""
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    observe_statements(_record_statement)
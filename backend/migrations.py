@@ -0,0 +1,197 @@
+"""
+Versioned schema migrations for existing databases
+
+db.create_all() creates missing tables but never changes tables that
+already exist, so anything added to an existing table (indexes, columns,
+backfills) is registered here and applied once per database.
+"""
+from backend.database import db
+from backend.models import SchemaMigration, Tag, Todo, todo_tags
+from backend.services.tag_service import TagService
+from datetime import datetime
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a function taking a connection as a numbered migration"""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        return func
+    return decorator
+
+
+def _create_index(conn, name, table, columns):
+    """Create an index unless one with this name already exists"""
+    conn.execute(db.text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'))
+
+
+# Pinned rather than read from the models, so that later index changes
+# cannot alter what an already released migration creates
+QUERY_INDEXES = [
+    ('ix_todos_user_created', 'todos', ('user_id', 'created_at', 'id')),
+    ('ix_todos_user_completed_created', 'todos', ('user_id', 'completed', 'created_at')),
+    ('ix_todos_completed_due_date', 'todos', ('completed', 'due_date')),
+    ('ix_todos_updated_at', 'todos', ('updated_at',)),
+    ('ix_notifications_user_created', 'notifications', ('user_id', 'created_at')),
+    ('ix_notifications_user_type_sent_created', 'notifications', ('user_id', 'type', 'sent', 'created_at')),
+    ('ix_email_outbox_status_next_attempt', 'email_outbox', ('status', 'next_attempt_at')),
+    ('ix_email_outbox_user_status', 'email_outbox', ('user_id', 'status')),
+]
+
+
+@migration(1, 'Add composite indexes for todo, notification and outbox queries')
+def add_query_indexes(conn):
+    for name, table, columns in QUERY_INDEXES:
+        _create_index(conn, name, table, columns)
+
+
+@migration(2, 'Backfill todo_tags from the comma-separated todos.tags column')
+def backfill_tags(conn, chunk_size=1000):
+    todos = Todo.__table__
+    tags = Tag.__table__
+    tag_ids = {name: tag_id for tag_id, name in conn.execute(db.select(tags.c.id, tags.c.name))}
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            db.select(todos.c.id, todos.c.tags)
+            .where(todos.c.id > last_id, todos.c.tags.isnot(None), todos.c.tags != '')
+            .order_by(todos.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        links = []
+        for todo_id, value in rows:
+            for name in TagService.parse(value):
+                if name not in tag_ids:
+                    tag_ids[name] = conn.execute(tags.insert().values(name=name)).inserted_primary_key[0]
+                links.append({'todo_id': todo_id, 'tag_id': tag_ids[name]})
+        if links:
+            conn.execute(todo_tags.insert(), links)
+
+
+NOTIFICATIONS_DDL = """
+CREATE TABLE notifications (
+    id INTEGER NOT NULL,
+    todo_id INTEGER,
+    user_id INTEGER NOT NULL,
+    message VARCHAR(500) NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    sent BOOLEAN NOT NULL,
+    sent_at DATETIME,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(todo_id) REFERENCES todos (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+)
+"""
+
+
+@migration(3, 'Allow notifications without a todo')
+def make_notification_todo_optional(conn):
+    columns = {column['name']: column for column in db.inspect(conn).get_columns('notifications')}
+    if columns['todo_id']['nullable']:
+        return
+
+    if conn.dialect.name != 'sqlite':
+        conn.execute(db.text('ALTER TABLE notifications ALTER COLUMN todo_id DROP NOT NULL'))
+        return
+
+    # SQLite cannot alter a column's constraints, so rebuild the table.
+    # The DDL is pinned to the columns this migration knows about.
+    names = 'id, todo_id, user_id, message, type, sent, sent_at, created_at'
+    indexes = [index for index in QUERY_INDEXES if index[1] == 'notifications']
+    for name, _, _ in indexes:
+        conn.execute(db.text(f'DROP INDEX IF EXISTS {name}'))
+    conn.execute(db.text('ALTER TABLE notifications RENAME TO notifications_old'))
+    conn.execute(db.text(NOTIFICATIONS_DDL))
+    conn.execute(db.text(f'INSERT INTO notifications ({names}) SELECT {names} FROM notifications_old'))
+    conn.execute(db.text('DROP TABLE notifications_old'))
+    for name, table, columns in indexes:
+        _create_index(conn, name, table, columns)
+
+
+@migration(4, 'Add index for pruning sent notifications by age')
+def add_notification_retention_index(conn):
+    _create_index(conn, 'ix_notifications_sent_created', 'notifications', ('sent', 'created_at'))
+
+
+NOTIFICATIONS_AUTOINCREMENT_DDL = """
+CREATE TABLE notifications (
+    id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+    todo_id INTEGER,
+    user_id INTEGER NOT NULL,
+    message VARCHAR(500) NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    sent BOOLEAN NOT NULL,
+    sent_at DATETIME,
+    created_at DATETIME NOT NULL,
+    FOREIGN KEY(todo_id) REFERENCES todos (id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+)
+"""
+
+
+@migration(5, 'Never reuse notification ids')
+def make_notification_ids_monotonic(conn):
+    # Last-Event-ID replay and the archive both key on notification ids.
+    # Postgres sequences never hand an id out twice; SQLite does reuse the
+    # largest id after it is deleted unless the table uses AUTOINCREMENT.
+    if conn.dialect.name != 'sqlite':
+        return
+    ddl = conn.execute(db.text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'notifications'"
+    )).scalar()
+    if 'AUTOINCREMENT' in ddl.upper():
+        return
+
+    names = 'id, todo_id, user_id, message, type, sent, sent_at, created_at'
+    indexes = [index for index in QUERY_INDEXES if index[1] == 'notifications']
+    indexes.append(('ix_notifications_sent_created', 'notifications', ('sent', 'created_at')))
+    for name, _, _ in indexes:
+        conn.execute(db.text(f'DROP INDEX IF EXISTS {name}'))
+    conn.execute(db.text('ALTER TABLE notifications RENAME TO notifications_old'))
+    conn.execute(db.text(NOTIFICATIONS_AUTOINCREMENT_DDL))
+    conn.execute(db.text(f'INSERT INTO notifications ({names}) SELECT {names} FROM notifications_old'))
+    conn.execute(db.text('DROP TABLE notifications_old'))
+    for name, table, columns in indexes:
+        _create_index(conn, name, table, columns)
+
+    # Ids already handed out may live on only in the archive
+    highest = conn.execute(db.text('SELECT MAX(id) FROM notifications')).scalar() or 0
+    if db.inspect(conn).has_table('notifications_archive'):
+        archived = conn.execute(db.text('SELECT MAX(id) FROM notifications_archive')).scalar() or 0
+        highest = max(highest, archived)
+    conn.execute(db.text("DELETE FROM sqlite_sequence WHERE name = 'notifications'"))
+    conn.execute(db.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('notifications', :seq)"), {'seq': highest})
+
+
+def pending_migrations():
+    """Migrations not yet recorded in schema_migrations, in order"""
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+    db.session.commit()
+    return [m for m in sorted(MIGRATIONS, key=lambda m: m[0]) if m[0] not in applied]
+
+
+def run_migrations():
+    """
+    Apply pending migrations, each in its own transaction
+
+    Returns:
+        List of (version, description) that were applied
+    """
+    applied = []
+    for version, description, func in pending_migrations():
+        with db.engine.begin() as conn:
+            func(conn)
+            conn.execute(SchemaMigration.__table__.insert().values(
+                version=version,
+                description=description,
+                applied_at=datetime.utcnow()
+            ))
+        applied.append((version, description))
+    return applied
@@ -5,9 +5,26 @@ from datetime import datetime
 from backend.database import db
 
 
+todo_tags = db.Table(
+    'todo_tags',
+    db.Column('todo_id', db.Integer, db.ForeignKey('todos.id'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id'), primary_key=True),
+    # The primary key serves todo -> tags lookups; this one serves tag filters
+    db.Index('ix_todo_tags_tag_todo', 'tag_id', 'todo_id'),
+)
+
+
 class Todo(db.Model):
     """Todo model"""
     __tablename__ = 'todos'
+    __table_args__ = (
+        # List queries filter by user (and often completion) and page by (created_at, id)
+        db.Index('ix_todos_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_todos_user_completed_created', 'user_id', 'completed', 'created_at'),
+        # Reminder scans look for pending todos in a due-date range
+        db.Index('ix_todos_completed_due_date', 'completed', 'due_date'),
+        db.Index('ix_todos_updated_at', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -19,11 +36,15 @@ class Todo(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     category = db.Column(db.String(50), nullable=True)
-    tags = db.Column(db.String(200), nullable=True)  # Comma-separated tags
+    # Comma-separated tags from before todo_tags existed; read only by the backfill migration
+    legacy_tags = db.Column('tags', db.String(200), nullable=True)
     
     # Relationships
     user = db.relationship('User', backref=db.backref('todos', lazy=True))
+    # todo_tags does not record the order tags were given in, so they are sorted by name
+    tags = db.relationship('Tag', secondary=todo_tags, lazy=True, order_by='Tag.name')
     notifications = db.relationship('Notification', backref='todo', lazy=True, cascade='all, delete-orphan')
+    reminders = db.relationship('ReminderLedger', backref='todo', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
         """Convert model to dictionary"""
@@ -38,13 +59,24 @@ class Todo(db.Model):
             'updated_at': self.updated_at.isoformat(),
             'user_id': self.user_id,
             'category': self.category,
-            'tags': self.tags.split(',') if self.tags else []
+            'tags': [tag.name for tag in self.tags]
         }
     
     def __repr__(self):
         return f'<Todo {self.id}: {self.title}>'
 
 
+class Tag(db.Model):
+    """Tag model, shared by every todo carrying the same tag name"""
+    __tablename__ = 'tags'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    
+    def __repr__(self):
+        return f'<Tag {self.name}>'
+
+
 class User(db.Model):
     """User model"""
     __tablename__ = 'users'
@@ -74,9 +106,16 @@ class User(db.Model):
 class Notification(db.Model):
     """Notification model"""
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at'),
+        db.Index('ix_notifications_user_type_sent_created', 'user_id', 'type', 'sent', 'created_at'),
+        db.Index('ix_notifications_sent_created', 'sent', 'created_at'),
+        # Ids only ever increase: SSE replay and the archive rely on it
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    todo_id = db.Column(db.Integer, db.ForeignKey('todos.id'), nullable=False)
+    todo_id = db.Column(db.Integer, db.ForeignKey('todos.id'), nullable=True)  # NULL for deleted todos and batch summaries
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     message = db.Column(db.String(500), nullable=False)
     type = db.Column(db.String(50), nullable=False)  # email, browser, both
@@ -103,3 +142,136 @@ class Notification(db.Model):
     def __repr__(self):
         return f'<Notification {self.id}: {self.message[:50]}>'
 
+
+
+class NotificationArchive(db.Model):
+    """Notifications moved out of the notifications table by retention pruning"""
+    __tablename__ = 'notifications_archive'
+    __table_args__ = (
+        db.Index('ix_notifications_archive_user_created', 'user_id', 'created_at'),
+    )
+    
+    # Keeps the original notification id
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    todo_id = db.Column(db.Integer, nullable=True)  # No FK, the todo may be deleted later
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    message = db.Column(db.String(500), nullable=False)
+    type = db.Column(db.String(50), nullable=False)
+    sent = db.Column(db.Boolean, default=True, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<NotificationArchive {self.id}: {self.message[:50]}>'
+
+
+class TodoStats(db.Model):
+    """Materialized per-user todo counters maintained by StatsService"""
+    __tablename__ = 'todo_stats'
+    
+    # 0 holds the counters for todos that have no user
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    pending_low = db.Column(db.Integer, default=0, nullable=False)
+    pending_medium = db.Column(db.Integer, default=0, nullable=False)
+    pending_high = db.Column(db.Integer, default=0, nullable=False)
+    pending_other = db.Column(db.Integer, default=0, nullable=False)
+    completed_low = db.Column(db.Integer, default=0, nullable=False)
+    completed_medium = db.Column(db.Integer, default=0, nullable=False)
+    completed_high = db.Column(db.Integer, default=0, nullable=False)
+    completed_other = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<TodoStats user={self.user_id}>'
+
+
+class UnreadCount(db.Model):
+    """Materialized per-user count of unread browser notifications"""
+    __tablename__ = 'unread_counts'
+    
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    unread = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<UnreadCount user={self.user_id}: {self.unread}>'
+
+
+class EmailOutbox(db.Model):
+    """Queued outgoing email, delivered asynchronously by OutboxWorker"""
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+        db.Index('ix_email_outbox_user_status', 'user_id', 'status'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    todo_id = db.Column(db.Integer, nullable=True)  # Not a foreign key: the todo may be deleted before delivery
+    notification_type = db.Column(db.String(50), nullable=False)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(500), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    
+    def to_dict(self):
+        """Convert model to dictionary"""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'todo_id': self.todo_id,
+            'notification_type': self.notification_type,
+            'recipient': self.recipient,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat(),
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat(),
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+    
+    def __repr__(self):
+        return f'<EmailOutbox {self.id}: {self.status}>'
+
+
+class ReminderLedger(db.Model):
+    """Record of reminders already sent, one per todo, due date and kind"""
+    __tablename__ = 'reminder_ledger'
+    
+    todo_id = db.Column(db.Integer, db.ForeignKey('todos.id'), primary_key=True)
+    due_date = db.Column(db.DateTime, primary_key=True)  # Rescheduling a todo makes it eligible again
+    reminder_kind = db.Column(db.String(20), primary_key=True)  # due_soon
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<ReminderLedger {self.todo_id}: {self.reminder_kind}>'
+
+
+class SchemaMigration(db.Model):
+    """Schema migrations that have been applied to this database"""
+    __tablename__ = 'schema_migrations'
+    
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<SchemaMigration {self.version}>'
+
+
+class ChangeCounter(db.Model):
+    """Per-user version number bumped on every write, used for ETags"""
+    __tablename__ = 'change_counters'
+    
+    # 0 holds the counter for todos that have no user
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    scope = db.Column(db.String(20), primary_key=True)  # todos, notifications, users (global, user_id 0)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<ChangeCounter {self.scope} user={self.user_id}: {self.version}>'
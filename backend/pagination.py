@@ -0,0 +1,72 @@
+"""
+Keyset (cursor) pagination helpers
+"""
+from datetime import datetime
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at, row_id):
+    """Encode a (created_at, id) position as an opaque URL-safe cursor"""
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def clamp_limit(limit):
+    """Clamp a requested page size to the allowed range"""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def paginate_desc(query, created_col, id_col, limit=None, after=None):
+    """
+    Apply keyset pagination ordered by (created_at DESC, id DESC)
+
+    Args:
+        query: SQLAlchemy query to paginate
+        created_col: Timestamp column used as the primary sort key
+        id_col: Primary key column used as the tie-breaker
+        limit: Requested page size
+        after: Cursor returned by a previous page, if any
+
+    Returns:
+        Tuple of (rows, next_cursor); next_cursor is None on the last page
+    """
+    limit = clamp_limit(limit)
+
+    if after:
+        created_at, row_id = decode_cursor(after)
+        query = query.filter(
+            (created_col < created_at) |
+            ((created_col == created_at) & (id_col < row_id))
+        )
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return rows, next_cursor
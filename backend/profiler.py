@@ -0,0 +1,175 @@
+"""
+SQL profiler: per-request query counts, N+1 detection, slow-query log and
+query budgets
+"""
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g, has_request_context
+from backend.instrumentation import endpoint, observe_statements
+import logging
+import os
+import re
+import threading
+
+SQL_PROFILER_ENABLED = os.getenv('SQL_PROFILER_ENABLED', 'False').lower() == 'true'
+# Statements slower than this are logged with their endpoint (0 disables)
+SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', 200))
+# A statement shape repeated this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', 5))
+# Default per-request query budget (0 disables); routes can set their own with @query_budget
+QUERY_BUDGET = int(os.getenv('SQL_QUERY_BUDGET', 0))
+# Raise instead of logging when a budget is exceeded; always on when app.testing
+QUERY_BUDGET_STRICT = os.getenv('SQL_QUERY_BUDGET_STRICT', 'False').lower() == 'true'
+
+logger = logging.getLogger('backend.sql')
+
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request or block ran more SQL statements than its budget allows"""
+
+
+def statement_shape(statement):
+    """
+    Normalize a statement so executions differing only in parameters match
+
+    Bound parameters already keep values out of the SQL text; this also
+    collapses expanded IN lists and whitespace.
+    """
+    return _WHITESPACE.sub(' ', _IN_LIST.sub('(?)', statement)).strip()
+
+
+class QueryProfile:
+    """Statements recorded for one request or profiled block"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed):
+        """Add one executed statement"""
+        self.count += 1
+        self.duration += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Statement shapes run at least threshold times, most frequent first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+_local = threading.local()
+
+
+def _active_profiles():
+    """Profiles that should see a statement run on this thread"""
+    profiles = list(getattr(_local, 'stack', ()))
+    if has_request_context():
+        profile = g.get('sql_profile')
+        if profile is not None:
+            profiles.append(profile)
+    return profiles
+
+
+def _record_statement(statement, elapsed):
+    """Record a finished statement and log it if it was slow"""
+    for profile in _active_profiles():
+        profile.record(statement, elapsed)
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning('Slow query (%.1f ms) in %s: %s', elapsed * 1000, endpoint(), statement_shape(statement))
+
+
+@contextmanager
+def profile_queries():
+    """
+    Record the statements run on this thread inside the block
+
+    Yields:
+        QueryProfile filled in as statements run
+    """
+    profile = QueryProfile()
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(profile)
+    try:
+        yield profile
+    finally:
+        stack.remove(profile)
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """
+    Fail if the block runs more than limit SQL statements
+
+    Test client requests run on the calling thread, so they can be wrapped:
+
+        with assert_max_queries(4):
+            client.get('/api/todos?user_id=1')
+
+    Raises:
+        QueryBudgetExceeded: With the repeated statement shapes listed
+    """
+    with profile_queries() as profile:
+        yield profile
+    if profile.count > limit:
+        raise QueryBudgetExceeded(_budget_message(f'{profile.count} queries, budget {limit}', profile))
+
+
+def _budget_message(summary, profile):
+    """Describe a budget overrun with its most repeated statements"""
+    lines = [summary]
+    for shape, count in profile.repeated(threshold=2)[:5]:
+        lines.append(f'  {count}x {shape[:200]}')
+    return '\n'.join(lines)
+
+
+def query_budget(max_queries):
+    """Route decorator setting the query budget for that endpoint"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.sql_query_budget = max_queries
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _start_profile():
+    """Start profiling a request"""
+    g.sql_profile = QueryProfile()
+
+
+def _finish_profile(response):
+    """Report likely N+1s and budget overruns for the finished request"""
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+    name = endpoint()
+
+    for shape, count in profile.repeated():
+        logger.warning('Possible N+1 in %s: %dx %s', name, count, shape[:500])
+
+    budget = g.pop('sql_query_budget', None) or QUERY_BUDGET
+    if budget and profile.count > budget:
+        message = _budget_message(f'{name} ran {profile.count} queries, budget {budget}', profile)
+        if QUERY_BUDGET_STRICT or current_app.testing:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+    response.headers['X-Query-Count'] = str(profile.count)
+    response.headers['X-Query-Time-Ms'] = f'{profile.duration * 1000:.1f}'
+    return response
+
+
+def register_profiler(app):
+    """Profile SQL per request when SQL_PROFILER_ENABLED is set"""
+    # Always observe so profile_queries()/assert_max_queries() work
+    observe_statements(_record_statement)
+    if SQL_PROFILER_ENABLED:
+        app.before_request(_start_profile)
+        app.after_request(_finish_profile)
@@ -0,0 +1,163 @@
+"""
+Read-replica routing for GET requests
+"""
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+import itertools
+import logging
+import os
+import threading
+import time
+
+REPLICA_BIND_PREFIX = 'replica_'
+# Seconds a replica that failed its health check is skipped, and between checks
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', 5))
+# After a write, the same client reads from the primary for this long
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+STICKY_COOKIE = 'db_primary_until'
+
+logger = logging.getLogger('backend.replicas')
+
+
+def replica_binds(urls, options=None):
+    """
+    SQLALCHEMY_BINDS entries for a comma-separated list of replica URLs
+
+    Args:
+        urls: Comma-separated database URLs
+        options: Optional function mapping a URL to its engine options
+    """
+    binds = {}
+    for i, url in enumerate(u.strip() for u in urls.split(',') if u.strip()):
+        binds[f'{REPLICA_BIND_PREFIX}{i}'] = {'url': url, **(options(url) if options else {})}
+    return binds
+
+
+class ReplicaRouter:
+    """Round-robin choice among the replicas that pass a periodic health check"""
+
+    def __init__(self, check_interval=REPLICA_HEALTH_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._turn = itertools.count()
+        self._checked_at = {}  # bind key -> monotonic time of last good check
+        self._down_until = {}  # bind key -> monotonic time to retry a failed replica
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def replica_keys(engines):
+        """Bind keys of the configured replicas"""
+        return sorted(key for key in engines if key and key.startswith(REPLICA_BIND_PREFIX))
+
+    def _healthy(self, key, engine):
+        """Whether a replica can be used, running SELECT 1 when the last check is stale"""
+        now = time.monotonic()
+        with self._lock:
+            if self._down_until.get(key, 0) > now:
+                return False
+            if now - self._checked_at.get(key, 0) < self.check_interval:
+                return True
+        try:
+            with engine.connect() as conn:
+                conn.exec_driver_sql('SELECT 1')
+        except Exception as e:
+            self.mark_down(key)
+            print(f"Replica {key} failed its health check: {str(e)}")
+            return False
+        with self._lock:
+            self._checked_at[key] = now
+        return True
+
+    def mark_down(self, key):
+        """Skip a replica until the next health check is due"""
+        with self._lock:
+            self._down_until[key] = time.monotonic() + self.check_interval
+            self._checked_at.pop(key, None)
+
+    def choose(self, engines):
+        """
+        Pick the next healthy replica
+
+        Returns:
+            (bind key, engine), or (None, None) to fall back to the primary
+        """
+        keys = self.replica_keys(engines)
+        if not keys:
+            return None, None
+        start = next(self._turn)
+        for offset in range(len(keys)):
+            key = keys[(start + offset) % len(keys)]
+            if self._healthy(key, engines[key]):
+                return key, engines[key]
+        return None, None
+
+
+replica_router = ReplicaRouter()
+
+
+class RoutingSession(Session):
+    """
+    Session sending the reads of GET requests to a replica
+
+    Everything else uses the primary: writes, flushes, reads after the
+    session has written, work outside requests and requests that asked for
+    consistent reads. One replica is used for the whole request.
+
+    GET requests must not write: a write that follows replica reads may
+    store stale, replica-derived values on the primary. Such writes are
+    logged, and raise when the app is testing.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._read_from_replica(clause):
+            if 'db_replica' not in g:
+                g.db_replica_key, g.db_replica = replica_router.choose(self._db.engines)
+            if g.db_replica is not None:
+                return g.db_replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _read_from_replica(self, clause):
+        """Whether this statement may run on a replica"""
+        if not has_request_context() or not g.get('db_read_replica'):
+            return False
+        if self._flushing or getattr(clause, 'is_dml', False):
+            if g.get('db_replica') is not None and not self.info.get('db_wrote'):
+                _write_after_replica_read()
+            # Later reads in this request must see the write
+            self.info['db_wrote'] = True
+            return False
+        return not self.info.get('db_wrote')
+
+
+def _write_after_replica_read():
+    """Report a GET request that writes after reading from a replica"""
+    message = f'{request.method} {request.path} wrote after reading from replica {g.db_replica_key}'
+    if current_app.testing:
+        raise RuntimeError(message)
+    logger.warning(message)
+
+
+def _choose_route():
+    """Decide whether this request may read from a replica"""
+    if request.method not in ('GET', 'HEAD') or request.headers.get('X-Consistent-Read'):
+        g.db_read_replica = False
+        return
+    sticky_until = request.cookies.get(STICKY_COOKIE, type=float)
+    g.db_read_replica = not (sticky_until and sticky_until > time.time())
+
+
+def _after_request(response):
+    """Keep a client on the primary briefly after it wrote, and report the route"""
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        response.set_cookie(
+            STICKY_COOKIE, str(time.time() + REPLICA_STICKY_SECONDS),
+            max_age=REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax'
+        )
+    response.headers['X-DB-Route'] = g.get('db_replica_key') or 'primary'
+    return response
+
+
+def register_replica_routing(app):
+    """Route GET reads to replicas when SQLALCHEMY_BINDS has replica entries"""
+    if any(key.startswith(REPLICA_BIND_PREFIX) for key in app.config.get('SQLALCHEMY_BINDS', {})):
+        app.before_request(_choose_route)
+        app.after_request(_after_request)
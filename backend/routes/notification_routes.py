@@ -1,15 +1,33 @@
 """
 Notification API routes
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from backend.database import db
+from backend.fieldsets import NOTIFICATION_FIELDS, parse_fields, project, serializer
 from backend.models import Notification, User
+from backend.profiler import query_budget
+from backend.services.etag_service import ETagService
+from backend.services.notification_broker import notification_broker
 from backend.services.notification_service import NotificationService
+from backend.services.unread_service import UnreadService
+import json
+import queue
+import time
+
+# Seconds between keepalive comments, and database checks for
+# notifications created by other processes, on open streams
+STREAM_KEEPALIVE_SECONDS = 15
 
 notification_bp = Blueprint('notifications', __name__)
 
 
+def _is_id(value):
+    """Whether a JSON value is an id; bool is a subclass of int, but true is not id 1"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
 @notification_bp.route('', methods=['GET'])
+@query_budget(4)
 def get_notifications():
     """Get notifications for a user"""
     try:
@@ -20,14 +38,27 @@ def get_notifications():
         limit = request.args.get('limit', 50, type=int)
         pending_only = request.args.get('pending_only', 'false').lower() == 'true'
         
+        etag = ETagService.collection_etag('notifications', user_id)
+        if ETagService.not_modified(etag):
+            return ETagService.not_modified_response(etag)
+        
+        try:
+            fields = parse_fields(request.args.get('fields'), NOTIFICATION_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         if pending_only:
-            notifications = NotificationService.get_pending_notifications(user_id, limit)
+            notifications = NotificationService.get_pending_notifications(user_id, limit, fields)
         else:
-            notifications = Notification.query.filter_by(user_id=user_id)\
-                .order_by(Notification.created_at.desc()).limit(limit).all()
-            notifications = [n.to_dict() for n in notifications]
+            query = Notification.query.filter_by(user_id=user_id)
+            serialize = Notification.to_dict
+            if fields:
+                query = project(query, NOTIFICATION_FIELDS, fields)
+                serialize = serializer(NOTIFICATION_FIELDS, fields)
+            notifications = query.order_by(Notification.created_at.desc()).limit(limit).all()
+            notifications = [serialize(n) for n in notifications]
         
-        return jsonify(notifications), 200
+        return ETagService.tag(jsonify(notifications), etag), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -46,6 +77,57 @@ def mark_notification_read(notification_id):
         return jsonify({'error': str(e)}), 500
 
 
+@notification_bp.route('/mark-read', methods=['POST'])
+def mark_notifications_read():
+    """Mark several notifications of a user as read"""
+    try:
+        data = request.get_json() or {}
+        user_id = data.get('user_id')
+        ids = data.get('ids')
+        if not _is_id(user_id) or not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
+        if not isinstance(ids, list) or not all(_is_id(i) for i in ids):
+            return jsonify({'error': 'ids must be a list of notification ids'}), 400
+        
+        marked = NotificationService.mark_read(user_id, ids=ids) if ids else 0
+        return jsonify({'marked': marked, 'unread': UnreadService.get(user_id)}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@notification_bp.route('/mark-all-read', methods=['POST'])
+def mark_all_notifications_read():
+    """Mark all of a user's notifications up to up_to_id (default: all) as read"""
+    try:
+        data = request.get_json() or {}
+        user_id = data.get('user_id')
+        up_to_id = data.get('up_to_id')
+        if not _is_id(user_id) or not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
+        if up_to_id is not None and not _is_id(up_to_id):
+            return jsonify({'error': 'up_to_id must be a notification id'}), 400
+        
+        marked = NotificationService.mark_read(user_id, up_to_id=up_to_id)
+        return jsonify({'marked': marked, 'unread': UnreadService.get(user_id)}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@notification_bp.route('/unread-count', methods=['GET'])
+@query_budget(2)
+def get_unread_count():
+    """Number of unread browser notifications for a user"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
+        return jsonify({'user_id': user_id, 'unread': UnreadService.get(user_id)}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @notification_bp.route('/check-due', methods=['POST'])
 def check_due_todos():
     """Manually trigger check for due todos"""
@@ -58,3 +140,99 @@ def check_due_todos():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+
+def _sse_event(notification, with_id=True):
+    """Format a notification dict as a Server-Sent Event"""
+    data = f"data: {json.dumps(notification)}\n\n"
+    return f"id: {notification['id']}\n{data}" if with_id else data
+
+
+def _live_event(notification, replayed, last_id):
+    """
+    Server-Sent Event for a published notification, or None to skip it
+
+    Notifications published while the replay query ran arrive again from
+    the broker and are skipped if unchanged. Coalesced rewrites keep their
+    id and are always sent, but without an id field for ids at or below
+    last_id, so the client's Last-Event-ID stays on the newest notification.
+
+    Args:
+        notification: Notification dict from the broker
+        replayed: Dict of id -> notification sent by the replay; consumed
+        last_id: Highest notification id sent on this stream
+    """
+    if replayed.pop(notification['id'], None) == notification:
+        return None
+    return _sse_event(notification, with_id=notification['id'] > last_id)
+
+
+@notification_bp.route('/stream', methods=['GET'])
+def stream_notifications():
+    """
+    Stream new browser notifications for a user as Server-Sent Events
+
+    Clients reconnecting with a Last-Event-ID header (or last_event_id
+    query parameter) first receive the notifications they missed.
+    Notifications created by other worker processes never reach this
+    process's broker, so the stream also looks for them in the database
+    every STREAM_KEEPALIVE_SECONDS.
+    """
+    user_id = request.args.get('user_id', type=int)
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+
+    last_id = request.headers.get('Last-Event-ID', type=int) \
+        or request.args.get('last_event_id', type=int) or 0
+
+    def generate(last_id):
+        # Subscribe before replaying so nothing published in between is lost
+        subscription = notification_broker.subscribe(user_id)
+        replayed = {}
+        try:
+            # Look up where to start before the client sees the stream open
+            missed = []
+            if last_id:
+                missed = NotificationService.get_notifications_after(user_id, last_id)
+            else:
+                last_id = NotificationService.latest_notification_id(user_id)
+            # Don't hold a database connection for the life of the stream
+            db.session.close()
+
+            yield 'retry: 5000\n\n'
+            for notification in missed:
+                replayed[notification['id']] = notification
+                last_id = notification['id']
+                yield _sse_event(notification)
+
+            next_poll = time.monotonic() + STREAM_KEEPALIVE_SECONDS
+            while True:
+                try:
+                    event = subscription.get(timeout=max(0, next_poll - time.monotonic()))
+                except queue.Empty:
+                    next_poll = time.monotonic() + STREAM_KEEPALIVE_SECONDS
+                    polled = NotificationService.get_notifications_after(user_id, last_id)
+                    db.session.close()
+                    # Only the latest poll can still race with the broker
+                    replayed = {notification['id']: notification for notification in polled}
+                    for notification in polled:
+                        last_id = notification['id']
+                        yield _sse_event(notification)
+                    if not polled:
+                        yield ': keepalive\n\n'
+                    continue
+                if event is None:
+                    # Fell too far behind; the client will reconnect and replay
+                    return
+                text = _live_event(event, replayed, last_id)
+                if text is not None:
+                    last_id = max(last_id, event['id'])
+                    yield text
+        finally:
+            notification_broker.unsubscribe(user_id, subscription)
+
+    return Response(
+        stream_with_context(generate(last_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
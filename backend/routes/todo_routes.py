@@ -3,17 +3,75 @@ Todo API routes
 """
 from flask import Blueprint, request, jsonify
 from backend.database import db
-from backend.models import Todo, User
+from backend.models import Todo
 from backend.services.notification_service import NotificationService
+from backend.services.reminder_scheduler import reminder_scheduler
+from backend.services.etag_service import ETagService
+from backend.services.search_service import SearchService
+from backend.services.stats_service import StatsService
+from backend.services.tag_service import TagService
+from backend.services.user_cache import user_cache
+from backend.fieldsets import TODO_FIELDS, parse_fields, project, serializer
+from backend.pagination import paginate_desc
+from backend.profiler import query_budget
+from backend.streaming import stream_query, wants_stream
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 import os
 
 todo_bp = Blueprint('todos', __name__)
 
+MAX_BATCH_OPERATIONS = 500
+
+
+def _build_todo(data, tag_cache=None):
+    """Create a Todo from request data"""
+    return Todo(
+        title=data['title'],
+        description=data.get('description', ''),
+        priority=data.get('priority', 'medium'),
+        due_date=datetime.fromisoformat(data['due_date']) if data.get('due_date') else None,
+        user_id=data.get('user_id'),
+        category=data.get('category'),
+        tags=TagService.resolve(TagService.parse(data.get('tags')), tag_cache)
+    )
+
+
+def _apply_updates(todo, data, tag_cache=None):
+    """Apply the fields present in request data to a Todo"""
+    if 'title' in data:
+        todo.title = data['title']
+    if 'description' in data:
+        todo.description = data.get('description')
+    if 'completed' in data:
+        todo.completed = data['completed']
+    if 'priority' in data:
+        todo.priority = data['priority']
+    if 'due_date' in data:
+        todo.due_date = datetime.fromisoformat(data['due_date']) if data['due_date'] else None
+    if 'category' in data:
+        todo.category = data.get('category')
+    if 'tags' in data:
+        todo.tags = TagService.resolve(TagService.parse(data['tags']), tag_cache)
+    
+    todo.updated_at = datetime.utcnow()
+
 
 @todo_bp.route('', methods=['GET'])
+@query_budget(6)
 def get_todos():
-    """Get all todos with optional filters"""
+    """
+    Get todos with optional filters
+
+    Passing ``limit`` and/or ``after`` switches to keyset pagination and
+    returns ``{'todos': [...], 'next_cursor': ...}`` instead of a bare list.
+    Paginated results stay in creation order; unpaginated searches are
+    ranked by relevance. ``tag`` may be repeated or comma-separated, with
+    ``tag_mode=any`` (default) or ``tag_mode=all``. Unpaginated lists can
+    be streamed with ``stream=true`` or ``format=ndjson``. ``fields``
+    limits the response (and the columns loaded) to a comma-separated
+    list of fields.
+    """
     try:
         # Get query parameters
         completed = request.args.get('completed')
@@ -21,9 +79,28 @@ def get_todos():
         category = request.args.get('category')
         user_id = request.args.get('user_id', type=int)
         search = request.args.get('search')
+        tags = TagService.parse(','.join(request.args.getlist('tag')))
+        tag_mode = request.args.get('tag_mode', 'any')
+        
+        # Answer unchanged clients before running the list query
+        etag = ETagService.collection_etag('todos', user_id)
+        if ETagService.not_modified(etag):
+            return ETagService.not_modified_response(etag)
         
-        # Build query
+        try:
+            fields = parse_fields(request.args.get('fields'), TODO_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Build query, loading only the columns behind the requested fields;
+        # tags for the whole page are loaded in one extra query
         query = Todo.query
+        serialize = Todo.to_dict
+        if fields:
+            query = project(query, TODO_FIELDS, fields, always=[Todo.created_at])
+            serialize = serializer(TODO_FIELDS, fields)
+        if fields is None or 'tags' in fields:
+            query = query.options(selectinload(Todo.tags))
         
         if completed is not None:
             query = query.filter(Todo.completed == (completed.lower() == 'true'))
@@ -37,25 +114,56 @@ def get_todos():
         if user_id:
             query = query.filter(Todo.user_id == user_id)
         
-        if search:
-            query = query.filter(
-                (Todo.title.contains(search)) | 
-                (Todo.description.contains(search))
-            )
+        if tags:
+            try:
+                query = TagService.filter(query, tags, tag_mode)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         
-        todos = query.order_by(Todo.created_at.desc()).all()
-        return jsonify([todo.to_dict() for todo in todos]), 200
+        rank = None
+        if search:
+            query, rank = SearchService.apply(query, search)
+        
+        if 'limit' in request.args or 'after' in request.args:
+            try:
+                todos, next_cursor = paginate_desc(
+                    query, Todo.created_at, Todo.id,
+                    limit=request.args.get('limit', type=int),
+                    after=request.args.get('after')
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return ETagService.tag(jsonify({
+                'todos': [serialize(todo) for todo in todos],
+                'next_cursor': next_cursor
+            }), etag), 200
+        
+        # Unpaginated searches are ordered by relevance first
+        if rank is not None:
+            query = query.order_by(rank)
+        query = query.order_by(Todo.created_at.desc())
+        
+        if wants_stream():
+            return ETagService.tag(stream_query(query, serialize), etag), 200
+        
+        todos = query.all()
+        return ETagService.tag(jsonify([serialize(todo) for todo in todos]), etag), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @todo_bp.route('/<int:todo_id>', methods=['GET'])
+@query_budget(4)
 def get_todo(todo_id):
     """Get a single todo by ID"""
     try:
+        etag = ETagService.todo_etag(todo_id)
+        if ETagService.not_modified(etag):
+            return ETagService.not_modified_response(etag)
+        
         todo = Todo.query.get_or_404(todo_id)
-        return jsonify(todo.to_dict()), 200
+        return ETagService.tag(jsonify(todo.to_dict()), etag), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -70,29 +178,24 @@ def create_todo():
         if not data or 'title' not in data:
             return jsonify({'error': 'Title is required'}), 400
         
-        # Get or create user
-        user_id = data.get('user_id')
-        user = None
-        if user_id:
-            user = User.query.get(user_id)
+        user = user_cache.get(data.get('user_id'))
         
         # Create todo
-        todo = Todo(
-            title=data['title'],
-            description=data.get('description', ''),
-            priority=data.get('priority', 'medium'),
-            due_date=datetime.fromisoformat(data['due_date']) if data.get('due_date') else None,
-            user_id=user_id,
-            category=data.get('category'),
-            tags=','.join(data.get('tags', [])) if isinstance(data.get('tags'), list) else data.get('tags')
-        )
+        todo = _build_todo(data)
         
         db.session.add(todo)
-        db.session.commit()
         
-        # Send notification if user exists
+        # Notify in the same transaction, so the todo, its notification and
+        # the queued email are committed together or not at all
+        notification = None
         if user and os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
-            NotificationService.create_notification(todo, user, 'created')
+            db.session.flush()
+            notification = NotificationService.create_notification(todo, user, 'created', commit=False)
+        
+        db.session.commit()
+        reminder_scheduler.todo_changed(todo)
+        if notification is not None:
+            NotificationService.publish(notification)
         
         return jsonify(todo.to_dict()), 201
         
@@ -109,28 +212,19 @@ def update_todo(todo_id):
         data = request.get_json()
         
         # Update fields
-        if 'title' in data:
-            todo.title = data['title']
-        if 'description' in data:
-            todo.description = data.get('description')
-        if 'completed' in data:
-            todo.completed = data['completed']
-        if 'priority' in data:
-            todo.priority = data['priority']
-        if 'due_date' in data:
-            todo.due_date = datetime.fromisoformat(data['due_date']) if data['due_date'] else None
-        if 'category' in data:
-            todo.category = data.get('category')
-        if 'tags' in data:
-            todo.tags = ','.join(data['tags']) if isinstance(data['tags'], list) else data['tags']
-        
-        todo.updated_at = datetime.utcnow()
-        db.session.commit()
+        _apply_updates(todo, data)
         
         # Send notification
-        if todo.user and os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
+        notification = None
+        user = user_cache.get(todo.user_id)
+        if user and os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
             notification_type = 'completed' if todo.completed else 'updated'
-            NotificationService.create_notification(todo, todo.user, notification_type)
+            notification = NotificationService.create_notification(todo, user, notification_type, commit=False)
+        
+        db.session.commit()
+        reminder_scheduler.todo_changed(todo)
+        if notification is not None:
+            NotificationService.publish(notification)
         
         return jsonify(todo.to_dict()), 200
         
@@ -144,16 +238,21 @@ def delete_todo(todo_id):
     """Delete a todo"""
     try:
         todo = Todo.query.get_or_404(todo_id)
-        user = todo.user
+        user = user_cache.get(todo.user_id)
         
         db.session.delete(todo)
-        db.session.commit()
         
         # Send notification
+        notification = None
         if user and os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
             # Create a temporary todo object for notification
             temp_todo = type('obj', (object,), {'id': None, 'title': 'Deleted Todo', 'user': user})()
-            NotificationService.create_notification(temp_todo, user, 'deleted')
+            notification = NotificationService.create_notification(temp_todo, user, 'deleted', commit=False)
+        
+        db.session.commit()
+        reminder_scheduler.cancel(todo_id)
+        if notification is not None:
+            NotificationService.publish(notification)
         
         return jsonify({'message': 'Todo deleted successfully'}), 200
         
@@ -170,11 +269,17 @@ def toggle_complete(todo_id):
         todo.completed = not todo.completed
         todo.updated_at = datetime.utcnow()
         
-        db.session.commit()
-        
         # Send notification
-        if todo.user and os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
-            NotificationService.create_notification(todo, todo.user, 'completed' if todo.completed else 'updated')
+        notification = None
+        user = user_cache.get(todo.user_id)
+        if user and os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
+            notification_type = 'completed' if todo.completed else 'updated'
+            notification = NotificationService.create_notification(todo, user, notification_type, commit=False)
+        
+        db.session.commit()
+        reminder_scheduler.todo_changed(todo)
+        if notification is not None:
+            NotificationService.publish(notification)
         
         return jsonify(todo.to_dict()), 200
         
@@ -183,33 +288,143 @@ def toggle_complete(todo_id):
         return jsonify({'error': str(e)}), 500
 
 
-@todo_bp.route('/stats', methods=['GET'])
-def get_stats():
-    """Get todo statistics"""
+@todo_bp.route('/batch', methods=['POST'])
+def batch_todos():
+    """
+    Apply many create/update/delete operations in one transaction
+
+    Expects ``{'operations': [...]}`` where each operation is one of
+    ``{'op': 'create', 'data': {...}}``, ``{'op': 'update', 'id': 1,
+    'data': {...}}`` or ``{'op': 'delete', 'id': 1}``. Either every
+    operation is applied or none is, and each affected user gets one
+    summary notification instead of one per todo.
+    """
     try:
-        user_id = request.args.get('user_id', type=int)
-        query = Todo.query
-        if user_id:
-            query = query.filter(Todo.user_id == user_id)
+        data = request.get_json()
+        operations = data.get('operations') if isinstance(data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'error': 'operations must be a non-empty list'}), 400
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'}), 400
+        
+        # Validate every operation before touching the database
+        target_ids = set()
+        for index, operation in enumerate(operations):
+            op = operation.get('op') if isinstance(operation, dict) else None
+            if op == 'create':
+                if not isinstance(operation.get('data'), dict) or 'title' not in operation['data']:
+                    return jsonify({'error': f'Operation {index}: title is required'}), 400
+            elif op in ('update', 'delete'):
+                # bool is a subclass of int, but true is not todo 1
+                if not isinstance(operation.get('id'), int) or isinstance(operation['id'], bool):
+                    return jsonify({'error': f'Operation {index}: id is required'}), 400
+                if op == 'update' and not isinstance(operation.get('data'), dict):
+                    return jsonify({'error': f'Operation {index}: data is required'}), 400
+                target_ids.add(operation['id'])
+            else:
+                return jsonify({'error': f'Operation {index}: op must be create, update or delete'}), 400
+        
+        # Load every targeted todo, and what deleting it cascades to, up front
+        todos = {}
+        if target_ids:
+            todos = {
+                todo.id: todo for todo in Todo.query.filter(Todo.id.in_(target_ids)).options(
+                    selectinload(Todo.tags),
+                    selectinload(Todo.notifications),
+                    selectinload(Todo.reminders)
+                )
+            }
+        missing = sorted(target_ids - set(todos))
+        if missing:
+            return jsonify({'error': 'Todos not found', 'missing_ids': missing}), 404
+        
+        # Look up (or create) every tag name used by the batch up front
+        tag_cache = {}
+        TagService.resolve(TagService.parse([
+            name
+            for operation in operations if operation['op'] != 'delete'
+            for name in TagService.parse(operation['data'].get('tags'))
+        ]), tag_cache)
+        
+        created, updated, deleted = [], [], []
+        # Without autoflush nothing is written until the single flush below
+        with db.session.no_autoflush:
+            for index, operation in enumerate(operations):
+                if operation['op'] == 'create':
+                    todo = _build_todo(operation['data'], tag_cache)
+                    db.session.add(todo)
+                    created.append(todo)
+                    continue
+                
+                todo = todos[operation['id']]
+                if todo in deleted:
+                    db.session.rollback()
+                    return jsonify({'error': f'Operation {index}: todo {todo.id} was already deleted'}), 400
+                if operation['op'] == 'update':
+                    _apply_updates(todo, operation['data'], tag_cache)
+                    if todo not in updated:
+                        updated.append(todo)
+                else:
+                    db.session.delete(todo)
+                    deleted.append(todo)
+        
+        # A single flush writes all rows, batching inserts that share a shape
+        db.session.flush()
+        
+        changes = {}  # user_id -> [(todo_id, title, notification_type)]
+        for todo in created:
+            changes.setdefault(todo.user_id, []).append((todo.id, todo.title, 'created'))
+        for todo in updated:
+            if todo not in deleted:
+                notification_type = 'completed' if todo.completed else 'updated'
+                changes.setdefault(todo.user_id, []).append((todo.id, todo.title, notification_type))
+        for todo in deleted:
+            changes.setdefault(todo.user_id, []).append((None, todo.title, 'deleted'))
+        
+        scheduled = [(todo.id, todo.due_date, todo.completed) for todo in created + updated if todo not in deleted]
+        result = {
+            'created': [todo.id for todo in created],
+            'updated': [todo.id for todo in updated if todo not in deleted],
+            'deleted': [todo.id for todo in deleted]
+        }
+        
+        # One summary notification per affected user, in the same transaction
+        notifications = []
+        changes.pop(None, None)
+        if changes and os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
+            for user_id, user_changes in changes.items():
+                user = user_cache.get(user_id)
+                if user:
+                    notifications.append(
+                        NotificationService.create_batch_notification(user, user_changes, commit=False)
+                    )
         
-        total = query.count()
-        completed = query.filter(Todo.completed == True).count()
-        pending = total - completed
+        db.session.commit()
         
-        # Priority breakdown
-        high_priority = query.filter(Todo.priority == 'high', Todo.completed == False).count()
-        medium_priority = query.filter(Todo.priority == 'medium', Todo.completed == False).count()
-        low_priority = query.filter(Todo.priority == 'low', Todo.completed == False).count()
+        for todo_id, due_date, completed in scheduled:
+            reminder_scheduler.schedule(todo_id, due_date, completed)
+        for todo_id in result['deleted']:
+            reminder_scheduler.cancel(todo_id)
+        for notification in notifications:
+            NotificationService.publish(notification)
         
-        return jsonify({
-            'total': total,
-            'completed': completed,
-            'pending': pending,
-            'high_priority': high_priority,
-            'medium_priority': medium_priority,
-            'low_priority': low_priority
-        }), 200
+        return jsonify(result), 200
         
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+
+@todo_bp.route('/stats', methods=['GET'])
+@query_budget(2)
+def get_stats():
+    """Get todo statistics"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        return jsonify(StatsService.get_stats(user_id)), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
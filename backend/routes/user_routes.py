@@ -3,15 +3,26 @@ User API routes
 """
 from flask import Blueprint, request, jsonify
 from backend.database import db
-from backend.models import User
+from backend.models import Todo, User
+from backend.pagination import paginate_desc
+from backend.profiler import query_budget
+from backend.services.notification_service import NotificationService
+from backend.services.stats_service import StatsService
+from backend.services.unread_service import UnreadService
+from backend.services.user_cache import user_cache
+from backend.streaming import stream_query, wants_stream
+from sqlalchemy.orm import selectinload
 
 user_bp = Blueprint('users', __name__)
 
 
 @user_bp.route('', methods=['GET'])
 def get_users():
-    """Get all users"""
+    """Get all users, streamed with stream=true or format=ndjson"""
     try:
+        if wants_stream():
+            return stream_query(User.query.order_by(User.id), User.to_dict), 200
+        
         users = User.query.all()
         return jsonify([user.to_dict() for user in users]), 200
     except Exception as e:
@@ -28,6 +39,41 @@ def get_user(user_id):
         return jsonify({'error': str(e)}), 500
 
 
+@user_bp.route('/<int:user_id>/dashboard', methods=['GET'])
+@query_budget(7)
+def get_dashboard(user_id):
+    """
+    Everything the page shows on load, in one response
+
+    Returns the user, the first page of their todos (``limit``, with
+    ``next_cursor`` as in ``GET /api/todos``), their stats, pending
+    notifications and unread count. Tags for the page are loaded with
+    selectinload, so the response takes a fixed handful of queries
+    however many todos it holds.
+    """
+    try:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return jsonify({'error': 'User not found'}), 404
+
+        query = Todo.query.filter(Todo.user_id == user_id).options(selectinload(Todo.tags))
+        todos, next_cursor = paginate_desc(
+            query, Todo.created_at, Todo.id,
+            limit=request.args.get('limit', type=int)
+        )
+
+        return jsonify({
+            'user': user.to_dict(),
+            'todos': [todo.to_dict() for todo in todos],
+            'next_cursor': next_cursor,
+            'stats': StatsService.get_stats(user_id),
+            'notifications': NotificationService.get_pending_notifications(user_id),
+            'unread_count': UnreadService.get(user_id)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @user_bp.route('', methods=['POST'])
 def create_user():
     """Create a new user"""
@@ -53,6 +99,7 @@ def create_user():
         
         db.session.add(user)
         db.session.commit()
+        user_cache.invalidate(user.id)
         
         return jsonify(user.to_dict()), 201
         
@@ -82,6 +129,7 @@ def update_user(user_id):
             user.browser_notifications_enabled = data['browser_notifications_enabled']
         
         db.session.commit()
+        user_cache.invalidate(user_id)
         return jsonify(user.to_dict()), 200
         
     except Exception as e:
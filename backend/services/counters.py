@@ -0,0 +1,40 @@
+"""
+Helpers shared by the counter tables that flush listeners keep up to date
+"""
+from sqlalchemy import inspect
+from backend.database import dialect_insert
+
+
+def previous(obj, attr):
+    """Value an attribute had before the pending flush"""
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+def increment(conn, table, key, deltas, seed):
+    """
+    Add deltas to the counter columns of one row, creating it if missing
+
+    The common case is a single UPDATE. When no row exists yet, the row
+    from seed() is inserted instead; if a concurrent first write inserted
+    it meanwhile, the deltas are added to that row.
+
+    Args:
+        conn: Connection to write on, usually the flushing session's
+        table: Counter table
+        key: Dict of primary key column name to value
+        deltas: Dict of counter column name to the amount to add
+        seed: Callable returning the complete row to insert, counted
+            from the source table after the rows being flushed
+    """
+    values = {column: table.c[column] + delta for column, delta in deltas.items()}
+    where = [table.c[column] == value for column, value in key.items()]
+    if conn.execute(table.update().where(*where).values(values)).rowcount:
+        return
+    conn.execute(
+        dialect_insert(conn, table)
+        .values(seed())
+        .on_conflict_do_update(index_elements=[table.c[column] for column in key], set_=values)
+    )
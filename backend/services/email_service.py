@@ -2,157 +2,314 @@
 Email notification service
 """
 from flask import current_app
-from flask_mail import Message
+from flask_mail import Mail, Message
 from backend.database import db
-from backend.models import Notification, User, Todo
-from datetime import datetime
+from backend.metrics import metrics
+from backend.models import EmailOutbox, Notification, User, Todo
+from backend.services.smtp_pool import SMTPConnectionPool
+from datetime import datetime, timedelta
 import os
+import time
+
+# Merge a user's emails queued within this many seconds into one digest (0 disables)
+DIGEST_WINDOW_SECONDS = int(os.getenv('EMAIL_DIGEST_WINDOW_SECONDS', 0))
+
+smtp_pool = SMTPConnectionPool(
+    size=int(os.getenv('SMTP_POOL_SIZE', 4)),
+    idle_timeout=int(os.getenv('SMTP_IDLE_TIMEOUT', 60))
+)
 
 
 class EmailService:
     """Service for sending email notifications"""
-    
+
+    @staticmethod
+    def emails_enabled(user):
+        """Whether email notifications should be sent to this user"""
+        if not os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
+            return False
+        return bool(user.email_notifications_enabled)
+
     @staticmethod
-    def send_todo_notification(todo, user, notification_type='created'):
+    def render_todo_notification(todo, notification_type='created'):
         """
-        Send email notification for todo events
-        
+        Build the subject and HTML body for a todo event email
+
         Args:
             todo: Todo object
-            user: User object
             notification_type: Type of notification (created, completed, due_soon, etc.)
+
+        Returns:
+            Tuple of (subject, body)
         """
-        if not os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
-            return False
-        
-        if not user.email_notifications_enabled:
-            return False
-        
-        try:
-            from flask import current_app
-            from flask_mail import Message
-            
-            # Create notification message based on type
-            messages = {
-                'created': f'New Todo Created: {todo.title}',
-                'completed': f'Todo Completed: {todo.title}',
-                'due_soon': f'Reminder: Todo "{todo.title}" is due soon!',
-                'updated': f'Todo Updated: {todo.title}',
-                'deleted': f'Todo Deleted: {todo.title}'
-            }
-            
-            subject = messages.get(notification_type, f'Todo Update: {todo.title}')
-            
-            # Create email body
-            body = f"""
+        messages = {
+            'created': f'New Todo Created: {todo.title}',
+            'completed': f'Todo Completed: {todo.title}',
+            'due_soon': f'Reminder: Todo "{todo.title}" is due soon!',
+            'updated': f'Todo Updated: {todo.title}',
+            'deleted': f'Todo Deleted: {todo.title}'
+        }
+
+        subject = messages.get(notification_type, f'Todo Update: {todo.title}')
+
+        description = getattr(todo, 'description', None)
+        priority = getattr(todo, 'priority', None)
+        completed = getattr(todo, 'completed', False)
+        due_date = getattr(todo, 'due_date', None)
+        category = getattr(todo, 'category', None)
+
+        body = f"""
             <html>
             <body>
                 <h2>Todo Notification</h2>
                 <p><strong>Title:</strong> {todo.title}</p>
-                <p><strong>Description:</strong> {todo.description or 'No description'}</p>
-                <p><strong>Priority:</strong> {todo.priority}</p>
-                <p><strong>Status:</strong> {'Completed' if todo.completed else 'Pending'}</p>
-                {f'<p><strong>Due Date:</strong> {todo.due_date.strftime("%Y-%m-%d %H:%M")}</p>' if todo.due_date else ''}
-                <p><strong>Category:</strong> {todo.category or 'Uncategorized'}</p>
+                <p><strong>Description:</strong> {description or 'No description'}</p>
+                <p><strong>Priority:</strong> {priority}</p>
+                <p><strong>Status:</strong> {'Completed' if completed else 'Pending'}</p>
+                {f'<p><strong>Due Date:</strong> {due_date.strftime("%Y-%m-%d %H:%M")}</p>' if due_date else ''}
+                <p><strong>Category:</strong> {category or 'Uncategorized'}</p>
                 <hr>
                 <p>This is an automated notification from Todo Workshop App.</p>
             </body>
             </html>
             """
-            
-            msg = Message(
-                subject=subject,
-                recipients=[user.email],
-                html=body
-            )
-            
-            mail.send(msg)
-            
-            # Create notification record
-            notification = Notification(
-                todo_id=todo.id,
-                user_id=user.id,
-                message=subject,
-                type='email',
-                sent=True,
-                sent_at=datetime.utcnow()
-            )
-            db.session.add(notification)
-            db.session.commit()
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error sending email: {str(e)}")
-            # Create failed notification record
-            notification = Notification(
-                todo_id=todo.id,
-                user_id=user.id,
-                message=f"Failed to send: {subject}",
-                type='email',
-                sent=False
-            )
-            db.session.add(notification)
-            db.session.commit()
-            return False
-    
+        return subject, body
+
     @staticmethod
-    def send_bulk_notifications(todos, user, notification_type='due_soon'):
-        """Send bulk email notifications for multiple todos"""
-        if not os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
-            return False
-        
-        if not user.email_notifications_enabled:
-            return False
-        
-        try:
-            from flask import current_app
-            from flask_mail import Message
-            
-            subject = f"Reminder: {len(todos)} Todo(s) Due Soon"
-            
-            body = f"""
+    def render_bulk_notification(todos):
+        """Build the subject and HTML body for a multi-todo reminder email"""
+        subject = f"Reminder: {len(todos)} Todo(s) Due Soon"
+
+        body = f"""
             <html>
             <body>
                 <h2>Todo Reminders</h2>
                 <p>You have {len(todos)} todo(s) that are due soon:</p>
                 <ul>
             """
-            
-            for todo in todos:
-                body += f"""
+
+        for todo in todos:
+            body += f"""
                     <li>
                         <strong>{todo.title}</strong><br>
                         Due: {todo.due_date.strftime("%Y-%m-%d %H:%M") if todo.due_date else 'No due date'}<br>
                         Priority: {todo.priority}
                     </li>
                 """
-            
-            body += """
+
+        body += """
                 </ul>
                 <hr>
                 <p>This is an automated notification from Todo Workshop App.</p>
             </body>
             </html>
             """
-            
+        return subject, body
+
+    @staticmethod
+    def render_batch_notification(summary, changes):
+        """
+        Build the subject and HTML body for a batch of todo changes
+
+        Args:
+            summary: One-line description of the batch
+            changes: List of (todo_id, title, notification_type)
+        """
+        subject = f"Todo Batch Update: {summary}"
+
+        body = f"""
+            <html>
+            <body>
+                <h2>Todo Batch Update</h2>
+                <p>{summary}</p>
+                <ul>
+            """
+
+        for _, title, notification_type in changes:
+            body += f"""
+                    <li>{notification_type.capitalize()}: <strong>{title}</strong></li>
+                """
+
+        body += """
+                </ul>
+                <hr>
+                <p>This is an automated notification from Todo Workshop App.</p>
+            </body>
+            </html>
+            """
+        return subject, body
+
+    @staticmethod
+    def render_digest(entries):
+        """Build the subject and HTML body for a digest of queued emails"""
+        subject = f"{len(entries)} Todo Updates"
+
+        body = f"""
+            <html>
+            <body>
+                <h2>Todo Updates</h2>
+                <p>Here is what happened with your todos:</p>
+                <ul>
+            """
+
+        for entry in entries:
+            body += f"""
+                    <li>
+                        <strong>{entry.subject}</strong><br>
+                        {entry.created_at.strftime("%Y-%m-%d %H:%M")}
+                    </li>
+                """
+
+        body += """
+                </ul>
+                <hr>
+                <p>This is an automated notification from Todo Workshop App.</p>
+            </body>
+            </html>
+            """
+        return subject, body
+
+    @staticmethod
+    def enqueue(user, subject, body, notification_type, todo_id=None, hold=None):
+        """
+        Append an email to the outbox in the current transaction
+
+        The caller owns the commit, so the email is only queued if the
+        surrounding change is committed. In digest mode delivery is held
+        back for the digest window so later events can be merged in.
+
+        Args:
+            hold: Optional timedelta to hold delivery back for, if longer
+                than the digest window
+        """
+        delay = timedelta(seconds=DIGEST_WINDOW_SECONDS)
+        if hold is not None:
+            delay = max(delay, hold)
+        entry = EmailOutbox(
+            user_id=user.id,
+            todo_id=todo_id,
+            notification_type=notification_type,
+            recipient=user.email,
+            subject=subject,
+            body=body,
+            next_attempt_at=datetime.utcnow() + delay
+        )
+        db.session.add(entry)
+        return entry
+
+    @staticmethod
+    def send_todo_notification(todo, user, notification_type='created', coalesce_window=None):
+        """
+        Queue an email notification for a todo event
+
+        Args:
+            todo: Todo object
+            user: User object
+            notification_type: Type of notification (created, completed, due_soon, etc.)
+            coalesce_window: Optional timedelta; an email for the same todo
+                queued within it and not yet claimed by the worker is
+                rewritten in place instead of queueing another one
+
+        Returns:
+            The queued EmailOutbox entry, or None if email is disabled
+        """
+        if not EmailService.emails_enabled(user):
+            return None
+
+        subject, body = EmailService.render_todo_notification(todo, notification_type)
+        if not coalesce_window or todo.id is None:
+            return EmailService.enqueue(user, subject, body, notification_type, todo.id)
+
+        pending = db.session.query(EmailOutbox.id).filter(
+            EmailOutbox.user_id == user.id,
+            EmailOutbox.todo_id == todo.id,
+            EmailOutbox.status == 'pending',
+            EmailOutbox.created_at >= datetime.utcnow() - coalesce_window
+        ).order_by(EmailOutbox.id.desc()).limit(1).scalar()
+        if pending is not None:
+            # Conditional on status so an entry the worker claimed meanwhile
+            # is left alone and a new email is queued instead
+            updated = EmailOutbox.query.filter_by(id=pending, status='pending').update(
+                {'subject': subject, 'body': body, 'notification_type': notification_type},
+                synchronize_session=False
+            )
+            if updated:
+                return db.session.get(EmailOutbox, pending)
+
+        return EmailService.enqueue(user, subject, body, notification_type, todo.id, hold=coalesce_window)
+
+    @staticmethod
+    def send_bulk_notifications(todos, user, notification_type='due_soon'):
+        """Queue one email covering multiple todos"""
+        if not EmailService.emails_enabled(user):
+            return None
+
+        subject, body = EmailService.render_bulk_notification(todos)
+        return EmailService.enqueue(user, subject, body, notification_type)
+
+    @staticmethod
+    def send_batch_notification(user, summary, changes):
+        """Queue one email summarizing a batch of todo changes"""
+        if not EmailService.emails_enabled(user):
+            return None
+
+        subject, body = EmailService.render_batch_notification(summary, changes)
+        return EmailService.enqueue(user, subject, body, 'batch')
+
+    @staticmethod
+    def get_mail():
+        """Flask-Mail extension for the current app"""
+        mail = current_app.extensions.get('mail')
+        if mail is None:
+            mail = Mail(current_app)
+        return mail
+
+    @staticmethod
+    def deliver(entries):
+        """
+        Send queued outbox entries for one recipient over a pooled SMTP session
+
+        Several entries are merged into a single digest email when digest
+        mode is enabled, otherwise each is sent as its own message.
+
+        Raises:
+            Exception: Whatever the mail transport raises on failure
+        """
+        if DIGEST_WINDOW_SECONDS and len(entries) > 1:
+            subject, body = EmailService.render_digest(entries)
+            messages = [(subject, body)]
+        else:
+            messages = [(entry.subject, entry.body) for entry in entries]
+
+        mail = EmailService.get_mail()
+        for subject, body in messages:
             msg = Message(
                 subject=subject,
-                recipients=[user.email],
+                recipients=[entries[0].recipient],
                 html=body
             )
-            
-            # Use mail from app context
-            mail = current_app.extensions.get('mail')
-            if mail:
-                mail.send(msg)
-            else:
-                from flask_mail import Mail
-                mail = Mail(current_app)
-                mail.send(msg)
-            return True
-            
-        except Exception as e:
-            print(f"Error sending bulk email: {str(e)}")
-            return False
+            started = time.perf_counter()
+            result = 'error'
+            try:
+                smtp_pool.send(mail, msg)
+                result = 'sent'
+            finally:
+                metrics.inc('email_sends_total', (('result', result),))
+                metrics.observe('email_send_duration_seconds', (('result', result),), time.perf_counter() - started)
+
+    @staticmethod
+    def record_delivery(entry, success):
+        """Create the email Notification record for a delivered or failed entry"""
+        if entry.todo_id is None or not db.session.get(Todo, entry.todo_id):
+            return None
 
+        notification = Notification(
+            todo_id=entry.todo_id,
+            user_id=entry.user_id,
+            message=entry.subject if success else f"Failed to send: {entry.subject}",
+            type='email',
+            sent=success,
+            sent_at=datetime.utcnow() if success else None
+        )
+        db.session.add(notification)
+        return notification
@@ -0,0 +1,118 @@
+"""
+ETag service for conditional GETs on todo and notification reads
+"""
+from flask import make_response, request
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from backend.database import db
+from backend.models import ChangeCounter, Notification, Todo, User
+from backend.services.counters import increment
+import hashlib
+
+
+def _user_key(user_id):
+    """Map a user_id onto its change_counters key"""
+    return user_id or 0
+
+
+class ETagService:
+    """Service maintaining per-user change counters and deriving ETags from them"""
+
+    @staticmethod
+    def register_listeners():
+        """Bump change counters on ORM writes to todos, notifications and users"""
+        if not event.contains(Session, 'after_flush', ETagService._after_flush):
+            event.listen(Session, 'after_flush', ETagService._after_flush)
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        """Collect the users whose todos or notifications this flush wrote"""
+        touched = set()
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, User):
+                # One global counter lets other processes' user caches notice
+                if obj not in session.dirty or session.is_modified(obj):
+                    touched.add((0, 'users'))
+                continue
+            if isinstance(obj, Todo):
+                scope = 'todos'
+            elif isinstance(obj, Notification):
+                scope = 'notifications'
+            else:
+                continue
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            touched.add((_user_key(obj.user_id), scope))
+            # A todo moved between users changes both users' lists
+            history = inspect(obj).attrs.user_id.history
+            for old_user_id in history.deleted:
+                touched.add((_user_key(old_user_id), scope))
+
+        if touched:
+            ETagService._bump(session.connection(), touched)
+
+    @staticmethod
+    def _bump(conn, touched):
+        """Increment the counters for (user_key, scope) pairs"""
+        for user_key, scope in touched:
+            increment(
+                conn, ChangeCounter.__table__, {'user_id': user_key, 'scope': scope}, {'version': 1},
+                lambda: {'user_id': user_key, 'scope': scope, 'version': 1}
+            )
+
+    @staticmethod
+    def bump(user_id, scope):
+        """
+        Invalidate ETags after a bulk UPDATE/DELETE that bypassed the ORM
+
+        Runs in the current transaction; the caller commits.
+        """
+        ETagService._bump(db.session.connection(), {(_user_key(user_id), scope)})
+
+    @staticmethod
+    def collection_etag(scope, user_id=None):
+        """
+        ETag for a list read, varying with the request's query string
+
+        Args:
+            scope: 'todos' or 'notifications'
+            user_id: User whose counter to use, or None for all users
+        """
+        query = db.session.query(func.coalesce(func.sum(ChangeCounter.version), 0))\
+            .filter(ChangeCounter.scope == scope)
+        if user_id:
+            query = query.filter(ChangeCounter.user_id == user_id)
+        version = query.scalar()
+
+        digest = hashlib.sha1(request.query_string).hexdigest()[:12]
+        return f'{scope}-{user_id or "all"}-{version}-{digest}'
+
+    @staticmethod
+    def todo_etag(todo_id):
+        """
+        ETag for a single todo, from its updated_at timestamp
+
+        Returns:
+            The ETag, or None if the todo does not exist
+        """
+        updated_at = db.session.query(Todo.updated_at).filter(Todo.id == todo_id).scalar()
+        if updated_at is None:
+            return None
+        return f'todo-{todo_id}-{updated_at.timestamp():.6f}'
+
+    @staticmethod
+    def not_modified(etag):
+        """Whether the client's If-None-Match already covers this ETag"""
+        return etag is not None and request.if_none_match.contains(etag)
+
+    @staticmethod
+    def tag(response, etag):
+        """Attach the ETag and make browsers revalidate before reusing a response"""
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    @staticmethod
+    def not_modified_response(etag):
+        """Empty 304 response for a matching If-None-Match"""
+        return ETagService.tag(make_response('', 304), etag)
@@ -0,0 +1,115 @@
+"""
+In-process publish/subscribe hub for live notification streams
+"""
+import asyncio
+import queue
+import threading
+
+# Events buffered per subscriber before the stream is closed and the
+# client has to reconnect and replay from the database
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class NotificationBroker:
+    """
+    Fans out new notifications to the streams of the user they belong to
+
+    Subscribers only see events published by the same process; streams
+    pick up notifications created by other workers from the database.
+    """
+
+    def __init__(self):
+        self._subscribers = {}  # user_id -> set of queues
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, subscription=None):
+        """
+        Register a new stream for a user and return its event queue
+
+        Args:
+            user_id: User whose notifications the stream receives
+            subscription: Queue to register, such as an AsyncSubscription;
+                a new queue.Queue by default
+        """
+        if subscription is None:
+            subscription = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        """Remove a stream registered with subscribe()"""
+        with self._lock:
+            subscriptions = self._subscribers.get(user_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, event):
+        """
+        Deliver an event to every stream of a user
+
+        A subscriber that has fallen behind is sent None, which tells the
+        stream to close so the client reconnects and replays what it missed.
+        """
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                self.unsubscribe(user_id, subscription)
+                self._close(subscription)
+
+    @staticmethod
+    def _close(subscription):
+        """Make room for and enqueue the close marker"""
+        try:
+            subscription.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            subscription.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def subscriber_count(self):
+        """Number of open streams across all users"""
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+
+class AsyncSubscription:
+    """
+    Event queue for a stream served by an asyncio event loop
+
+    publish() is called from worker threads, so events are handed over
+    to the loop with call_soon_threadsafe() and read with await get().
+    """
+
+    def __init__(self, loop, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def put_nowait(self, event):
+        """Schedule delivery of an event; safe to call from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # Loop already closed, the stream is gone
+
+    def _put(self, event):
+        """Enqueue on the loop, closing the stream if it has fallen behind"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self):
+        """Wait for the next event; None means the stream should close"""
+        return await self.queue.get()
+
+
+notification_broker = NotificationBroker()
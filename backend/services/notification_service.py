@@ -2,54 +2,203 @@
 Notification service for managing browser and email notifications
 """
 from backend.database import db
-from backend.models import Notification, User, Todo
+from backend.fieldsets import NOTIFICATION_FIELDS, project, serializer
+from backend.models import Notification, ReminderLedger, User, Todo
 from backend.services.email_service import EmailService
+from backend.services.etag_service import ETagService
+from backend.services.notification_broker import notification_broker
+from backend.services.unread_service import UnreadService
+from sqlalchemy import and_, func
+from collections import Counter
 from datetime import datetime, timedelta
 import os
 
+# Todos due within this window get a due_soon reminder
+DUE_SOON_WINDOW = timedelta(hours=24)
+
+# Events for the same user and todo within this window update one pending
+# notification and email in place (0 disables)
+COALESCE_WINDOW = timedelta(seconds=int(os.getenv('NOTIFICATION_COALESCE_SECONDS', 0)))
+
 
 class NotificationService:
     """Service for managing all types of notifications"""
     
     @staticmethod
-    def create_notification(todo, user, notification_type='created', send_email=True):
+    def create_notification(todo, user, notification_type='created', send_email=True, commit=True):
         """
         Create and send notification for a todo event
         
+        With NOTIFICATION_COALESCE_SECONDS set, an unread notification for
+        the same todo created within the window is updated instead.
+        
         Args:
             todo: Todo object
             user: User object
             notification_type: Type of notification
             send_email: Whether to send email notification
+            commit: Commit and publish to open streams now; pass False to
+                add the rows to the caller's transaction, and call
+                publish() once it is committed
+        """
+        message = f"Todo {notification_type}: {todo.title}"
+        notification = None
+        if COALESCE_WINDOW and todo.id is not None:
+            notification = Notification.query.filter(
+                Notification.user_id == user.id,
+                Notification.type == 'browser',
+                Notification.sent == False,
+                Notification.created_at >= datetime.utcnow() - COALESCE_WINDOW,
+                Notification.todo_id == todo.id
+            ).order_by(Notification.created_at.desc()).first()
+
+        if notification is not None:
+            # Rewrite the unread notification for this todo in place; the
+            # window stays anchored at its created_at
+            notification.message = message
+        else:
+            # Create browser notification record
+            notification = Notification(
+                todo_id=todo.id,
+                user_id=user.id,
+                message=message,
+                type='browser',
+                sent=False
+            )
+            db.session.add(notification)
+        
+        # Queue email in the same transaction; OutboxWorker delivers it
+        if send_email and os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
+            EmailService.send_todo_notification(
+                todo, user, notification_type,
+                coalesce_window=COALESCE_WINDOW or None
+            )
+        
+        if commit:
+            db.session.commit()
+            NotificationService.publish(notification)
+        return notification
+    
+    @staticmethod
+    def create_batch_notification(user, changes, send_email=True, commit=True):
+        """
+        Create one notification summarizing many todo changes for a user
+
+        Args:
+            user: User object
+            changes: List of (todo_id, title, notification_type); todo_id
+                is None for deleted todos
+            send_email: Whether to send email notification
+            commit: As for create_notification()
         """
-        # Create browser notification record
+        counts = Counter(notification_type for _, _, notification_type in changes)
+        summary = ', '.join(f'{count} {notification_type}' for notification_type, count in counts.items())
+
         notification = Notification(
-            todo_id=todo.id,
+            todo_id=changes[0][0] if len(changes) == 1 else None,
             user_id=user.id,
-            message=f"Todo {notification_type}: {todo.title}",
+            message=f"Todos {summary}",
             type='browser',
             sent=False
         )
         db.session.add(notification)
-        
-        # Send email if enabled
+
         if send_email and os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
-            EmailService.send_todo_notification(todo, user, notification_type)
-        
-        db.session.commit()
+            EmailService.send_batch_notification(user, summary, changes)
+
+        if commit:
+            db.session.commit()
+            NotificationService.publish(notification)
         return notification
-    
+
+    @staticmethod
+    def publish(notification):
+        """Push a committed notification to the user's open streams"""
+        notification_broker.publish(notification.user_id, notification.to_dict())
+
     @staticmethod
-    def get_pending_notifications(user_id, limit=50):
-        """Get pending browser notifications for a user"""
-        notifications = Notification.query.filter_by(
+    def get_pending_notifications(user_id, limit=50, fields=None):
+        """
+        Get pending browser notifications for a user
+
+        Args:
+            user_id: User to fetch notifications for
+            limit: Maximum number of notifications
+            fields: Only load and return these fields, or None for all
+        """
+        query = Notification.query.filter_by(
             user_id=user_id,
             type='browser',
             sent=False
-        ).order_by(Notification.created_at.desc()).limit(limit).all()
+        )
+        serialize = Notification.to_dict
+        if fields:
+            query = project(query, NOTIFICATION_FIELDS, fields)
+            serialize = serializer(NOTIFICATION_FIELDS, fields)
         
-        return [n.to_dict() for n in notifications]
+        notifications = query.order_by(Notification.created_at.desc()).limit(limit).all()
+        return [serialize(n) for n in notifications]
     
+    @staticmethod
+    def get_notifications_after(user_id, last_id):
+        """
+        Browser notifications newer than last_id, oldest first, for
+        replaying what a reconnecting notification stream missed
+
+        Args:
+            user_id: User to fetch notifications for
+            last_id: Last notification id the client received
+        """
+        notifications = Notification.query.filter(
+            Notification.user_id == user_id,
+            Notification.type == 'browser',
+            Notification.id > last_id
+        ).order_by(Notification.id).all()
+        return [n.to_dict() for n in notifications]
+
+    @staticmethod
+    def latest_notification_id(user_id):
+        """Id of the user's newest browser notification, 0 if there is none"""
+        return db.session.query(func.max(Notification.id)).filter(
+            Notification.user_id == user_id,
+            Notification.type == 'browser'
+        ).scalar() or 0
+
+    @staticmethod
+    def mark_read(user_id, ids=None, up_to_id=None):
+        """
+        Mark a user's unread browser notifications as read in one UPDATE
+
+        Args:
+            user_id: User whose notifications to mark
+            ids: Only mark these notification ids
+            up_to_id: Only mark notifications with an id up to this one, so
+                notifications the client has not seen yet stay unread
+
+        Returns:
+            Number of notifications marked
+        """
+        query = Notification.query.filter(
+            Notification.user_id == user_id,
+            Notification.type == 'browser',
+            Notification.sent == False
+        )
+        if ids is not None:
+            query = query.filter(Notification.id.in_(ids))
+        if up_to_id is not None:
+            query = query.filter(Notification.id <= up_to_id)
+
+        marked = query.update(
+            {'sent': True, 'sent_at': datetime.utcnow()},
+            synchronize_session=False
+        )
+        if marked:
+            # The bulk UPDATE bypasses the flush listeners
+            UnreadService.adjust(user_id, -marked)
+            ETagService.bump(user_id, 'notifications')
+        db.session.commit()
+        return marked
+
     @staticmethod
     def mark_notification_sent(notification_id):
         """Mark a notification as sent"""
@@ -62,32 +211,72 @@ class NotificationService:
         return False
     
     @staticmethod
-    def check_due_todos():
-        """Check for todos that are due soon and send notifications"""
-        # Get todos due in next 24 hours
-        due_soon = datetime.utcnow() + timedelta(hours=24)
-        
-        todos = Todo.query.filter(
-            Todo.completed == False,
-            Todo.due_date.isnot(None),
-            Todo.due_date <= due_soon,
-            Todo.due_date > datetime.utcnow()
-        ).all()
-        
+    def check_due_todos(todo_ids=None, chunk_size=500):
+        """
+        Send reminders for todos due in the next 24 hours
+
+        A single query joins todos, users and the reminder ledger to find
+        todos that have not been reminded for their current due date. They
+        are processed in chunks of chunk_size, with one email per user per
+        chunk, and recorded in the ledger in the same transaction.
+
+        Args:
+            todo_ids: Only consider these todos, or None for all
+            chunk_size: Number of todos handled per transaction
+
+        Returns:
+            List of todo ids that were reminded
+        """
+        if not os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true':
+            return []
+
+        now = datetime.utcnow()
+        due_soon = now + DUE_SOON_WINDOW
+
+        query = db.session.query(Todo, User)\
+            .join(User, Todo.user_id == User.id)\
+            .outerjoin(ReminderLedger, and_(
+                ReminderLedger.todo_id == Todo.id,
+                ReminderLedger.due_date == Todo.due_date,
+                ReminderLedger.reminder_kind == 'due_soon'
+            ))\
+            .filter(
+                Todo.completed == False,
+                Todo.due_date.isnot(None),
+                Todo.due_date <= due_soon,
+                Todo.due_date > now,
+                User.email_notifications_enabled == True,
+                ReminderLedger.todo_id.is_(None)
+            )
+        if todo_ids is not None:
+            query = query.filter(Todo.id.in_(todo_ids))
+
         notifications_sent = []
-        for todo in todos:
-            if todo.user:
-                # Check if notification already sent
-                existing = Notification.query.filter_by(
-                    todo_id=todo.id,
-                    user_id=todo.user.id,
-                    type='email',
-                    message__like='%due soon%'
-                ).first()
-                
-                if not existing:
-                    EmailService.send_todo_notification(todo, todo.user, 'due_soon')
+        last_id = 0
+        while True:
+            rows = query.filter(Todo.id > last_id).order_by(Todo.id).limit(chunk_size).all()
+            if not rows:
+                break
+            last_id = rows[-1][0].id
+
+            by_user = {}
+            for todo, user in rows:
+                by_user.setdefault(user.id, (user, []))[1].append(todo)
+
+            for user, todos in by_user.values():
+                if len(todos) == 1:
+                    EmailService.send_todo_notification(todos[0], user, 'due_soon')
+                else:
+                    EmailService.send_bulk_notifications(todos, user, 'due_soon')
+                for todo in todos:
+                    db.session.add(ReminderLedger(
+                        todo_id=todo.id,
+                        due_date=todo.due_date,
+                        reminder_kind='due_soon',
+                        sent_at=now
+                    ))
                     notifications_sent.append(todo.id)
-        
-        return notifications_sent
 
+            db.session.commit()
+
+        return notifications_sent
@@ -0,0 +1,200 @@
+"""
+Background worker that drains the email outbox
+"""
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func
+from backend.database import db
+from backend.models import EmailOutbox
+from backend.services.email_service import DIGEST_WINDOW_SECONDS, EmailService, smtp_pool
+from datetime import datetime, timedelta
+import os
+import threading
+
+MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+BACKOFF_BASE_SECONDS = int(os.getenv('OUTBOX_BACKOFF_SECONDS', 30))
+BACKOFF_MAX_SECONDS = int(os.getenv('OUTBOX_BACKOFF_MAX_SECONDS', 3600))
+# How long a claimed entry stays reserved before another worker may retry it
+LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', 300))
+# Statuses of entries that still await delivery; sent and failed are final
+ACTIVE_STATUSES = ('pending', 'sending')
+
+
+def backoff_delay(attempts):
+    """Exponential backoff delay after the given number of failed attempts"""
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+class OutboxWorker:
+    """Delivers queued emails with a thread pool, retrying with backoff"""
+
+    def __init__(self, app, workers=4, batch_size=50, poll_interval=5.0):
+        """
+        Args:
+            app: Flask app providing config and database access
+            workers: Number of delivery threads
+            batch_size: Maximum entries claimed per poll
+            poll_interval: Seconds to sleep when the outbox is empty
+        """
+        self.app = app
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def claim(self):
+        """
+        Reserve a batch of due entries for this worker
+
+        Each entry is claimed with a conditional UPDATE so concurrent
+        workers never deliver the same entry twice. Entries left in
+        'sending' by a crashed worker become claimable once their lease
+        expires.
+        """
+        now = datetime.utcnow()
+        candidates = db.session.query(EmailOutbox.id).filter(
+            EmailOutbox.status.in_(['pending', 'sending']),
+            EmailOutbox.next_attempt_at <= now
+        ).order_by(EmailOutbox.next_attempt_at).limit(self.batch_size).all()
+
+        claimed = []
+        lease_until = now + timedelta(seconds=LEASE_SECONDS)
+        for (entry_id,) in candidates:
+            updated = EmailOutbox.query.filter(
+                EmailOutbox.id == entry_id,
+                EmailOutbox.status.in_(['pending', 'sending']),
+                EmailOutbox.next_attempt_at <= now
+            ).update({'status': 'sending', 'next_attempt_at': lease_until}, synchronize_session=False)
+            if updated:
+                claimed.append(entry_id)
+
+        if DIGEST_WINDOW_SECONDS and claimed:
+            # Pull the same users' other queued emails into this batch so
+            # they go out in one digest instead of waiting for their window
+            user_ids = db.session.query(EmailOutbox.user_id).filter(EmailOutbox.id.in_(claimed))
+            extra = db.session.query(EmailOutbox.id).filter(
+                EmailOutbox.user_id.in_(user_ids),
+                EmailOutbox.status == 'pending',
+                EmailOutbox.attempts == 0
+            ).all()
+            for (entry_id,) in extra:
+                updated = EmailOutbox.query.filter(
+                    EmailOutbox.id == entry_id,
+                    EmailOutbox.status == 'pending'
+                ).update({'status': 'sending', 'next_attempt_at': lease_until}, synchronize_session=False)
+                if updated:
+                    claimed.append(entry_id)
+
+        db.session.commit()
+        return claimed
+
+    def group(self, claimed):
+        """
+        Split claimed entry ids into delivery groups
+
+        In digest mode each user's entries form one group; otherwise every
+        entry is delivered and retried on its own.
+        """
+        if not DIGEST_WINDOW_SECONDS:
+            return [[entry_id] for entry_id in claimed]
+
+        groups = {}
+        rows = db.session.query(EmailOutbox.id, EmailOutbox.user_id)\
+            .filter(EmailOutbox.id.in_(claimed)).order_by(EmailOutbox.id)
+        for entry_id, user_id in rows:
+            groups.setdefault(user_id, []).append(entry_id)
+        return list(groups.values())
+
+    def process(self, entry_ids):
+        """Deliver one group of claimed entries and record the outcome"""
+        with self.app.app_context():
+            entries = EmailOutbox.query.filter(
+                EmailOutbox.id.in_(entry_ids),
+                EmailOutbox.status == 'sending'
+            ).order_by(EmailOutbox.id).all()
+            if not entries:
+                return 0
+
+            try:
+                EmailService.deliver(entries)
+            except Exception as e:
+                for entry in entries:
+                    entry.attempts += 1
+                    entry.last_error = str(e)[:500]
+                    if entry.attempts >= MAX_ATTEMPTS:
+                        entry.status = 'failed'
+                        EmailService.record_delivery(entry, success=False)
+                    else:
+                        entry.status = 'pending'
+                        entry.next_attempt_at = datetime.utcnow() + backoff_delay(entry.attempts)
+                db.session.commit()
+                print(f"Error sending email(s) {entry_ids}: {str(e)}")
+                return 0
+
+            now = datetime.utcnow()
+            for entry in entries:
+                entry.attempts += 1
+                entry.status = 'sent'
+                entry.sent_at = now
+                entry.last_error = None
+                EmailService.record_delivery(entry, success=True)
+            db.session.commit()
+            return len(entries)
+
+    def drain_once(self):
+        """
+        Claim and deliver one batch
+
+        Returns:
+            Number of entries delivered successfully
+        """
+        with self.app.app_context():
+            claimed = self.claim()
+            groups = self.group(claimed) if claimed else []
+        if not groups:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return sum(pool.map(self.process, groups))
+
+    def run(self):
+        """Drain the outbox until stop() is called"""
+        while not self._stop.is_set():
+            try:
+                delivered = self.drain_once()
+            except Exception as e:
+                print(f"Outbox worker error: {str(e)}")
+                delivered = 0
+            if not delivered:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        """Run the worker in a daemon thread inside this process"""
+        thread = threading.Thread(target=self.run, name='outbox-worker', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """Ask a running worker to exit after its current batch"""
+        self._stop.set()
+        smtp_pool.close_all()
+
+    @staticmethod
+    def depth():
+        """Number of entries waiting to be delivered"""
+        return EmailOutbox.query.filter(EmailOutbox.status.in_(ACTIVE_STATUSES)).count()
+
+    @staticmethod
+    def depth_by_status():
+        """
+        Number of entries waiting to be delivered, per status
+
+        Sent and failed entries only accumulate, so they are left out to
+        keep this cheap enough to run on every scrape.
+        """
+        counts = dict(
+            db.session.query(EmailOutbox.status, func.count())
+            .filter(EmailOutbox.status.in_(ACTIVE_STATUSES))
+            .group_by(EmailOutbox.status)
+            .all()
+        )
+        return {status: counts.get(status, 0) for status in ACTIVE_STATUSES}
@@ -0,0 +1,225 @@
+"""
+In-process scheduler that fires due-soon reminders on time
+"""
+from backend.database import db
+from backend.models import Todo
+from backend.services.notification_service import DUE_SOON_WINDOW, NotificationService
+from datetime import datetime, timedelta
+import heapq
+import os
+import threading
+
+# Upper bound on a single sleep so clock adjustments are picked up
+MAX_WAIT_SECONDS = 300
+# Only reminders firing within this window are kept in memory; the window
+# is refilled from the database once half of it has passed
+HORIZON = timedelta(hours=float(os.getenv('REMINDER_HORIZON_HOURS', 6)))
+# Delay before retrying reminders that failed to send, doubling per attempt
+RETRY_BASE_SECONDS = int(os.getenv('REMINDER_RETRY_SECONDS', 30))
+RETRY_MAX_SECONDS = int(os.getenv('REMINDER_RETRY_MAX_SECONDS', 3600))
+
+
+def retry_delay(attempts):
+    """Backoff delay after the given number of failed sends"""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+class ReminderScheduler:
+    """
+    Keeps a heap of upcoming reminder times and fires them as they come due
+
+    A todo's reminder fires when it enters the DUE_SOON_WINDOW before its
+    due date. Only reminders firing before horizon_end are held in the
+    heap; refill() loads the next stretch of the todos table before the
+    scheduler gets there. In-process, the todo routes report changes
+    through todo_changed()/cancel(); the standalone command instead
+    rescans recently updated todos. Reminders that fail to send are
+    retried with backoff until their todo is due.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._heap = []  # (fire_at, todo_id, due_date)
+        self._scheduled = {}  # todo_id -> due_date of its live heap entry
+        self._failures = {}  # todo_id -> failed sends for its current due_date
+        self.horizon_end = None
+        self._refill_at = None
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    @property
+    def running(self):
+        """Whether the scheduler has been started"""
+        return self._running
+
+    def schedule(self, todo_id, due_date, completed=False):
+        """
+        Schedule (or reschedule) the reminder for a todo
+
+        Superseded heap entries are left in place and skipped when popped.
+        Does nothing until the scheduler has been started.
+        """
+        if not self._running:
+            return
+        with self._cond:
+            if self._scheduled.get(todo_id) == due_date and not completed:
+                return
+            self._scheduled.pop(todo_id, None)
+            self._failures.pop(todo_id, None)
+            if due_date is None or completed:
+                return
+            fire_at = due_date - DUE_SOON_WINDOW
+            if fire_at <= self.horizon_end:  # Otherwise refill() loads it later
+                self._push(fire_at, todo_id, due_date)
+
+    def _push(self, fire_at, todo_id, due_date):
+        """Add a live heap entry and wake the scheduler thread"""
+        self._scheduled[todo_id] = due_date
+        heapq.heappush(self._heap, (fire_at, todo_id, due_date))
+        self._cond.notify()
+
+    def todo_changed(self, todo):
+        """Reschedule after a todo was created or updated"""
+        self.schedule(todo.id, todo.due_date, todo.completed)
+
+    def cancel(self, todo_id):
+        """Drop the reminder for a deleted todo"""
+        if not self._running:
+            return
+        with self._cond:
+            self._scheduled.pop(todo_id, None)
+            self._failures.pop(todo_id, None)
+
+    def rescan(self, since=None):
+        """
+        Load reminder times from the database
+
+        Args:
+            since: Only pick up todos updated after this time, or None to
+                load every pending todo whose reminder fires before the
+                horizon ends
+        """
+        query = db.session.query(Todo.id, Todo.due_date, Todo.completed)
+        if since is None:
+            query = query.filter(
+                Todo.completed == False,
+                Todo.due_date > datetime.utcnow(),
+                Todo.due_date <= self.horizon_end + DUE_SOON_WINDOW
+            )
+        else:
+            query = query.filter(Todo.updated_at > since)
+
+        for todo_id, due_date, completed in query.yield_per(1000):
+            self.schedule(todo_id, due_date, completed)
+
+    def refill(self, now=None):
+        """Extend the horizon to HORIZON from now and load the todos it adds"""
+        now = now or datetime.utcnow()
+        with self._cond:
+            # Widen first so todos changed during the query are kept too
+            start, self.horizon_end = self.horizon_end, now + HORIZON
+        try:
+            query = db.session.query(Todo.id, Todo.due_date)\
+                .filter(
+                    Todo.completed == False,
+                    Todo.due_date > start + DUE_SOON_WINDOW,
+                    Todo.due_date <= self.horizon_end + DUE_SOON_WINDOW
+                )
+            for todo_id, due_date in query.yield_per(1000):
+                self.schedule(todo_id, due_date)
+        except Exception:
+            with self._cond:
+                self.horizon_end = start
+            raise
+        self._refill_at = self.horizon_end - HORIZON / 2
+
+    def _pop_due(self, now):
+        """Remove and return {todo_id: due_date} of reminders whose time has passed"""
+        due = {}
+        while self._heap and self._heap[0][0] <= now:
+            _, todo_id, due_date = heapq.heappop(self._heap)
+            if self._scheduled.get(todo_id) == due_date:
+                del self._scheduled[todo_id]
+                due[todo_id] = due_date
+        return due
+
+    def _run(self):
+        """Sleep until the next reminder is due or the horizon needs a refill"""
+        while True:
+            with self._cond:
+                while self._running:
+                    now = datetime.utcnow()
+                    due = self._pop_due(now)
+                    if due or now >= self._refill_at:
+                        break
+                    timeout = min(MAX_WAIT_SECONDS, (self._refill_at - now).total_seconds())
+                    if self._heap:
+                        timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+                    self._cond.wait(timeout=max(timeout, 0))
+                if not self._running:
+                    return
+            if due:
+                self.fire(due)
+            else:
+                self._refill_safely()
+
+    def _refill_safely(self):
+        """refill() for the scheduler thread, which must survive database errors"""
+        try:
+            with self.app.app_context():
+                self.refill()
+        except Exception as e:
+            print(f"Error loading reminders: {str(e)}")
+            self._refill_at = datetime.utcnow() + retry_delay(1)
+
+    def fire(self, due):
+        """
+        Send due_soon reminders, re-queueing them with backoff on failure
+
+        Args:
+            due: Dict of todo_id -> due_date popped from the heap
+        """
+        try:
+            with self.app.app_context():
+                NotificationService.check_due_todos(todo_ids=list(due))
+        except Exception as e:
+            print(f"Error sending reminders: {str(e)}")
+            self._retry(due, datetime.utcnow())
+            return
+        with self._cond:
+            for todo_id in due:
+                self._failures.pop(todo_id, None)
+
+    def _retry(self, due, now):
+        """Re-queue failed reminders whose todos are not yet due"""
+        with self._cond:
+            for todo_id, due_date in due.items():
+                if todo_id in self._scheduled:
+                    continue  # Rescheduled while sending
+                attempts = self._failures[todo_id] = self._failures.get(todo_id, 0) + 1
+                retry_at = now + retry_delay(attempts)
+                if retry_at < due_date:
+                    self._push(retry_at, todo_id, due_date)
+                else:
+                    del self._failures[todo_id]
+
+    def start(self, app):
+        """Load upcoming reminders and start the scheduler thread"""
+        self.app = app
+        self.horizon_end = datetime.utcnow() + HORIZON
+        self._refill_at = self.horizon_end - HORIZON / 2
+        self._running = True
+        with app.app_context():
+            self.rescan()
+        self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler thread"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+
+reminder_scheduler = ReminderScheduler()
@@ -0,0 +1,143 @@
+"""
+Retention policy for the notifications table
+"""
+from sqlalchemy import func, select
+from backend.database import db
+from backend.models import Notification, NotificationArchive
+from backend.services.etag_service import ETagService
+from backend.services.unread_service import UnreadService
+from collections import Counter
+from datetime import datetime, timedelta
+import os
+import threading
+import time
+
+# Sent notifications older than this are pruned (0 disables)
+RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 30))
+# Unsent notifications older than this are pruned too (0 disables)
+UNSENT_RETENTION_DAYS = int(os.getenv('NOTIFICATION_UNSENT_RETENTION_DAYS', 180))
+# Sent notifications kept per user beyond which the oldest are pruned (0 disables)
+MAX_PER_USER = int(os.getenv('NOTIFICATION_MAX_PER_USER', 500))
+# Move pruned notifications to notifications_archive instead of deleting them
+ARCHIVE = os.getenv('NOTIFICATION_ARCHIVE', 'True').lower() == 'true'
+PRUNE_BATCH_SIZE = int(os.getenv('NOTIFICATION_PRUNE_BATCH_SIZE', 500))
+
+ARCHIVED_COLUMNS = ('id', 'todo_id', 'user_id', 'message', 'type', 'sent', 'sent_at', 'created_at')
+
+
+class RetentionService:
+    """
+    Prunes sent notifications by age and per-user count
+
+    Unread notifications are only pruned once they are older than the much
+    longer unsent retention period. Rows are removed in chunks of
+    batch_size, each in its own short transaction, so the table is never
+    locked for long.
+    """
+
+    @staticmethod
+    def _remove(ids, archive):
+        """Archive (optionally) and delete one chunk of notifications"""
+        notifications = Notification.__table__
+        if archive:
+            archived = NotificationArchive.__table__
+            columns = [notifications.c[name] for name in ARCHIVED_COLUMNS]
+            db.session.execute(
+                archived.insert()
+                .from_select(ARCHIVED_COLUMNS, select(*columns).where(notifications.c.id.in_(ids)))
+            )
+        db.session.execute(notifications.delete().where(notifications.c.id.in_(ids)))
+
+    @staticmethod
+    def _prune_chunks(select_chunk, archive, pause):
+        """
+        Remove chunks until select_chunk() comes back empty
+
+        Returns:
+            Number of notifications removed
+        """
+        removed = 0
+        while True:
+            rows = select_chunk()
+            if not rows:
+                return removed
+            RetentionService._remove([row.id for row in rows], archive)
+            # The bulk delete bypasses the ORM hook that keeps unread counts
+            unread = Counter(row.user_id for row in rows if row.type == 'browser' and not row.sent)
+            for user_id, count in unread.items():
+                UnreadService.adjust(user_id, -count)
+            for user_id in {row.user_id for row in rows}:
+                ETagService.bump(user_id, 'notifications')
+            db.session.commit()
+            removed += len(rows)
+            if pause:
+                time.sleep(pause)
+
+    @staticmethod
+    def prune(retention_days=RETENTION_DAYS, max_per_user=MAX_PER_USER,
+              archive=ARCHIVE, batch_size=PRUNE_BATCH_SIZE, pause=0,
+              unsent_retention_days=UNSENT_RETENTION_DAYS):
+        """
+        Apply the retention policy
+
+        Args:
+            retention_days: Prune sent notifications older than this (0 to skip)
+            max_per_user: Keep at most this many sent notifications per user (0 to skip)
+            archive: Copy pruned rows to notifications_archive before deleting
+            batch_size: Rows removed per transaction
+            pause: Seconds to sleep between chunks to let other writers in
+            unsent_retention_days: Prune unsent notifications older than this (0 to skip)
+
+        Returns:
+            Dict with the number of notifications pruned by age, by cap and
+            unsent by age
+        """
+        result = {'expired': 0, 'over_cap': 0, 'expired_unsent': 0, 'archived': archive}
+        candidates = db.session.query(
+            Notification.id, Notification.user_id, Notification.type, Notification.sent
+        )
+        sent = candidates.filter(Notification.sent == True)
+
+        if retention_days:
+            cutoff = datetime.utcnow() - timedelta(days=retention_days)
+            expired = sent.filter(Notification.created_at < cutoff)\
+                .order_by(Notification.id).limit(batch_size)
+            result['expired'] = RetentionService._prune_chunks(expired.all, archive, pause)
+
+        if max_per_user:
+            over_cap = db.session.query(Notification.user_id)\
+                .filter(Notification.sent == True)\
+                .group_by(Notification.user_id)\
+                .having(func.count(Notification.id) > max_per_user)\
+                .all()
+            for (user_id,) in over_cap:
+                # Everything past the newest max_per_user rows; deleting a
+                # chunk moves the next-oldest rows into the same window
+                oldest = sent.filter(Notification.user_id == user_id)\
+                    .order_by(Notification.created_at.desc(), Notification.id.desc())\
+                    .offset(max_per_user).limit(batch_size)
+                result['over_cap'] += RetentionService._prune_chunks(oldest.all, archive, pause)
+
+        if unsent_retention_days:
+            cutoff = datetime.utcnow() - timedelta(days=unsent_retention_days)
+            expired = candidates.filter(Notification.sent == False, Notification.created_at < cutoff)\
+                .order_by(Notification.id).limit(batch_size)
+            result['expired_unsent'] = RetentionService._prune_chunks(expired.all, archive, pause)
+
+        return result
+
+    @staticmethod
+    def start(app, interval):
+        """Run prune() every interval seconds from a daemon thread"""
+        def run():
+            while True:
+                try:
+                    with app.app_context():
+                        RetentionService.prune()
+                except Exception as e:
+                    print(f"Error pruning notifications: {str(e)}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name='notification-pruner', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,141 @@
+"""
+Full-text search service for todo titles and descriptions
+"""
+from flask import current_app
+from sqlalchemy import column, func, literal_column, table, text
+from sqlalchemy.exc import OperationalError
+from backend.database import db
+from backend.models import Todo
+import re
+
+# External-content FTS5 table mirroring todos(title, description)
+_todos_fts = table('todos_fts', column('rowid'), column('rank'))
+
+_SQLITE_SETUP = [
+    """
+    CREATE VIRTUAL TABLE todos_fts USING fts5(
+        title, description, content='todos', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_ai AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_ad AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_au AFTER UPDATE OF title, description ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+_POSTGRES_SETUP = """
+    CREATE INDEX IF NOT EXISTS ix_todos_search ON todos USING GIN (
+        to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))
+    )
+"""
+
+
+class SearchService:
+    """Service for full-text search over todos"""
+
+    @staticmethod
+    def setup():
+        """
+        Create the search index for the current database
+
+        Uses an FTS5 virtual table kept in sync by triggers on SQLite and a
+        GIN expression index on Postgres. Other databases (or SQLite builds
+        without FTS5) fall back to LIKE matching.
+        """
+        dialect = db.engine.dialect.name
+        backend = 'like'
+
+        if dialect == 'sqlite':
+            try:
+                with db.engine.begin() as conn:
+                    exists = conn.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='todos_fts'"
+                    )).first()
+                    if not exists:
+                        conn.execute(text(_SQLITE_SETUP[0]))
+                    for statement in _SQLITE_SETUP[1:]:
+                        conn.execute(text(statement))
+                    if not exists:
+                        # Index rows that were created before search existed
+                        conn.execute(text("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')"))
+                backend = 'fts5'
+            except OperationalError as e:
+                print(f"FTS5 unavailable, falling back to LIKE search: {str(e)}")
+        elif dialect == 'postgresql':
+            with db.engine.begin() as conn:
+                conn.execute(text(_POSTGRES_SETUP))
+            backend = 'postgres'
+
+        current_app.extensions['search_backend'] = backend
+        return backend
+
+    @staticmethod
+    def rebuild():
+        """Rebuild the search index from the todos table"""
+        backend = current_app.extensions.get('search_backend', 'like')
+        if backend == 'fts5':
+            db.session.execute(text("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')"))
+            db.session.commit()
+        elif backend == 'postgres':
+            db.session.execute(text('REINDEX INDEX ix_todos_search'))
+            db.session.commit()
+        return backend
+
+    @staticmethod
+    def _terms(search):
+        """Split a raw search string into word tokens"""
+        return re.findall(r'\w+', search, flags=re.UNICODE)
+
+    @staticmethod
+    def apply(query, search):
+        """
+        Restrict a Todo query to rows matching a search string
+
+        Every word must match, and each word is treated as a prefix.
+
+        Args:
+            query: Todo query to filter
+            search: Raw search string from the client
+
+        Returns:
+            Tuple of (filtered query, rank expression to order by or None)
+        """
+        backend = current_app.extensions.get('search_backend', 'like')
+        terms = SearchService._terms(search)
+
+        if backend == 'fts5' and terms:
+            match = ' '.join('"{}"*'.format(term) for term in terms)
+            query = query.join(_todos_fts, _todos_fts.c.rowid == Todo.id)\
+                .filter(literal_column('todos_fts').op('MATCH')(match))
+            return query, _todos_fts.c.rank
+
+        if backend == 'postgres' and terms:
+            document = func.to_tsvector(
+                'english',
+                func.coalesce(Todo.title, '') + ' ' + func.coalesce(Todo.description, '')
+            )
+            ts_query = func.to_tsquery('english', ' & '.join(f'{term}:*' for term in terms))
+            query = query.filter(document.op('@@')(ts_query))
+            return query, func.ts_rank(document, ts_query).desc()
+
+        query = query.filter(
+            (Todo.title.contains(search)) |
+            (Todo.description.contains(search))
+        )
+        return query, None
@@ -0,0 +1,92 @@
+"""
+Pool of long-lived SMTP connections
+"""
+from contextlib import contextmanager
+import queue
+import smtplib
+import threading
+import time
+
+
+class SMTPConnectionPool:
+    """Keeps Flask-Mail connections open and reuses them across messages"""
+
+    def __init__(self, size=4, idle_timeout=60):
+        """
+        Args:
+            size: Maximum number of idle connections kept open
+            idle_timeout: Seconds after which an idle connection is closed
+                instead of reused
+        """
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def _open(self, mail):
+        """Open a new SMTP session through Flask-Mail"""
+        conn = mail.connect()
+        conn.__enter__()
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    @staticmethod
+    def _close(conn):
+        """Close a session, ignoring errors from already-dead sockets"""
+        try:
+            conn.__exit__(None, None, None)
+        except Exception:
+            pass
+
+    def _checkout(self, mail):
+        """Take a fresh-enough idle connection, or open a new one"""
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open(mail)
+            if conn.mail is mail and time.monotonic() - last_used < self.idle_timeout:
+                return conn
+            self._close(conn)
+
+    def _checkin(self, conn):
+        """Return a healthy connection to the pool"""
+        if self._idle.qsize() >= self.size:
+            self._close(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self, mail):
+        """
+        Borrow a connection for one or more sends
+
+        Connections that raise are closed rather than returned to the pool.
+        """
+        conn = self._checkout(mail)
+        try:
+            yield conn
+        except Exception:
+            self._close(conn)
+            raise
+        self._checkin(conn)
+
+    def send(self, mail, message):
+        """Send a message, reconnecting once if the server dropped the session"""
+        try:
+            with self.connection(mail) as conn:
+                conn.send(message)
+        except smtplib.SMTPServerDisconnected:
+            with self.connection(mail) as conn:
+                conn.send(message)
+
+    def close_all(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn)
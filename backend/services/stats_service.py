@@ -0,0 +1,206 @@
+"""
+Materialized todo statistics service
+"""
+from collections import Counter, defaultdict
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from backend.database import db
+from backend.models import Todo, TodoStats
+from backend.services.counters import increment, previous
+from datetime import datetime
+
+PRIORITIES = ('low', 'medium', 'high')
+COUNTER_COLUMNS = [
+    f'{state}_{priority}'
+    for state in ('pending', 'completed')
+    for priority in PRIORITIES + ('other',)
+]
+
+
+def _stats_key(user_id):
+    """Map a todo's user_id onto its todo_stats primary key"""
+    return user_id or 0
+
+
+def _counter_column(completed, priority):
+    """Name of the counter column a todo with these values belongs to"""
+    state = 'completed' if completed else 'pending'
+    bucket = priority if priority in PRIORITIES else 'other'
+    return f'{state}_{bucket}'
+
+
+class StatsService:
+    """Service maintaining per-user todo counters in the todo_stats table"""
+
+    @staticmethod
+    def register_listeners():
+        """Keep todo_stats in sync with ORM inserts, updates and deletes of Todo"""
+        if not event.contains(Session, 'after_flush', StatsService._after_flush):
+            event.listen(Session, 'after_flush', StatsService._after_flush)
+
+    @staticmethod
+    def setup():
+        """Backfill todo_stats for databases that predate it"""
+        if not TodoStats.query.first() and Todo.query.first():
+            StatsService.reconcile()
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        """
+        Apply counter deltas for the todos written in this flush
+
+        Bulk query.update()/delete() calls bypass this hook; run
+        StatsService.reconcile() after using them.
+        """
+        deltas = defaultdict(Counter)
+        touched = set()
+
+        for obj in session.new:
+            if isinstance(obj, Todo):
+                key = _stats_key(obj.user_id)
+                deltas[key][_counter_column(obj.completed, obj.priority)] += 1
+                touched.add(key)
+
+        for obj in session.deleted:
+            if isinstance(obj, Todo):
+                key = _stats_key(previous(obj, 'user_id'))
+                column = _counter_column(previous(obj, 'completed'), previous(obj, 'priority'))
+                deltas[key][column] -= 1
+                touched.add(key)
+
+        for obj in session.dirty:
+            if not isinstance(obj, Todo) or not session.is_modified(obj):
+                continue
+            old_key = _stats_key(previous(obj, 'user_id'))
+            new_key = _stats_key(obj.user_id)
+            old_column = _counter_column(previous(obj, 'completed'), previous(obj, 'priority'))
+            new_column = _counter_column(obj.completed, obj.priority)
+            if (old_key, old_column) != (new_key, new_column):
+                deltas[old_key][old_column] -= 1
+                deltas[new_key][new_column] += 1
+            touched.update((old_key, new_key))
+
+        if touched:
+            StatsService._apply_deltas(session.connection(), deltas, touched)
+
+    @staticmethod
+    def _apply_deltas(conn, deltas, touched):
+        """Increment counters in place, seeding rows that do not exist yet"""
+        for key in touched:
+            changed = {column: delta for column, delta in deltas[key].items() if delta}
+            if changed:
+                increment(
+                    conn, TodoStats.__table__, {'user_id': key}, changed,
+                    lambda: StatsService._count(conn, [key])[key]
+                )
+
+    @staticmethod
+    def _count(conn, keys=None):
+        """
+        Count todos per stats key straight from the todos table
+
+        Args:
+            conn: Connection to query on
+            keys: Stats keys to count, or None for every user
+
+        Returns:
+            Dict mapping stats key to a full todo_stats row
+        """
+        user_key = func.coalesce(Todo.user_id, 0)
+        query = db.select(user_key, Todo.completed, Todo.priority, func.count())\
+            .group_by(user_key, Todo.completed, Todo.priority)
+        if keys is not None:
+            query = query.where(user_key.in_(keys))
+
+        rows = {}
+        for key in keys or []:
+            rows[key] = StatsService._empty_row(key)
+        for key, completed, priority, count in conn.execute(query):
+            row = rows.setdefault(key, StatsService._empty_row(key))
+            row[_counter_column(completed, priority)] += count
+        return rows
+
+    @staticmethod
+    def _empty_row(key):
+        """A todo_stats row with every counter at zero"""
+        row = {column: 0 for column in COUNTER_COLUMNS}
+        row['user_id'] = key
+        return row
+
+    @staticmethod
+    def _count_overdue(user_id=None):
+        """
+        Count pending todos past their due date
+
+        Overdue depends on the clock rather than on writes, so it is
+        counted when read instead of being stored with the counters.
+        """
+        query = db.session.query(func.count(Todo.id))\
+            .filter(Todo.completed == False, Todo.due_date < datetime.utcnow())
+        if user_id:
+            query = query.filter(Todo.user_id == user_id)
+        return query.scalar()
+
+    @staticmethod
+    def get_stats(user_id=None):
+        """
+        Get todo statistics from the materialized counters
+
+        Args:
+            user_id: User to report on, or None for all todos
+        """
+        if user_id:
+            row = db.session.get(TodoStats, user_id)
+            rows = [row] if row else []
+        else:
+            rows = TodoStats.query.all()
+
+        totals = Counter()
+        for row in rows:
+            for column in COUNTER_COLUMNS:
+                totals[column] += getattr(row, column)
+
+        completed = sum(totals[f'completed_{p}'] for p in PRIORITIES + ('other',))
+        pending = sum(totals[f'pending_{p}'] for p in PRIORITIES + ('other',))
+        return {
+            'total': completed + pending,
+            'completed': completed,
+            'pending': pending,
+            'high_priority': totals['pending_high'],
+            'medium_priority': totals['pending_medium'],
+            'low_priority': totals['pending_low'],
+            'overdue': StatsService._count_overdue(user_id)
+        }
+
+    @staticmethod
+    def reconcile(user_id=None):
+        """
+        Recompute todo_stats from the todos table to repair drift
+
+        Args:
+            user_id: Only reconcile this user, or None for every user
+
+        Returns:
+            Number of rows that were corrected
+        """
+        keys = [_stats_key(user_id)] if user_id else None
+        expected = StatsService._count(db.session.connection(), keys)
+
+        existing = TodoStats.query
+        if keys is not None:
+            existing = existing.filter(TodoStats.user_id.in_(keys))
+
+        corrected = 0
+        for row in existing.all():
+            values = expected.pop(row.user_id, None) or StatsService._empty_row(row.user_id)
+            if any(getattr(row, column) != values[column] for column in COUNTER_COLUMNS):
+                corrected += 1
+            for column, value in values.items():
+                setattr(row, column, value)
+
+        for values in expected.values():
+            db.session.add(TodoStats(**values))
+            corrected += 1
+
+        db.session.commit()
+        return corrected
@@ -0,0 +1,91 @@
+"""
+Tag service for normalized todo tags
+"""
+from sqlalchemy import func
+from backend.database import db, dialect_insert
+from backend.models import Tag, Todo, todo_tags
+
+MAX_TAG_LENGTH = 50
+
+
+class TagService:
+    """Service for resolving tag names and filtering todos by tag"""
+
+    @staticmethod
+    def parse(value):
+        """
+        Normalize tags from a list or comma-separated string
+
+        Names are stripped, truncated to the column length and deduplicated
+        in their original order.
+        """
+        if not value:
+            return []
+        if isinstance(value, str):
+            value = value.split(',')
+
+        names = []
+        for name in value:
+            name = str(name).strip()[:MAX_TAG_LENGTH]
+            if name and name not in names:
+                names.append(name)
+        return names
+
+    @staticmethod
+    def resolve(names, cache=None):
+        """
+        Get Tag objects for these names, creating the missing ones
+
+        Missing tags are inserted with ON CONFLICT DO NOTHING and read back,
+        so a concurrent request creating the same name does not fail on the
+        unique constraint.
+
+        Args:
+            names: Normalized tag names
+            cache: Optional dict of name -> Tag shared across calls, so a
+                batch only looks up each name once
+        """
+        if not names:
+            return []
+
+        existing = cache if cache is not None else {}
+        unknown = [name for name in names if name not in existing]
+        if unknown:
+            existing.update((tag.name, tag) for tag in Tag.query.filter(Tag.name.in_(unknown)))
+        missing = [name for name in unknown if name not in existing]
+        if missing:
+            conn = db.session.connection()
+            tags = Tag.__table__
+            conn.execute(
+                dialect_insert(conn, tags)
+                .values([{'name': name} for name in missing])
+                .on_conflict_do_nothing(index_elements=[tags.c.name])
+            )
+            existing.update((tag.name, tag) for tag in Tag.query.filter(Tag.name.in_(missing)))
+        return [existing[name] for name in names]
+
+    @staticmethod
+    def filter(query, names, mode='any'):
+        """
+        Restrict a Todo query to todos carrying the given tags
+
+        Args:
+            query: Todo query to filter
+            names: Tag names to match
+            mode: 'any' to match todos with at least one of the tags,
+                'all' to require every tag
+
+        Raises:
+            ValueError: If mode is not 'any' or 'all'
+        """
+        if mode not in ('any', 'all'):
+            raise ValueError("tag_mode must be 'any' or 'all'")
+
+        matching = db.session.query(todo_tags.c.todo_id)\
+            .join(Tag, Tag.id == todo_tags.c.tag_id)\
+            .filter(Tag.name.in_(names))
+        if mode == 'all':
+            matching = matching.group_by(todo_tags.c.todo_id)\
+                .having(func.count(Tag.id) == len(names))
+
+        return query.filter(Todo.id.in_(matching))
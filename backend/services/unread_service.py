@@ -0,0 +1,131 @@
+"""
+Materialized unread notification counts
+"""
+from collections import Counter
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from backend.database import db
+from backend.models import Notification, UnreadCount
+from backend.services.counters import increment, previous
+
+
+def _is_unread(notification_type, sent):
+    """Whether a notification with these values shows up in the badge"""
+    return notification_type == 'browser' and not sent
+
+
+class UnreadService:
+    """Service maintaining per-user unread browser notification counts"""
+
+    @staticmethod
+    def register_listeners():
+        """Keep unread_counts in sync with ORM writes of Notification"""
+        if not event.contains(Session, 'after_flush', UnreadService._after_flush):
+            event.listen(Session, 'after_flush', UnreadService._after_flush)
+
+    @staticmethod
+    def setup():
+        """Backfill unread_counts for databases that predate it"""
+        if not UnreadCount.query.first() and Notification.query.first():
+            UnreadService.reconcile()
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        """
+        Apply count deltas for the notifications written in this flush
+
+        Bulk query.update()/delete() calls bypass this hook and must call
+        UnreadService.adjust() themselves.
+        """
+        deltas = Counter()
+        touched = set()
+
+        for obj in session.new:
+            if isinstance(obj, Notification):
+                deltas[obj.user_id] += _is_unread(obj.type, obj.sent)
+                touched.add(obj.user_id)
+
+        for obj in session.deleted:
+            if isinstance(obj, Notification):
+                user_id = previous(obj, 'user_id')
+                deltas[user_id] -= _is_unread(previous(obj, 'type'), previous(obj, 'sent'))
+                touched.add(user_id)
+
+        for obj in session.dirty:
+            if not isinstance(obj, Notification) or not session.is_modified(obj):
+                continue
+            old_user = previous(obj, 'user_id')
+            deltas[old_user] -= _is_unread(previous(obj, 'type'), previous(obj, 'sent'))
+            deltas[obj.user_id] += _is_unread(obj.type, obj.sent)
+            touched.update((old_user, obj.user_id))
+
+        touched = {user_id for user_id in touched if deltas[user_id]}
+        if touched:
+            UnreadService._apply_deltas(session.connection(), deltas, touched)
+
+    @staticmethod
+    def _apply_deltas(conn, deltas, touched):
+        """Increment counts in place, seeding rows that do not exist yet"""
+        for user_id in touched:
+            increment(
+                conn, UnreadCount.__table__, {'user_id': user_id}, {'unread': deltas[user_id]},
+                lambda: {'user_id': user_id, 'unread': UnreadService._count(conn, [user_id]).get(user_id, 0)}
+            )
+
+    @staticmethod
+    def adjust(user_id, delta):
+        """
+        Apply a delta after a bulk UPDATE/DELETE that bypassed the ORM
+
+        Runs in the current transaction; the caller commits.
+        """
+        if delta:
+            UnreadService._apply_deltas(db.session.connection(), {user_id: delta}, {user_id})
+
+    @staticmethod
+    def _count(conn, user_ids=None):
+        """Count unread browser notifications per user straight from the table"""
+        query = db.select(Notification.user_id, func.count())\
+            .where(Notification.type == 'browser', Notification.sent == False)\
+            .group_by(Notification.user_id)
+        if user_ids is not None:
+            query = query.where(Notification.user_id.in_(user_ids))
+        return dict(conn.execute(query).all())
+
+    @staticmethod
+    def get(user_id):
+        """Number of unread browser notifications for a user"""
+        row = db.session.get(UnreadCount, user_id)
+        return row.unread if row else 0
+
+    @staticmethod
+    def reconcile(user_id=None):
+        """
+        Recompute unread_counts from the notifications table to repair drift
+
+        Args:
+            user_id: Only reconcile this user, or None for every user
+
+        Returns:
+            Number of rows that were corrected
+        """
+        user_ids = [user_id] if user_id else None
+        expected = UnreadService._count(db.session.connection(), user_ids)
+
+        existing = UnreadCount.query
+        if user_ids is not None:
+            existing = existing.filter(UnreadCount.user_id.in_(user_ids))
+
+        corrected = 0
+        for row in existing.all():
+            unread = expected.pop(row.user_id, 0)
+            if row.unread != unread:
+                row.unread = unread
+                corrected += 1
+
+        for key, unread in expected.items():
+            db.session.add(UnreadCount(user_id=key, unread=unread))
+            corrected += 1
+
+        db.session.commit()
+        return corrected
@@ -0,0 +1,103 @@
+"""
+In-process LRU + TTL cache of users for notification write paths
+"""
+from collections import OrderedDict, namedtuple
+from backend.database import db
+from backend.models import ChangeCounter, User
+import os
+import threading
+import time
+
+# Immutable copy of the User columns the write paths need; safe to share
+# across requests and sessions, unlike a User instance
+CachedUser = namedtuple('CachedUser', [
+    'id', 'username', 'email', 'email_notifications_enabled', 'browser_notifications_enabled'
+])
+
+
+class UserCache:
+    """
+    Bounded LRU cache of CachedUser snapshots with a time-to-live
+
+    Entries are dropped by invalidate() after local writes. Writes made by
+    other processes are picked up through the global 'users' change counter,
+    which is checked at most every version_check_interval seconds.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, version_check_interval=5):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self._entries = OrderedDict()  # user_id -> (CachedUser, expires_at)
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self, now):
+        """Clear the cache if another process changed any user"""
+        if now - self._version_checked_at < self.version_check_interval:
+            return
+        version = db.session.query(ChangeCounter.version).filter_by(user_id=0, scope='users').scalar()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._version_checked_at = now
+
+    def get(self, user_id):
+        """
+        Get a user snapshot, loading it from the database on a miss
+
+        Returns:
+            CachedUser, or None if the user does not exist
+        """
+        if not user_id:
+            return None
+
+        now = time.monotonic()
+        self._check_version(now)
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        cached = CachedUser(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            email_notifications_enabled=user.email_notifications_enabled,
+            browser_notifications_enabled=user.browser_notifications_enabled
+        )
+
+        with self._lock:
+            self._entries[user_id] = (cached, now + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, user_id):
+        """Drop a user after it was created or updated"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Drop every cached user"""
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(
+    maxsize=int(os.getenv('USER_CACHE_SIZE', 1024)),
+    ttl=int(os.getenv('USER_CACHE_TTL', 60)),
+    version_check_interval=int(os.getenv('USER_CACHE_VERSION_CHECK', 5))
+)
@@ -0,0 +1,58 @@
+"""
+Streaming JSON responses for large result sets
+"""
+from flask import Response, current_app, request, stream_with_context
+
+STREAM_BATCH_SIZE = 500
+
+
+def wants_ndjson():
+    """Whether the client asked for newline-delimited JSON"""
+    return request.args.get('format') == 'ndjson' or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
+
+
+def wants_stream():
+    """Whether the client asked for a streamed response (stream=true or NDJSON)"""
+    return request.args.get('stream', 'false').lower() == 'true' or wants_ndjson()
+
+
+def stream_query(query, serialize, batch_size=STREAM_BATCH_SIZE):
+    """
+    Stream query results as a JSON array, or NDJSON when requested
+
+    Rows are fetched batch_size at a time through a server-side cursor
+    (yield_per) and written out as each batch is serialized, so memory
+    stays flat no matter how many rows match.
+
+    Args:
+        query: SQLAlchemy query to stream; must not use joined eager loading
+        serialize: Function turning one row into a JSON-compatible value
+        batch_size: Rows fetched and written per chunk
+    """
+    ndjson = wants_ndjson()
+    dumps = current_app.json.dumps
+
+    def generate():
+        if not ndjson:
+            yield '['
+        first = True
+        chunk = []
+        for row in query.yield_per(batch_size):
+            if ndjson:
+                chunk.append(dumps(serialize(row)) + '\n')
+            else:
+                chunk.append(('' if first else ',') + dumps(serialize(row)))
+                first = False
+            if len(chunk) >= batch_size:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+        if not ndjson:
+            yield ']'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson' if ndjson else 'application/json'
+    )
@@ -0,0 +1,3 @@
+"""
+Benchmark suite: synthetic data seeding and per-endpoint latency reports
+"""
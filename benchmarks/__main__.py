@@ -0,0 +1,116 @@
+"""
+Run the benchmark suite
+
+    python -m benchmarks --todos 20000 --output report.json
+    python -m benchmarks --http --concurrency 16 --compare baseline.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+from datetime import datetime
+
+
+def parse_args(argv=None):
+    """Command-line options for a benchmark run"""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', help='Database to seed (default: a new temporary SQLite file)')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--todos', type=int, default=10000)
+    parser.add_argument('--notifications', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for data and requests')
+    parser.add_argument('--iterations', type=int, default=100, help='Measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per endpoint')
+    parser.add_argument('--only', help='Only run endpoints whose name contains this text')
+    parser.add_argument('--http', action='store_true',
+                        help='Also load a local threaded HTTP server with concurrent requests')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent HTTP clients')
+    parser.add_argument('--requests', type=int, default=200, help='HTTP requests per endpoint')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--compare', help='Baseline JSON report to check for regressions')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='p95 latency ratio over the baseline that counts as a regression')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Seed, run the scenarios and write the report; returns the exit status"""
+    args = parse_args(argv)
+
+    # app reads its configuration at import time
+    database_url = args.database_url
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='todo-bench-'), 'bench.db')}"
+    os.environ['DATABASE_URL'] = database_url
+
+    from app import app
+    from benchmarks.runner import compare, run_client, run_http
+    from benchmarks.scenarios import SCENARIOS, SKIPPED, Context
+    from benchmarks.seed import seed
+
+    scenarios = [s for s in SCENARIOS if not args.only or args.only in s.name]
+
+    with app.app_context():
+        from backend.database import db
+        dialect = db.engine.dialect.name
+        seeded = seed(args.users, args.todos, args.notifications, random_seed=args.seed)
+    ctx = Context(seeded, random_seed=args.seed)
+
+    results = {'client': run_client(app, scenarios, ctx, args.iterations, args.warmup)}
+
+    if args.http:
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)  # No per-request access log
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            results['http'] = run_http(
+                f'http://127.0.0.1:{server.server_port}', scenarios, ctx,
+                requests=args.requests, concurrency=args.concurrency
+            )
+        finally:
+            server.shutdown()
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'config': {
+            'users': args.users,
+            'todos': args.todos,
+            'notifications': args.notifications,
+            'seed': args.seed,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'concurrency': args.concurrency if args.http else None,
+            'requests': args.requests if args.http else None,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': dialect,
+        },
+        'skipped': SKIPPED,
+        'results': results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Concurrent write throughput on SQLite with and without engine tuning
+
+    python -m benchmarks.concurrent_writes --processes 4 --writes 200
+
+Each mode gets a fresh database file. Worker processes import the app
+with SQLITE_TUNING set accordingly, wait for a common start signal, then
+create and update todos through the test client as fast as they can.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+
+def _load_app(database_url, tuned):
+    """Import the app configured for one benchmark mode"""
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['SQLITE_TUNING'] = 'True' if tuned else 'False'
+    os.environ.setdefault('ENABLE_EMAIL_NOTIFICATIONS', 'False')
+    from app import app
+    return app
+
+
+def _setup(database_url, tuned):
+    """Create the schema and the user the workers write for"""
+    app = _load_app(database_url, tuned)
+    app.test_client().post('/api/users', json={'username': 'writer', 'email': 'writer@example.com'})
+
+
+def _worker(database_url, tuned, writes, start, results):
+    """Create a todo and update it, writes times; report status counts"""
+    app = _load_app(database_url, tuned)
+    client = app.test_client()
+    statuses = {}
+    latencies = []
+    start.wait()
+    todo_id = None
+    for i in range(writes):
+        started = time.perf_counter()
+        if i % 2 and todo_id:
+            response = client.put(f'/api/todos/{todo_id}', json={'completed': True})
+        else:
+            response = client.post('/api/todos', json={'title': f'write {os.getpid()} {i}', 'user_id': 1})
+            todo_id = (response.get_json(silent=True) or {}).get('id')
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    results.put({'statuses': statuses, 'latencies': latencies})
+
+
+def run_mode(tuned, processes, writes):
+    """Run one mode against a fresh database and summarize it"""
+    from benchmarks.runner import percentile
+
+    directory = tempfile.mkdtemp(prefix='todo-writes-')
+    database_url = f"sqlite:///{os.path.join(directory, 'writes.db')}"
+    ctx = multiprocessing.get_context('spawn')
+
+    setup = ctx.Process(target=_setup, args=(database_url, tuned))
+    setup.start()
+    setup.join()
+
+    start = ctx.Event()
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=_worker, args=(database_url, tuned, writes, start, results))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    time.sleep(2)  # Let every worker finish importing the app
+    started = time.perf_counter()
+    start.set()
+    reports = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join()
+
+    statuses = {}
+    latencies = []
+    for report in reports:
+        latencies.extend(report['latencies'])
+        for status, count in report['statuses'].items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+    succeeded = sum(count for status, count in statuses.items() if status.startswith('2'))
+    return {
+        'sqlite_tuning': tuned,
+        'requests': len(latencies),
+        'succeeded': succeeded,
+        'failed': len(latencies) - succeeded,
+        'statuses': statuses,
+        'elapsed_seconds': round(elapsed, 3),
+        'writes_per_second': round(succeeded / elapsed, 2),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p95': round(percentile(latencies, 95) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+        },
+    }
+
+
+def main(argv=None):
+    """Run both modes and print the JSON comparison"""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.concurrent_writes')
+    parser.add_argument('--processes', type=int, default=4, help='Concurrent writer processes')
+    parser.add_argument('--writes', type=int, default=200, help='Writes per process')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    report = {
+        'processes': args.processes,
+        'writes_per_process': args.writes,
+        'before': run_mode(False, args.processes, args.writes),
+        'after': run_mode(True, args.processes, args.writes),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Drive the benchmark scenarios and summarize latency, throughput and SQL counts
+"""
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event
+from backend.database import db
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, statuses, elapsed, queries=None):
+    """
+    Build the report entry for one scenario
+
+    Args:
+        latencies: Seconds per request
+        statuses: HTTP status per request
+        elapsed: Wall-clock seconds for all requests
+        queries: SQL statements per request, when they could be counted
+    """
+    ms = [latency * 1000 for latency in latencies]
+    entry = {
+        'requests': len(latencies),
+        'errors': sum(1 for status in statuses if status >= 500 or status == 0),
+        'client_errors': sum(1 for status in statuses if 400 <= status < 500),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'mean': round(sum(ms) / len(ms), 3),
+            'p50': round(percentile(ms, 50), 3),
+            'p95': round(percentile(ms, 95), 3),
+            'p99': round(percentile(ms, 99), 3),
+            'max': round(max(ms), 3),
+        },
+    }
+    if queries is not None:
+        entry['sql_queries'] = {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        }
+    return entry
+
+
+class QueryCounter:
+    """Counts SQL statements executed on the app's engine in this thread"""
+
+    def __init__(self, app):
+        with app.app_context():
+            self.engine = db.engine
+        self._local = threading.local()
+
+    def _count(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+    def reset(self):
+        """Start counting from zero and return the previous count"""
+        count = getattr(self._local, 'count', 0)
+        self._local.count = 0
+        return count
+
+
+def run_client(app, scenarios, ctx, iterations=100, warmup=5):
+    """
+    Run each scenario in-process through the Flask test client
+
+    Returns:
+        Dict mapping scenario name to its report entry
+    """
+    client = app.test_client()
+    report = {}
+    with QueryCounter(app) as counter:
+        for scenario in scenarios:
+            latencies, statuses, queries = [], [], []
+            for i in range(warmup + iterations):
+                method, url, body = scenario.build(ctx)
+                counter.reset()
+                started = time.perf_counter()
+                response = client.open(url, method=method, json=body)
+                response.get_data()  # Drain streamed bodies inside the timing
+                latency = time.perf_counter() - started
+                if scenario.after:
+                    scenario.after(ctx, response.get_json(silent=True))
+                if i >= warmup:
+                    latencies.append(latency)
+                    statuses.append(response.status_code)
+                    queries.append(counter.reset())
+            report[scenario.name] = summarize(latencies, statuses, sum(latencies), queries)
+    return report
+
+
+def _http_request(base_url, method, url, body, timeout):
+    """Send one request, returning (latency seconds, status, decoded JSON or None)"""
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(base_url + url, data=data, method=method)
+    if data is not None:
+        request.add_header('Content-Type', 'application/json')
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        payload = e.read()
+        status = e.code
+    except OSError:
+        return time.perf_counter() - started, 0, None
+    latency = time.perf_counter() - started
+    try:
+        return latency, status, json.loads(payload)
+    except ValueError:
+        return latency, status, None
+
+
+def run_http(base_url, scenarios, ctx, requests=200, concurrency=8, timeout=30):
+    """
+    Load a running server with concurrent requests for each scenario
+
+    Requests are built up front in this thread so the run stays
+    reproducible; SQL statements are not counted as they run in the server.
+
+    Returns:
+        Dict mapping scenario name to its report entry
+    """
+    report = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for scenario in scenarios:
+            planned = [scenario.build(ctx) for _ in range(requests)]
+            started = time.perf_counter()
+            results = list(pool.map(
+                lambda request: _http_request(base_url, *request, timeout), planned
+            ))
+            elapsed = time.perf_counter() - started
+            if scenario.after:
+                for _, _, body in results:
+                    scenario.after(ctx, body)
+            report[scenario.name] = summarize(
+                [latency for latency, _, _ in results],
+                [status for _, status, _ in results],
+                elapsed
+            )
+    return report
+
+
+def compare(current, baseline, threshold=1.2):
+    """
+    Find scenarios whose p95 latency or mean SQL count regressed
+
+    Returns:
+        List of human-readable regression descriptions
+    """
+    regressions = []
+    for mode, endpoints in current.get('results', {}).items():
+        for name, entry in endpoints.items():
+            before = baseline.get('results', {}).get(mode, {}).get(name)
+            if not before:
+                continue
+            old_p95, new_p95 = before['latency_ms']['p95'], entry['latency_ms']['p95']
+            if old_p95 and new_p95 > old_p95 * threshold:
+                regressions.append(f'{mode} {name}: p95 {old_p95}ms -> {new_p95}ms')
+            old_sql = before.get('sql_queries', {}).get('mean')
+            new_sql = entry.get('sql_queries', {}).get('mean')
+            if old_sql is not None and new_sql is not None and new_sql > old_sql:
+                regressions.append(f'{mode} {name}: SQL queries {old_sql} -> {new_sql}')
+    return regressions
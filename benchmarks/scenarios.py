@@ -0,0 +1,146 @@
+"""
+Requests exercised by the benchmark, one scenario per endpoint variant
+"""
+import random
+
+
+class Context:
+    """Seeded ids and state shared by the scenarios of one run"""
+
+    def __init__(self, seeded, random_seed=42):
+        self.user_ids = seeded['user_ids']
+        self.todo_ids = seeded['todo_ids']
+        self.tags = seeded['tags']
+        self.words = seeded['words']
+        self.rng = random.Random(random_seed)
+        self.created = []  # ids from 'create todo', consumed by 'delete todo'
+        self.created_users = 0
+
+    def user_id(self):
+        """A random seeded user id"""
+        return self.rng.choice(self.user_ids)
+
+    def todo_id(self):
+        """A random seeded todo id"""
+        return self.rng.choice(self.todo_ids)
+
+
+class Scenario:
+    """
+    One endpoint variant
+
+    Args:
+        name: Report key, e.g. 'GET /api/todos?search'
+        build: Function taking a Context and returning (method, url, json_body)
+        after: Optional function called with the Context and the decoded
+            JSON response, to feed ids to later scenarios
+    """
+
+    def __init__(self, name, build, after=None):
+        self.name = name
+        self.build = build
+        self.after = after
+
+
+def _remember_todo(ctx, body):
+    """Keep a created todo for the delete scenario"""
+    if isinstance(body, dict) and 'id' in body:
+        ctx.created.append(body['id'])
+
+
+def _new_todo(ctx):
+    """Body for a new todo"""
+    return {
+        'title': ' '.join(ctx.rng.choice(ctx.words) for _ in range(3)),
+        'priority': ctx.rng.choice(('low', 'medium', 'high')),
+        'user_id': ctx.user_id(),
+        'tags': ctx.rng.sample(ctx.tags, 2),
+    }
+
+
+def _delete_todo(ctx):
+    """Delete a todo created earlier in the run, or a seeded one"""
+    todo_id = ctx.created.pop() if ctx.created else ctx.todo_ids.pop()
+    return 'DELETE', f'/api/todos/{todo_id}', None
+
+
+def _new_user(ctx):
+    """Create a user with a name unique to this run"""
+    ctx.created_users += 1
+    name = f'benchnew{ctx.created_users}_{ctx.rng.randrange(10 ** 9)}'
+    return 'POST', '/api/users', {'username': name, 'email': f'{name}@example.com'}
+
+
+def _batch(ctx):
+    """Batch of five creates and five updates"""
+    operations = [{'op': 'create', 'data': _new_todo(ctx)} for _ in range(5)]
+    operations += [
+        {'op': 'update', 'id': ctx.todo_id(), 'data': {'priority': 'high'}}
+        for _ in range(5)
+    ]
+    return 'POST', '/api/todos/batch', {'operations': operations}
+
+
+SCENARIOS = [
+    # todo_routes
+    Scenario('GET /api/todos?user_id',
+             lambda ctx: ('GET', f'/api/todos?user_id={ctx.user_id()}', None)),
+    Scenario('GET /api/todos?limit',
+             lambda ctx: ('GET', f'/api/todos?user_id={ctx.user_id()}&limit=50', None)),
+    Scenario('GET /api/todos?completed&priority',
+             lambda ctx: ('GET', f'/api/todos?user_id={ctx.user_id()}&completed=false&priority=high', None)),
+    Scenario('GET /api/todos?search',
+             lambda ctx: ('GET', f'/api/todos?search={ctx.rng.choice(ctx.words)}&limit=50', None)),
+    Scenario('GET /api/todos?tag',
+             lambda ctx: ('GET', f'/api/todos?tag={ctx.rng.choice(ctx.tags)}&limit=50', None)),
+    Scenario('GET /api/todos?fields',
+             lambda ctx: ('GET', f'/api/todos?user_id={ctx.user_id()}&fields=id,title,completed', None)),
+    Scenario('GET /api/todos?stream',
+             lambda ctx: ('GET', f'/api/todos?user_id={ctx.user_id()}&stream=true', None)),
+    Scenario('GET /api/todos/<id>',
+             lambda ctx: ('GET', f'/api/todos/{ctx.todo_id()}', None)),
+    Scenario('GET /api/todos/stats',
+             lambda ctx: ('GET', f'/api/todos/stats?user_id={ctx.user_id()}', None)),
+    Scenario('POST /api/todos',
+             lambda ctx: ('POST', '/api/todos', _new_todo(ctx)), after=_remember_todo),
+    Scenario('PUT /api/todos/<id>',
+             lambda ctx: ('PUT', f'/api/todos/{ctx.todo_id()}', {'title': ctx.rng.choice(ctx.words)})),
+    Scenario('POST /api/todos/<id>/complete',
+             lambda ctx: ('POST', f'/api/todos/{ctx.todo_id()}/complete', None)),
+    Scenario('POST /api/todos/batch', _batch),
+    Scenario('DELETE /api/todos/<id>', _delete_todo),
+
+    # notification_routes
+    Scenario('GET /api/notifications',
+             lambda ctx: ('GET', f'/api/notifications?user_id={ctx.user_id()}', None)),
+    Scenario('GET /api/notifications?pending_only',
+             lambda ctx: ('GET', f'/api/notifications?user_id={ctx.user_id()}&pending_only=true', None)),
+    Scenario('GET /api/notifications/unread-count',
+             lambda ctx: ('GET', f'/api/notifications/unread-count?user_id={ctx.user_id()}', None)),
+    Scenario('POST /api/notifications/<id>/mark-read',
+             lambda ctx: ('POST', f'/api/notifications/{ctx.rng.randint(1, 1000)}/mark-read', None)),
+    Scenario('POST /api/notifications/mark-read',
+             lambda ctx: ('POST', '/api/notifications/mark-read', {
+                 'user_id': ctx.user_id(), 'ids': [ctx.rng.randint(1, 1000) for _ in range(10)]
+             })),
+    Scenario('POST /api/notifications/mark-all-read',
+             lambda ctx: ('POST', '/api/notifications/mark-all-read', {'user_id': ctx.user_id()})),
+    Scenario('POST /api/notifications/check-due',
+             lambda ctx: ('POST', '/api/notifications/check-due', None)),
+
+    # user_routes
+    Scenario('GET /api/users',
+             lambda ctx: ('GET', '/api/users', None)),
+    Scenario('GET /api/users/<id>',
+             lambda ctx: ('GET', f'/api/users/{ctx.user_id()}', None)),
+    Scenario('GET /api/users/<id>/dashboard',
+             lambda ctx: ('GET', f'/api/users/{ctx.user_id()}/dashboard', None)),
+    Scenario('POST /api/users', _new_user),
+    Scenario('PUT /api/users/<id>',
+             lambda ctx: ('PUT', f'/api/users/{ctx.user_id()}', {
+                 'email_notifications_enabled': ctx.rng.random() < 0.5
+             })),
+]
+
+# Long-lived endpoints that never complete a request
+SKIPPED = ['GET /api/notifications/stream']
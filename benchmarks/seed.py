@@ -0,0 +1,127 @@
+"""
+Seed a database with synthetic users, todos, tags and notifications
+"""
+from backend.database import db
+from backend.models import Notification, Tag, Todo, User, todo_tags
+from backend.services.search_service import SearchService
+from backend.services.stats_service import StatsService
+from backend.services.unread_service import UnreadService
+from datetime import datetime, timedelta
+import random
+
+PRIORITIES = ('low', 'medium', 'high')
+CATEGORIES = ('work', 'home', 'errands', 'health', None)
+TAGS = ('urgent', 'backlog', 'review', 'blocked', 'idea', 'weekly', 'q3', 'q4')
+WORDS = (
+    'report', 'meeting', 'invoice', 'groceries', 'deploy', 'review', 'dentist',
+    'budget', 'release', 'email', 'backup', 'plan', 'draft', 'call', 'fix'
+)
+
+
+def _chunks(rows, size):
+    """Split rows into lists of at most size rows"""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _insert(conn, table, rows, batch_size):
+    """executemany() inserts, batch_size rows per statement"""
+    for chunk in _chunks(rows, batch_size):
+        conn.execute(table.insert(), chunk)
+
+
+def _reset_sequences(conn, tables):
+    """Move PostgreSQL id sequences past the explicitly inserted ids"""
+    if conn.dialect.name != 'postgresql':
+        return
+    for table in tables:
+        conn.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+        ))
+
+
+def seed(users=100, todos=10000, notifications=20000, random_seed=42, batch_size=5000):
+    """
+    Bulk insert synthetic data into an empty database
+
+    The same arguments always produce the same rows. Inserts bypass the
+    ORM, so the materialized counters and the search index are rebuilt
+    afterwards.
+
+    Returns:
+        Dict with the inserted user and todo ids, for building requests
+    """
+    if db.session.query(User.id).first() is not None:
+        raise RuntimeError('Benchmark seeding needs an empty database')
+
+    rng = random.Random(random_seed)
+    now = datetime(2026, 1, 1)
+
+    user_rows = [{
+        'id': user_id,
+        'username': f'bench{user_id}',
+        'email': f'bench{user_id}@example.com',
+        'created_at': now - timedelta(days=365),
+        'email_notifications_enabled': rng.random() < 0.5,
+        'browser_notifications_enabled': True,
+    } for user_id in range(1, users + 1)]
+
+    todo_rows = []
+    link_rows = []
+    for todo_id in range(1, todos + 1):
+        created_at = now - timedelta(minutes=rng.randrange(525600))
+        due_date = None
+        if rng.random() < 0.6:
+            due_date = created_at + timedelta(hours=rng.randrange(1, 24 * 60))
+        todo_rows.append({
+            'id': todo_id,
+            'title': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))),
+            'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 20))) or None,
+            'completed': rng.random() < 0.4,
+            'priority': rng.choice(PRIORITIES),
+            'due_date': due_date,
+            'created_at': created_at,
+            'updated_at': created_at,
+            'user_id': rng.randint(1, users) if users else None,
+            'category': rng.choice(CATEGORIES),
+        })
+        for tag_id in rng.sample(range(1, len(TAGS) + 1), rng.randint(0, 3)):
+            link_rows.append({'todo_id': todo_id, 'tag_id': tag_id})
+
+    notification_rows = []
+    for notification_id in range(1, notifications + 1 if todos and users else 1):
+        todo = todo_rows[rng.randrange(todos)]
+        sent = rng.random() < 0.8
+        created_at = todo['created_at'] + timedelta(minutes=rng.randrange(60 * 24 * 30))
+        notification_rows.append({
+            'id': notification_id,
+            'todo_id': todo['id'],
+            'user_id': todo['user_id'] or 1,
+            'message': f"Todo {rng.choice(('created', 'updated', 'completed'))}: {todo['title']}",
+            'type': 'browser',
+            'sent': sent,
+            'sent_at': created_at if sent else None,
+            'created_at': created_at,
+        })
+
+    with db.engine.begin() as conn:
+        _insert(conn, User.__table__, user_rows, batch_size)
+        _insert(conn, Tag.__table__, [
+            {'id': tag_id, 'name': name} for tag_id, name in enumerate(TAGS, 1)
+        ], batch_size)
+        _insert(conn, Todo.__table__, todo_rows, batch_size)
+        _insert(conn, todo_tags, link_rows, batch_size)
+        _insert(conn, Notification.__table__, notification_rows, batch_size)
+        _reset_sequences(conn, (User.__table__, Tag.__table__, Todo.__table__, Notification.__table__))
+
+    StatsService.reconcile()
+    UnreadService.reconcile()
+    SearchService.rebuild()
+
+    return {
+        'user_ids': [row['id'] for row in user_rows],
+        'todo_ids': [row['id'] for row in todo_rows],
+        'tags': list(TAGS),
+        'words': list(WORDS),
+    }
@@ -4,7 +4,10 @@ const API_BASE = '/api';
 // Global State
 let currentUser = null;
 let todos = [];
+let nextCursor = null; // Next page of the list, while it shows a page at a time
 let notifications = [];
+let unreadCount = 0;
+let notificationStream = null;
 let filters = {
     completed: null,
     priority: '',
@@ -14,17 +17,16 @@ let filters = {
 
 // Initialize App
 document.addEventListener('DOMContentLoaded', () => {
-    initializeApp();
     setupEventListeners();
     requestNotificationPermission();
-    loadInitialData();
-    startNotificationPolling();
+    initializeApp();
 });
 
 // Initialize App
-function initializeApp() {
-    // Create default user if none exists
-    createDefaultUser();
+async function initializeApp() {
+    // Create default user if none exists, then load the page for it
+    await createDefaultUser();
+    await loadInitialData();
 }
 
 // Setup Event Listeners
@@ -46,6 +48,7 @@ function setupEventListeners() {
     document.getElementById('notificationBtn').addEventListener('click', openNotificationModal);
     document.getElementById('settingsBtn').addEventListener('click', openSettingsModal);
     document.getElementById('closeNotificationModal').addEventListener('click', closeNotificationModal);
+    document.getElementById('markAllReadBtn').addEventListener('click', markAllNotificationsRead);
     document.getElementById('closeSettingsModal').addEventListener('click', closeSettingsModal);
 
     // Settings
@@ -106,6 +109,7 @@ async function createDefaultUser() {
             currentUser = users[0];
         }
         loadUserSettings();
+        startNotificationStream();
     } catch (error) {
         console.error('Error creating user:', error);
     }
@@ -181,6 +185,7 @@ async function loadTodos() {
         }
         
         todos = await apiCall(endpoint);
+        nextCursor = null;
         renderTodos();
         updateStats();
         updateCategories();
@@ -198,6 +203,10 @@ function renderTodos() {
     }
     
     container.innerHTML = todos.map(todo => createTodoCard(todo)).join('');
+    if (nextCursor) {
+        container.innerHTML += '<button class="btn-secondary load-more" id="loadMoreTodos">Load more</button>';
+        document.getElementById('loadMoreTodos').addEventListener('click', loadMoreTodos);
+    }
     
     // Add event listeners to todo cards
     todos.forEach(todo => {
@@ -207,6 +216,21 @@ function renderTodos() {
     });
 }
 
+async function loadMoreTodos() {
+    if (!currentUser || !nextCursor) return;
+    
+    try {
+        const params = new URLSearchParams({ user_id: currentUser.id, after: nextCursor });
+        const page = await apiCall(`/todos?${params}`);
+        todos = todos.concat(page.todos);
+        nextCursor = page.next_cursor;
+        renderTodos();
+        updateCategories();
+    } catch (error) {
+        showToast('Failed to load more todos', 'error');
+    }
+}
+
 function createTodoCard(todo) {
     const dueDate = todo.due_date ? new Date(todo.due_date).toLocaleDateString() : 'No due date';
     const tags = todo.tags && todo.tags.length > 0 
@@ -266,7 +290,7 @@ async function handleCreateTodo(e) {
         document.getElementById('todoForm').reset();
         toggleTodoForm();
         loadTodos();
-        loadNotifications();
+        loadUnreadCount();
     } catch (error) {
         showToast('Failed to create todo', 'error');
     }
@@ -277,7 +301,7 @@ async function toggleComplete(todoId) {
         await apiCall(`/todos/${todoId}/complete`, 'POST');
         showToast('Todo updated!', 'success');
         loadTodos();
-        loadNotifications();
+        loadUnreadCount();
     } catch (error) {
         showToast('Failed to update todo', 'error');
     }
@@ -290,7 +314,7 @@ async function deleteTodo(todoId) {
         await apiCall(`/todos/${todoId}`, 'DELETE');
         showToast('Todo deleted!', 'success');
         loadTodos();
-        loadNotifications();
+        loadUnreadCount();
     } catch (error) {
         showToast('Failed to delete todo', 'error');
     }
@@ -345,7 +369,7 @@ async function updateTodo(todoId) {
         document.getElementById('todoForm').reset();
         toggleTodoForm();
         loadTodos();
-        loadNotifications();
+        loadUnreadCount();
         
         // Reset form button
         const submitBtn = document.getElementById('todoForm').querySelector('button[type="submit"]');
@@ -404,17 +428,19 @@ function updateCategories() {
 async function updateStats() {
     try {
         const endpoint = currentUser ? `/todos/stats?user_id=${currentUser.id}` : '/todos/stats';
-        const stats = await apiCall(endpoint);
-        
-        document.getElementById('totalTodos').textContent = stats.total;
-        document.getElementById('completedTodos').textContent = stats.completed;
-        document.getElementById('pendingTodos').textContent = stats.pending;
-        document.getElementById('highPriorityTodos').textContent = stats.high_priority;
+        renderStats(await apiCall(endpoint));
     } catch (error) {
         console.error('Error loading stats:', error);
     }
 }
 
+function renderStats(stats) {
+    document.getElementById('totalTodos').textContent = stats.total;
+    document.getElementById('completedTodos').textContent = stats.completed;
+    document.getElementById('pendingTodos').textContent = stats.pending;
+    document.getElementById('highPriorityTodos').textContent = stats.high_priority;
+}
+
 // Notification Functions
 function requestNotificationPermission() {
     if ('Notification' in window && Notification.permission === 'default') {
@@ -427,20 +453,31 @@ async function loadNotifications() {
     
     try {
         notifications = await apiCall(`/notifications?user_id=${currentUser.id}&pending_only=true`);
-        updateNotificationBadge();
     } catch (error) {
         console.error('Error loading notifications:', error);
     }
 }
 
+async function loadUnreadCount() {
+    if (!currentUser) return;
+    
+    try {
+        const result = await apiCall(`/notifications/unread-count?user_id=${currentUser.id}`);
+        unreadCount = result.unread;
+        updateNotificationBadge();
+    } catch (error) {
+        console.error('Error loading unread count:', error);
+    }
+}
+
 function updateNotificationBadge() {
-    const count = notifications.filter(n => !n.sent).length;
-    document.getElementById('notificationCount').textContent = count;
-    document.getElementById('notificationCount').style.display = count > 0 ? 'flex' : 'none';
+    document.getElementById('notificationCount').textContent = unreadCount;
+    document.getElementById('notificationCount').style.display = unreadCount > 0 ? 'flex' : 'none';
 }
 
-function openNotificationModal() {
+async function openNotificationModal() {
     document.getElementById('notificationModal').classList.remove('hidden');
+    await loadNotifications();
     renderNotifications();
 }
 
@@ -469,13 +506,34 @@ function renderNotifications() {
 async function markNotificationRead(notificationId) {
     try {
         await apiCall(`/notifications/${notificationId}/mark-read`, 'POST');
-        loadNotifications();
+        await loadNotifications();
         renderNotifications();
+        loadUnreadCount();
     } catch (error) {
         console.error('Error marking notification as read:', error);
     }
 }
 
+async function markAllNotificationsRead() {
+    if (!currentUser) return;
+    
+    try {
+        // Only mark what has been shown; newer notifications stay unread
+        const upToId = notifications.reduce((max, n) => Math.max(max, n.id), 0);
+        if (!upToId) return;
+        const result = await apiCall('/notifications/mark-all-read', 'POST', {
+            user_id: currentUser.id,
+            up_to_id: upToId
+        });
+        unreadCount = result.unread;
+        updateNotificationBadge();
+        await loadNotifications();
+        renderNotifications();
+    } catch (error) {
+        console.error('Error marking notifications as read:', error);
+    }
+}
+
 function showBrowserNotification(title, body) {
     if ('Notification' in window && Notification.permission === 'granted' && currentUser?.browser_notifications_enabled) {
         new Notification(title, {
@@ -485,10 +543,35 @@ function showBrowserNotification(title, body) {
     }
 }
 
-function startNotificationPolling() {
-    setInterval(() => {
-        loadNotifications();
-    }, 30000); // Poll every 30 seconds
+function startNotificationStream() {
+    if (!currentUser || notificationStream) return;
+    
+    // Fall back to polling in browsers without Server-Sent Events
+    if (!('EventSource' in window)) {
+        notificationStream = setInterval(() => {
+            loadUnreadCount();
+        }, 30000); // Poll every 30 seconds
+        return;
+    }
+    
+    // The browser reconnects on its own and resumes via Last-Event-ID
+    notificationStream = new EventSource(`${API_BASE}/notifications/stream?user_id=${currentUser.id}`);
+    notificationStream.onmessage = (e) => {
+        const notif = JSON.parse(e.data);
+        const index = notifications.findIndex(n => n.id === notif.id);
+        if (index !== -1) {
+            // Coalesced edits rewrite an existing notification in place
+            notifications[index] = notif;
+        } else {
+            notifications.unshift(notif);
+            unreadCount++;
+            updateNotificationBadge();
+            showBrowserNotification('Todo Update', notif.message);
+        }
+        if (!document.getElementById('notificationModal').classList.contains('hidden')) {
+            renderNotifications();
+        }
+    };
 }
 
 // Settings Modal
@@ -529,7 +612,29 @@ function escapeHtml(text) {
 
 // Load Initial Data
 async function loadInitialData() {
-    await loadTodos();
-    await loadNotifications();
+    if (!currentUser) {
+        await loadTodos();
+        return;
+    }
+
+    // User, first page of todos, stats and notifications in one request
+    try {
+        const dashboard = await apiCall(`/users/${currentUser.id}/dashboard`);
+        currentUser = dashboard.user;
+        notifications = dashboard.notifications;
+        unreadCount = dashboard.unread_count;
+        updateNotificationBadge();
+        renderStats(dashboard.stats);
+
+        // The list starts with the dashboard's first page and loads the
+        // rest from next_cursor on demand
+        todos = dashboard.todos;
+        nextCursor = dashboard.next_cursor;
+        renderTodos();
+        updateCategories();
+    } catch (error) {
+        await loadTodos();
+        await loadUnreadCount();
+    }
 }
 
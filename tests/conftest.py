@@ -0,0 +1,59 @@
+"""
+Shared fixtures: the app runs against a temporary SQLite database that is
+emptied after every test
+"""
+import os
+import sys
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix='todo-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ['DATABASE_REPLICA_URLS'] = ''
+# Notifications are only created when email notifications are enabled;
+# emails just queue in the outbox since no worker runs
+os.environ['ENABLE_EMAIL_NOTIFICATIONS'] = 'True'
+# Enforce the routes' query budgets
+os.environ['SQL_PROFILER_ENABLED'] = 'True'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app import app as flask_app
+from backend.database import db
+from backend.services.user_cache import user_cache
+
+
+@pytest.fixture
+def app():
+    """The app, with every table emptied afterwards"""
+    flask_app.config['TESTING'] = True
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+        with db.engine.begin() as conn:
+            for table in reversed(db.metadata.sorted_tables):
+                if table.name != 'schema_migrations':
+                    conn.execute(table.delete())
+    user_cache.clear()
+
+
+@pytest.fixture
+def client(app):
+    """Test client for the app"""
+    return app.test_client()
+
+
+@pytest.fixture
+def user(client):
+    """A user created through the API"""
+    response = client.post('/api/users', json={'username': 'alice', 'email': 'alice@example.com'})
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def create_todo(client, **data):
+    """Create a todo through the API and return it"""
+    data.setdefault('title', 'Todo')
+    response = client.post('/api/todos', json=data)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()
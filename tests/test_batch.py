@@ -0,0 +1,97 @@
+"""
+POST /api/todos/batch applies every operation or none
+"""
+import pytest
+
+from conftest import create_todo
+
+
+def _batch(client, *operations):
+    return client.post('/api/todos/batch', json={'operations': list(operations)})
+
+
+def _state(client, user_id):
+    """Everything a failed batch must leave untouched"""
+    return (
+        client.get(f'/api/todos?user_id={user_id}').get_json(),
+        client.get(f'/api/todos/stats?user_id={user_id}').get_json(),
+        client.get(f'/api/notifications?user_id={user_id}').get_json(),
+    )
+
+
+def test_batch_applies_all_operations(client, user):
+    keep = create_todo(client, user_id=user['id'])
+    drop = create_todo(client, user_id=user['id'])
+
+    response = _batch(
+        client,
+        {'op': 'create', 'data': {'title': 'new', 'user_id': user['id'], 'tags': ['x']}},
+        {'op': 'update', 'id': keep['id'], 'data': {'completed': True}},
+        {'op': 'delete', 'id': drop['id']},
+    )
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['updated'] == [keep['id']] and result['deleted'] == [drop['id']]
+    stats = client.get(f"/api/todos/stats?user_id={user['id']}").get_json()
+    assert (stats['total'], stats['completed']) == (2, 1)
+
+
+@pytest.mark.parametrize('failing', [
+    # Fails while building the todo
+    {'op': 'create', 'data': {'title': 'bad date', 'due_date': 'tomorrow'}},
+    # Fails in the flush, after the other operations were staged
+    {'op': 'create', 'data': {'title': None}},
+])
+def test_failure_after_staged_operations_rolls_back(client, user, failing):
+    todo = create_todo(client, user_id=user['id'])
+    before = _state(client, user['id'])
+
+    response = _batch(
+        client,
+        {'op': 'create', 'data': {'title': 'staged', 'user_id': user['id']}},
+        {'op': 'update', 'id': todo['id'], 'data': {'title': 'changed', 'completed': True}},
+        failing,
+    )
+
+    assert response.status_code in (400, 500)
+    assert _state(client, user['id']) == before
+
+
+def test_operation_on_deleted_todo_rolls_back(client, user):
+    todo = create_todo(client, user_id=user['id'])
+    before = _state(client, user['id'])
+
+    response = _batch(
+        client,
+        {'op': 'delete', 'id': todo['id']},
+        {'op': 'update', 'id': todo['id'], 'data': {'title': 'too late'}},
+    )
+
+    assert response.status_code == 400
+    assert _state(client, user['id']) == before
+
+
+def test_missing_todo_rejects_whole_batch(client, user):
+    before = _state(client, user['id'])
+
+    response = _batch(
+        client,
+        {'op': 'create', 'data': {'title': 'new', 'user_id': user['id']}},
+        {'op': 'delete', 'id': 999},
+    )
+
+    assert response.status_code == 404
+    assert response.get_json()['missing_ids'] == [999]
+    assert _state(client, user['id']) == before
+
+
+def test_boolean_id_is_rejected(client, user):
+    todo = create_todo(client, user_id=user['id'])
+    assert todo['id'] == 1
+    before = _state(client, user['id'])
+
+    response = _batch(client, {'op': 'delete', 'id': True})
+
+    assert response.status_code == 400
+    assert _state(client, user['id']) == before
@@ -0,0 +1,168 @@
+"""
+Materialized todo stats and unread notification counts
+"""
+from backend.database import db
+from backend.models import Notification, Todo, TodoStats, UnreadCount
+from backend.profiler import profile_queries
+from backend.services.stats_service import StatsService
+from backend.services.unread_service import UnreadService
+from conftest import create_todo
+
+
+def _stats(client, user_id):
+    return client.get(f'/api/todos/stats?user_id={user_id}').get_json()
+
+
+def _unread(client, user_id):
+    return client.get(f'/api/notifications/unread-count?user_id={user_id}').get_json()['unread']
+
+
+def test_stats_follow_create_update_and_delete(client, user):
+    high = create_todo(client, user_id=user['id'], priority='high')
+    low = create_todo(client, user_id=user['id'], priority='low')
+    assert _stats(client, user['id']) == {
+        'total': 2, 'completed': 0, 'pending': 2, 'high_priority': 1,
+        'medium_priority': 0, 'low_priority': 1, 'overdue': 0
+    }
+
+    client.put(f"/api/todos/{high['id']}", json={'completed': True})
+    client.put(f"/api/todos/{low['id']}", json={'priority': 'medium'})
+    stats = _stats(client, user['id'])
+    assert (stats['completed'], stats['pending'], stats['high_priority'], stats['medium_priority']) == (1, 1, 0, 1)
+
+    client.delete(f"/api/todos/{low['id']}")
+    stats = _stats(client, user['id'])
+    assert (stats['total'], stats['completed'], stats['pending']) == (1, 1, 0)
+
+
+def test_stats_move_with_a_todo_between_users(client, user):
+    other = client.post('/api/users', json={'username': 'bob', 'email': 'bob@example.com'}).get_json()
+    todo = create_todo(client, user_id=user['id'])
+
+    client.put(f"/api/todos/{todo['id']}", json={})  # no-op update must not count twice
+    with client.application.app_context():
+        row = db.session.get(Todo, todo['id'])
+        row.user_id = other['id']
+        db.session.commit()
+
+    assert _stats(client, user['id'])['total'] == 0
+    assert _stats(client, other['id'])['total'] == 1
+
+
+def test_overdue_counts_pending_todos_past_due(client, user):
+    create_todo(client, user_id=user['id'], due_date='2020-01-01T00:00:00')
+    done = create_todo(client, user_id=user['id'], due_date='2020-01-01T00:00:00')
+    create_todo(client, user_id=user['id'], due_date='2999-01-01T00:00:00')
+    client.post(f"/api/todos/{done['id']}/complete")
+
+    assert _stats(client, user['id'])['overdue'] == 1
+
+
+def test_reconcile_repairs_drifted_stats(app, client, user):
+    create_todo(client, user_id=user['id'], priority='high')
+    create_todo(client, user_id=user['id'], priority='high')
+    with app.app_context():
+        db.session.get(TodoStats, user['id']).pending_high = 7
+        db.session.commit()
+
+        assert StatsService.reconcile() == 1
+        assert StatsService.reconcile() == 0
+
+    assert _stats(client, user['id'])['high_priority'] == 2
+
+
+def test_reconcile_creates_missing_rows(app, client, user):
+    create_todo(client, user_id=user['id'])
+    with app.app_context():
+        TodoStats.query.delete()
+        db.session.commit()
+
+        assert StatsService.reconcile() == 1
+
+    assert _stats(client, user['id'])['total'] == 1
+
+
+def test_unread_count_follows_notifications(client, user):
+    todo = create_todo(client, user_id=user['id'])
+    create_todo(client, user_id=user['id'])
+    assert _unread(client, user['id']) == 2
+
+    notifications = client.get(f"/api/notifications?user_id={user['id']}").get_json()
+    client.post(f"/api/notifications/{notifications[0]['id']}/mark-read")
+    assert _unread(client, user['id']) == 1
+
+    # Deleting the todo cascades to its notifications
+    client.delete(f"/api/todos/{todo['id']}")
+    assert _unread(client, user['id']) == _count_unread(client.application, user['id'])
+
+    client.post('/api/notifications/mark-all-read', json={'user_id': user['id']})
+    assert _unread(client, user['id']) == 0
+
+
+def test_mark_read_rejects_booleans_as_ids(client, user):
+    create_todo(client, user_id=user['id'])
+
+    for path, body in [
+        ('/api/notifications/mark-read', {'user_id': True, 'ids': [1]}),
+        ('/api/notifications/mark-read', {'user_id': user['id'], 'ids': [True]}),
+        ('/api/notifications/mark-all-read', {'user_id': True}),
+        ('/api/notifications/mark-all-read', {'user_id': user['id'], 'up_to_id': True}),
+    ]:
+        assert client.post(path, json=body).status_code == 400, body
+    assert _unread(client, user['id']) == 1
+
+
+def _count_unread(app, user_id):
+    with app.app_context():
+        return Notification.query.filter_by(user_id=user_id, type='browser', sent=False).count()
+
+
+def test_unread_reconcile_repairs_drift(app, client, user):
+    create_todo(client, user_id=user['id'])
+    with app.app_context():
+        db.session.get(UnreadCount, user['id']).unread = 40
+        db.session.commit()
+
+        assert UnreadService.reconcile() == 1
+
+    assert _unread(client, user['id']) == 1
+
+
+def test_stats_reads_do_not_write(client, user):
+    create_todo(client, user_id=user['id'], due_date='2020-01-01T00:00:00')
+
+    with profile_queries() as profile:
+        assert _stats(client, user['id'])['overdue'] == 1
+
+    assert not [shape for shape in profile.shapes if not shape.startswith('SELECT')]
+
+
+def test_first_write_race_adds_to_the_winners_row(app, client, user, monkeypatch):
+    count = StatsService._count
+
+    def count_then_lose_race(conn, keys=None):
+        # Another transaction seeds the row between our UPDATE and INSERT
+        rows = count(conn, keys)
+        conn.execute(TodoStats.__table__.insert().values({**rows[keys[0]], 'pending_low': 5}))
+        return rows
+
+    monkeypatch.setattr(StatsService, '_count', count_then_lose_race)
+    create_todo(client, user_id=user['id'], priority='low')
+    monkeypatch.undo()
+
+    assert _stats(client, user['id'])['low_priority'] == 6
+
+
+def test_first_unread_race_adds_to_the_winners_row(app, client, user, monkeypatch):
+    count = UnreadService._count
+
+    def count_then_lose_race(conn, user_ids=None):
+        # Another transaction seeds the row between our UPDATE and INSERT
+        conn.execute(UnreadCount.__table__.insert().values(user_id=user_ids[0], unread=3))
+        return count(conn, user_ids)
+
+    monkeypatch.setattr(UnreadService, '_count', count_then_lose_race)
+    create_todo(client, user_id=user['id'])
+    monkeypatch.undo()
+
+    assert _unread(client, user['id']) == 4
@@ -0,0 +1,50 @@
+"""
+GET /api/users/<id>/dashboard: everything the page shows on load
+"""
+from conftest import create_todo
+
+
+def _dashboard(client, user, **params):
+    query = '&'.join(f'{key}={value}' for key, value in params.items())
+    return client.get(f"/api/users/{user['id']}/dashboard?{query}")
+
+
+def test_dashboard_payload(client, user):
+    first = create_todo(client, user_id=user['id'], title='first', priority='high', tags=['home'])
+    create_todo(client, user_id=user['id'], title='second')
+    client.post(f"/api/todos/{first['id']}/complete")
+
+    body = _dashboard(client, user).get_json()
+
+    assert body['user']['id'] == user['id']
+    assert [todo['title'] for todo in body['todos']] == ['second', 'first']
+    assert body['todos'][1]['tags'] == ['home']
+    assert body['next_cursor'] is None
+    assert body['stats'] == client.get(f"/api/todos/stats?user_id={user['id']}").get_json()
+    assert body['unread_count'] == len(body['notifications']) == 3
+
+
+def test_dashboard_pages_on_like_the_todo_list(client, user):
+    ids = [create_todo(client, user_id=user['id'])['id'] for _ in range(5)]
+
+    body = _dashboard(client, user, limit=2).get_json()
+    assert [todo['id'] for todo in body['todos']] == ids[:-3:-1]
+
+    rest = client.get(f"/api/todos?user_id={user['id']}&limit=10&after={body['next_cursor']}").get_json()
+    assert [todo['id'] for todo in rest['todos']] == ids[2::-1]
+    assert rest['next_cursor'] is None
+
+
+def test_dashboard_query_count_does_not_grow_with_todos(client, user):
+    create_todo(client, user_id=user['id'], tags=['a'])
+    few = int(_dashboard(client, user).headers['X-Query-Count'])
+
+    for index in range(10):
+        create_todo(client, user_id=user['id'], tags=[f'tag{index}', 'shared'])
+    many = int(_dashboard(client, user).headers['X-Query-Count'])
+
+    assert few == many <= 7
+
+
+def test_dashboard_for_a_missing_user(client):
+    assert client.get('/api/users/999/dashboard').status_code == 404
@@ -0,0 +1,113 @@
+"""
+Outbox delivery over pooled SMTP sessions, against a local SMTP server
+"""
+from datetime import datetime
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+from flask_mail import Mail
+
+from backend.database import db
+from backend.models import EmailOutbox
+from backend.services import email_service, outbox_worker
+from backend.services.email_service import smtp_pool
+from backend.services.outbox_worker import OutboxWorker
+from conftest import create_todo
+
+
+class RecordingHandler:
+    """Keeps every message with the SMTP session it arrived on"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((id(session), envelope.content.decode('utf-8', 'replace')))
+        return '250 OK'
+
+    def sessions(self):
+        return len({session for session, _ in self.messages})
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(app, monkeypatch):
+    """A local SMTP server that the app's mail extension sends to"""
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+
+    for key, value in {
+        'MAIL_SERVER': '127.0.0.1', 'MAIL_PORT': controller.port, 'MAIL_USE_TLS': False,
+        'MAIL_USE_SSL': False, 'MAIL_USERNAME': '', 'MAIL_DEFAULT_SENDER': 'todo@example.com',
+        'MAIL_SUPPRESS_SEND': False,
+    }.items():
+        monkeypatch.setitem(app.config, key, value)
+    monkeypatch.setitem(app.extensions, 'mail', app.extensions.get('mail'))
+    Mail(app)
+
+    yield handler
+    smtp_pool.close_all()
+    controller.stop()
+
+
+@pytest.fixture
+def digest(monkeypatch):
+    """Hold emails for a minute so they can be merged into a digest"""
+    monkeypatch.setattr(email_service, 'DIGEST_WINDOW_SECONDS', 60)
+    monkeypatch.setattr(outbox_worker, 'DIGEST_WINDOW_SECONDS', 60)
+
+
+def test_emails_share_one_pooled_session(app, client, user, smtp_server):
+    for title in ('a', 'b', 'c'):
+        create_todo(client, user_id=user['id'], title=title)
+    opened = smtp_pool.opened
+
+    assert OutboxWorker(app, workers=1).drain_once() == 3
+
+    assert len(smtp_server.messages) == 3
+    assert smtp_server.sessions() == 1
+    assert smtp_pool.opened - opened == 1
+
+    # The idle session is reused by the next batch
+    create_todo(client, user_id=user['id'], title='d')
+    assert OutboxWorker(app, workers=1).drain_once() == 1
+    assert smtp_server.sessions() == 1
+
+
+def test_idle_sessions_are_not_reused(app, client, user, smtp_server, monkeypatch):
+    monkeypatch.setattr(smtp_pool, 'idle_timeout', 0)
+    create_todo(client, user_id=user['id'], title='a')
+    create_todo(client, user_id=user['id'], title='b')
+
+    assert OutboxWorker(app, workers=1).drain_once() == 2
+
+    assert smtp_server.sessions() == 2
+
+
+def test_queued_emails_are_merged_into_a_digest(app, client, user, smtp_server, digest):
+    for title in ('a', 'b', 'c'):
+        create_todo(client, user_id=user['id'], title=title)
+
+    worker = OutboxWorker(app)
+    # Held back for the digest window
+    assert worker.drain_once() == 0
+
+    with app.app_context():
+        first = EmailOutbox.query.order_by(EmailOutbox.id).first()
+        first.next_attempt_at = datetime.utcnow()
+        db.session.commit()
+
+    # The first due entry pulls the user's other queued emails along
+    assert worker.drain_once() == 3
+
+    [(_, content)] = smtp_server.messages
+    assert 'Subject: 3 Todo Updates' in content
+    for title in ('a', 'b', 'c'):
+        assert f'New Todo Created: {title}' in content
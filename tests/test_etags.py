@@ -0,0 +1,111 @@
+"""
+Conditional GETs: 304 for unchanged reads, new ETags after writes
+"""
+from sqlalchemy import Update
+
+from backend.database import db
+from backend.models import ChangeCounter
+from backend.services.etag_service import ETagService
+from conftest import create_todo
+
+
+def _revalidate(client, url, etag):
+    return client.get(url, headers={'If-None-Match': etag})
+
+
+def test_unchanged_list_is_not_modified(client, user):
+    create_todo(client, user_id=user['id'])
+    url = f"/api/todos?user_id={user['id']}"
+    first = client.get(url)
+
+    again = _revalidate(client, url, first.headers['ETag'])
+
+    assert again.status_code == 304
+    assert again.get_data() == b''
+
+
+def test_writes_invalidate_the_list_etag(client, user):
+    todo = create_todo(client, user_id=user['id'])
+    url = f"/api/todos?user_id={user['id']}"
+
+    for write in (
+        lambda: client.put(f"/api/todos/{todo['id']}", json={'title': 'renamed'}),
+        lambda: client.post(f"/api/todos/{todo['id']}/complete"),
+        lambda: create_todo(client, user_id=user['id']),
+        lambda: client.delete(f"/api/todos/{todo['id']}"),
+    ):
+        etag = client.get(url).headers['ETag']
+        write()
+        response = _revalidate(client, url, etag)
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+
+def test_etag_varies_with_query_string(client, user):
+    create_todo(client, user_id=user['id'], priority='high')
+    etag = client.get(f"/api/todos?user_id={user['id']}").headers['ETag']
+
+    response = _revalidate(client, f"/api/todos?user_id={user['id']}&priority=high", etag)
+
+    assert response.status_code == 200
+
+
+def test_other_users_writes_keep_the_etag(client, user):
+    other = client.post('/api/users', json={'username': 'bob', 'email': 'bob@example.com'}).get_json()
+    url = f"/api/todos?user_id={user['id']}"
+    etag = client.get(url).headers['ETag']
+
+    create_todo(client, user_id=other['id'])
+
+    assert _revalidate(client, url, etag).status_code == 304
+
+
+def test_single_todo_etag(client, user):
+    todo = create_todo(client, user_id=user['id'])
+    url = f"/api/todos/{todo['id']}"
+    etag = client.get(url).headers['ETag']
+    assert _revalidate(client, url, etag).status_code == 304
+
+    client.put(url, json={'title': 'renamed'})
+
+    response = _revalidate(client, url, etag)
+    assert response.status_code == 200
+    assert response.get_json()['title'] == 'renamed'
+
+
+def test_bulk_mark_read_invalidates_notifications(client, user):
+    create_todo(client, user_id=user['id'])
+    url = f"/api/notifications?user_id={user['id']}"
+    etag = client.get(url).headers['ETag']
+
+    client.post('/api/notifications/mark-all-read', json={'user_id': user['id']})
+
+    response = _revalidate(client, url, etag)
+    assert response.status_code == 200
+    assert all(notification['sent'] for notification in response.get_json())
+
+
+class _LosesFirstWriteRace:
+    """Connection on which another transaction inserts the counter row
+    right after our UPDATE found none"""
+
+    def __init__(self, conn, row):
+        self.conn = conn
+        self.dialect = conn.dialect
+        self.row = row
+
+    def execute(self, statement, *args, **kwargs):
+        result = self.conn.execute(statement, *args, **kwargs)
+        if self.row is not None and isinstance(statement, Update):
+            self.conn.execute(ChangeCounter.__table__.insert().values(self.row))
+            self.row = None
+        return result
+
+
+def test_first_bump_race_increments_the_winners_row(app):
+    with app.app_context():
+        with db.engine.begin() as conn:
+            racing = _LosesFirstWriteRace(conn, {'user_id': 9, 'scope': 'todos', 'version': 4})
+            ETagService._bump(racing, {(9, 'todos')})
+
+        assert db.session.get(ChangeCounter, (9, 'todos')).version == 5
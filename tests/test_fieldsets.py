@@ -0,0 +1,60 @@
+"""
+Sparse fieldsets (?fields=) on the todo and notification lists
+"""
+import json
+
+from backend.profiler import profile_queries
+from conftest import create_todo
+
+
+def test_todos_return_only_the_requested_fields(client, user):
+    create_todo(client, user_id=user['id'], title='a', description='long text', tags=['x'])
+
+    todos = client.get(f"/api/todos?user_id={user['id']}&fields=id,title,tags").get_json()
+
+    assert [set(todo) for todo in todos] == [{'id', 'title', 'tags'}]
+    assert todos[0]['title'] == 'a' and todos[0]['tags'] == ['x']
+
+
+def test_unrequested_columns_are_not_loaded(client, user):
+    create_todo(client, user_id=user['id'], description='long text')
+
+    with profile_queries() as profile:
+        client.get(f"/api/todos?user_id={user['id']}&fields=id,title")
+
+    selects = [shape for shape in profile.shapes if shape.startswith('SELECT') and 'FROM todos' in shape]
+    assert selects and not any('todos.description' in shape for shape in selects)
+    # No tags requested, so no query for them
+    assert not any('todo_tags' in shape for shape in profile.shapes)
+
+
+def test_fields_with_pagination_and_streaming(client, user):
+    for title in ('a', 'b', 'c'):
+        create_todo(client, user_id=user['id'], title=title)
+
+    page = client.get(f"/api/todos?user_id={user['id']}&fields=title&limit=2").get_json()
+    assert page['todos'] == [{'title': 'c'}, {'title': 'b'}]
+    rest = client.get(f"/api/todos?user_id={user['id']}&fields=title&limit=2&after={page['next_cursor']}")
+    assert rest.get_json()['todos'] == [{'title': 'a'}]
+
+    streamed = client.get(f"/api/todos?user_id={user['id']}&fields=id&format=ndjson").get_data(as_text=True)
+    assert all(set(json.loads(line)) == {'id'} for line in streamed.splitlines())
+
+
+def test_notifications_return_only_the_requested_fields(client, user):
+    create_todo(client, user_id=user['id'], title='a')
+
+    for query in ('', '&pending_only=true'):
+        notifications = client.get(
+            f"/api/notifications?user_id={user['id']}&fields=id,message{query}"
+        ).get_json()
+        assert notifications == [{'id': notifications[0]['id'], 'message': 'Todo created: a'}]
+
+
+def test_unknown_fields_are_rejected(client, user):
+    response = client.get(f"/api/todos?user_id={user['id']}&fields=id,password")
+    assert response.status_code == 400
+    assert 'password' in response.get_json()['error']
+
+    response = client.get(f"/api/notifications?user_id={user['id']}&fields=body")
+    assert response.status_code == 400
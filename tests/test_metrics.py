@@ -0,0 +1,62 @@
+"""
+Prometheus metrics at /metrics
+"""
+import os
+import subprocess
+import sys
+
+from backend.database import db
+from backend.metrics import MetricsRegistry
+from backend.models import EmailOutbox
+from conftest import create_todo
+
+
+def test_outbox_gauge_counts_only_undelivered_entries(app, client, user):
+    create_todo(client, user_id=user['id'])
+    create_todo(client, user_id=user['id'])
+    with app.app_context():
+        entry = EmailOutbox.query.first()
+        entry.status = 'sent'
+        db.session.commit()
+
+    body = client.get('/metrics').get_data(as_text=True)
+
+    assert 'email_outbox_entries{status="pending"} 1' in body
+    assert 'email_outbox_entries{status="sending"} 0' in body
+    assert 'status="sent"' not in body
+
+
+def _exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+def _requests_total(registry):
+    return registry._collect()[0][('http_requests_total', ())]
+
+
+def test_processes_sharing_a_pid_keep_separate_snapshots(tmp_path):
+    first = MetricsRegistry(str(tmp_path))
+    second = MetricsRegistry(str(tmp_path))
+    first.inc('http_requests_total', amount=2)
+    second.inc('http_requests_total', amount=3)
+
+    assert _requests_total(second) == 5
+
+
+def test_exited_processes_are_folded_into_a_running_total(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    registry.inc('http_requests_total', amount=1)
+    expected = 1
+    for amount in (2, 3):
+        exited = MetricsRegistry(str(tmp_path))
+        exited.pid = _exited_pid()
+        exited.inc('http_requests_total', amount=amount)
+        exited.flush()
+        expected += amount
+
+        assert _requests_total(registry) == expected
+
+    assert set(os.listdir(tmp_path)) == {'metrics-exited.json', 'metrics.lock', registry.filename}
+    assert _requests_total(registry) == expected
@@ -0,0 +1,137 @@
+"""
+Versioned migrations are recorded once and safe to re-run
+"""
+from sqlalchemy import create_engine
+
+from backend.database import db
+from backend.migrations import (
+    MIGRATIONS, add_notification_retention_index, add_query_indexes, make_notification_ids_monotonic,
+    make_notification_todo_optional, pending_migrations, run_migrations
+)
+
+# Tables as the baseline release created them, before any migration ran
+BASELINE_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, email VARCHAR(120) NOT NULL,
+        created_at DATETIME NOT NULL, email_notifications_enabled BOOLEAN NOT NULL,
+        browser_notifications_enabled BOOLEAN NOT NULL,
+        PRIMARY KEY (id), UNIQUE (username), UNIQUE (email)
+    )""",
+    """CREATE TABLE todos (
+        id INTEGER NOT NULL, title VARCHAR(200) NOT NULL, description TEXT,
+        completed BOOLEAN NOT NULL, priority VARCHAR(20) NOT NULL, due_date DATETIME,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, user_id INTEGER,
+        category VARCHAR(50), tags VARCHAR(200),
+        PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id)
+    )""",
+    """CREATE TABLE notifications (
+        id INTEGER NOT NULL, todo_id INTEGER NOT NULL, user_id INTEGER NOT NULL,
+        message VARCHAR(500) NOT NULL, type VARCHAR(50) NOT NULL, sent BOOLEAN NOT NULL,
+        sent_at DATETIME, created_at DATETIME NOT NULL,
+        PRIMARY KEY (id), FOREIGN KEY(todo_id) REFERENCES todos (id),
+        FOREIGN KEY(user_id) REFERENCES users (id)
+    )""",
+    """CREATE TABLE email_outbox (
+        id INTEGER NOT NULL, user_id INTEGER NOT NULL, status VARCHAR(20) NOT NULL,
+        next_attempt_at DATETIME NOT NULL, PRIMARY KEY (id)
+    )""",
+]
+
+
+def _baseline_engine():
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.execute(db.text(statement))
+    return engine
+
+
+def _schema(conn):
+    """Tables with their columns and indexes"""
+    inspector = db.inspect(conn)
+    return {
+        table: (
+            sorted((column['name'], column['nullable']) for column in inspector.get_columns(table)),
+            sorted((index['name'], tuple(index['column_names'])) for index in inspector.get_indexes(table)),
+        )
+        for table in inspector.get_table_names()
+    }
+
+
+def test_every_migration_is_recorded(app):
+    with app.app_context():
+        assert pending_migrations() == []
+        assert run_migrations() == []
+
+
+def test_versions_are_unique():
+    versions = [version for version, _, _ in MIGRATIONS]
+    assert len(versions) == len(set(versions))
+
+
+def test_rerunning_migrations_changes_nothing(app):
+    with app.app_context():
+        with db.engine.begin() as conn:
+            before = _schema(conn)
+            for _, _, func in sorted(MIGRATIONS, key=lambda m: m[0]):
+                func(conn)
+            assert _schema(conn) == before
+
+
+def test_query_indexes_on_a_baseline_database():
+    with _baseline_engine().begin() as conn:
+        add_query_indexes(conn)
+        indexes = _schema(conn)
+
+    assert indexes['todos'][1] == [
+        ('ix_todos_completed_due_date', ('completed', 'due_date')),
+        ('ix_todos_updated_at', ('updated_at',)),
+        ('ix_todos_user_completed_created', ('user_id', 'completed', 'created_at')),
+        ('ix_todos_user_created', ('user_id', 'created_at', 'id')),
+    ]
+    assert [name for name, _ in indexes['notifications'][1]] == [
+        'ix_notifications_user_created', 'ix_notifications_user_type_sent_created'
+    ]
+    assert len(indexes['email_outbox'][1]) == 2
+
+
+def test_notification_rebuild_on_a_baseline_database():
+    with _baseline_engine().begin() as conn:
+        conn.execute(db.text(
+            "INSERT INTO notifications (id, todo_id, user_id, message, type, sent, created_at) "
+            "VALUES (7, 1, 1, 'hi', 'browser', 0, '2024-01-01 00:00:00')"
+        ))
+        add_query_indexes(conn)
+        before = _schema(conn)['notifications']
+
+        make_notification_todo_optional(conn)
+        make_notification_todo_optional(conn)
+
+        columns, indexes = _schema(conn)['notifications']
+        assert ('todo_id', True) in columns
+        assert [name for name, _ in columns] == [name for name, _ in before[0]]
+        assert indexes == before[1]
+        assert conn.execute(db.text('SELECT id, message FROM notifications')).all() == [(7, 'hi')]
+
+
+def test_notification_ids_are_never_reused_after_the_rebuild():
+    with _baseline_engine().begin() as conn:
+        conn.execute(db.text(
+            "INSERT INTO notifications (id, todo_id, user_id, message, type, sent, created_at) "
+            "VALUES (7, 1, 1, 'hi', 'browser', 0, '2024-01-01 00:00:00')"
+        ))
+        add_query_indexes(conn)
+        make_notification_todo_optional(conn)
+        add_notification_retention_index(conn)
+        before = _schema(conn)['notifications']
+
+        make_notification_ids_monotonic(conn)
+        make_notification_ids_monotonic(conn)
+
+        assert _schema(conn)['notifications'] == before
+        conn.execute(db.text('DELETE FROM notifications'))
+        conn.execute(db.text(
+            "INSERT INTO notifications (user_id, message, type, sent, created_at) "
+            "VALUES (1, 'again', 'browser', 0, '2024-01-02 00:00:00')"
+        ))
+        assert conn.execute(db.text('SELECT id FROM notifications')).scalar() == 8
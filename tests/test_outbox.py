@@ -0,0 +1,111 @@
+"""
+Email outbox: queued with the todo change, claimed once, retried with backoff
+"""
+from datetime import datetime, timedelta
+
+from backend.database import db
+from backend.models import EmailOutbox, Notification, Todo
+from backend.services import outbox_worker
+from backend.services.email_service import EmailService
+from backend.services.outbox_worker import OutboxWorker, backoff_delay
+from conftest import create_todo
+
+
+def _outbox(app):
+    with app.app_context():
+        return [(entry.status, entry.attempts) for entry in EmailOutbox.query.order_by(EmailOutbox.id)]
+
+
+def test_todo_notification_and_email_commit_together(app, client, user, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('outbox unavailable')
+    monkeypatch.setattr(EmailService, 'send_todo_notification', fail)
+
+    response = client.post('/api/todos', json={'title': 'Todo', 'user_id': user['id']})
+
+    assert response.status_code == 500
+    with app.app_context():
+        assert Todo.query.count() == 0
+        assert Notification.query.count() == 0
+        assert EmailOutbox.query.count() == 0
+
+
+def test_claimed_entries_are_not_claimed_again(app, client, user):
+    create_todo(client, user_id=user['id'])
+    create_todo(client, user_id=user['id'])
+    worker = OutboxWorker(app)
+
+    with app.app_context():
+        assert len(worker.claim()) == 2
+        assert worker.claim() == []
+    assert _outbox(app) == [('sending', 0), ('sending', 0)]
+
+
+def test_expired_leases_and_due_entries_are_claimable(app, client, user):
+    create_todo(client, user_id=user['id'])
+    create_todo(client, user_id=user['id'])
+    worker = OutboxWorker(app)
+    with app.app_context():
+        first, second = [entry.id for entry in EmailOutbox.query.order_by(EmailOutbox.id)]
+        # A crashed worker's lease ran out; the other entry is not due yet
+        db.session.get(EmailOutbox, first).status = 'sending'
+        db.session.get(EmailOutbox, first).next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.get(EmailOutbox, second).next_attempt_at = datetime.utcnow() + timedelta(minutes=5)
+        db.session.commit()
+
+        assert worker.claim() == [first]
+
+
+def test_failed_delivery_is_retried_with_backoff(app, client, user, monkeypatch):
+    def fail(entries):
+        raise ConnectionError('smtp down')
+    monkeypatch.setattr(EmailService, 'deliver', fail)
+    create_todo(client, user_id=user['id'])
+    worker = OutboxWorker(app)
+
+    started = datetime.utcnow()
+    assert worker.drain_once() == 0
+
+    with app.app_context():
+        entry = EmailOutbox.query.one()
+        assert (entry.status, entry.attempts, entry.last_error) == ('pending', 1, 'smtp down')
+        assert entry.next_attempt_at >= started + backoff_delay(1)
+    # Not due again until the backoff has passed
+    assert worker.drain_once() == 0
+    assert _outbox(app) == [('pending', 1)]
+
+
+def test_delivery_gives_up_after_max_attempts(app, client, user, monkeypatch):
+    def fail(entries):
+        raise ConnectionError('smtp down')
+    monkeypatch.setattr(EmailService, 'deliver', fail)
+    create_todo(client, user_id=user['id'])
+    worker = OutboxWorker(app)
+
+    for _ in range(outbox_worker.MAX_ATTEMPTS):
+        with app.app_context():
+            EmailOutbox.query.update({'next_attempt_at': datetime.utcnow()})
+            db.session.commit()
+        worker.drain_once()
+
+    assert _outbox(app) == [('failed', outbox_worker.MAX_ATTEMPTS)]
+    with app.app_context():
+        assert Notification.query.filter_by(type='email', sent=False).count() == 1
+
+
+def test_delivered_entries_are_marked_sent(app, client, user, monkeypatch):
+    delivered = []
+    monkeypatch.setattr(EmailService, 'deliver', lambda entries: delivered.append([e.id for e in entries]))
+    create_todo(client, user_id=user['id'])
+    create_todo(client, user_id=user['id'])
+
+    assert OutboxWorker(app, workers=2).drain_once() == 2
+
+    assert len(delivered) == 2
+    assert _outbox(app) == [('sent', 1), ('sent', 1)]
+
+
+def test_backoff_doubles_up_to_the_maximum():
+    assert backoff_delay(1) == timedelta(seconds=outbox_worker.BACKOFF_BASE_SECONDS)
+    assert backoff_delay(3) == timedelta(seconds=outbox_worker.BACKOFF_BASE_SECONDS * 4)
+    assert backoff_delay(100) == timedelta(seconds=outbox_worker.BACKOFF_MAX_SECONDS)
@@ -0,0 +1,92 @@
+"""
+Keyset cursor pagination and streamed lists of GET /api/todos
+"""
+from datetime import datetime
+import json
+
+import pytest
+
+from backend.database import db
+from backend.models import Todo
+from backend.pagination import MAX_PAGE_SIZE, clamp_limit, decode_cursor, encode_cursor
+from conftest import create_todo
+
+
+def _walk(client, url, limit):
+    """Follow next_cursor from the first page to the last"""
+    ids, after, pages = [], None, 0
+    while True:
+        query = f'{url}&limit={limit}' + (f'&after={after}' if after else '')
+        body = client.get(query).get_json()
+        ids.extend(todo['id'] for todo in body['todos'])
+        pages += 1
+        after = body['next_cursor']
+        if after is None:
+            return ids, pages
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-a-cursor', 'WzFd'])
+def test_malformed_cursor_raises(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_limit_is_clamped():
+    assert clamp_limit(0) == 1
+    assert clamp_limit(MAX_PAGE_SIZE + 1) == MAX_PAGE_SIZE
+
+
+def test_pages_cover_every_todo_once_newest_first(client, user):
+    created = [create_todo(client, title=f'todo {i}', user_id=user['id'])['id'] for i in range(7)]
+
+    ids, pages = _walk(client, f"/api/todos?user_id={user['id']}", limit=3)
+
+    assert pages == 3
+    assert ids == list(reversed(created))
+
+
+def test_equal_timestamps_are_ordered_by_id(app, client, user):
+    same_time = datetime(2024, 1, 1)
+    with app.app_context():
+        db.session.add_all(Todo(title=f'tie {i}', user_id=user['id'], created_at=same_time) for i in range(5))
+        db.session.commit()
+        expected = [todo.id for todo in Todo.query.order_by(Todo.id.desc())]
+
+    ids, _ = _walk(client, f"/api/todos?user_id={user['id']}", limit=2)
+
+    assert ids == expected
+
+
+def test_rows_added_while_paging_do_not_shift_later_pages(client, user):
+    first = [create_todo(client, title=f'todo {i}', user_id=user['id'])['id'] for i in range(4)]
+    page = client.get(f"/api/todos?user_id={user['id']}&limit=2").get_json()
+
+    create_todo(client, title='newer', user_id=user['id'])
+    rest = client.get(f"/api/todos?user_id={user['id']}&limit=2&after={page['next_cursor']}").get_json()
+
+    assert [todo['id'] for todo in rest['todos']] == list(reversed(first))[2:]
+
+
+def test_invalid_cursor_is_a_bad_request(client, user):
+    response = client.get(f"/api/todos?user_id={user['id']}&after=garbage")
+    assert response.status_code == 400
+
+
+def test_streamed_list_matches_unstreamed(client, user):
+    for i in range(5):
+        create_todo(client, title=f'todo {i}', user_id=user['id'], tags=['a'])
+    expected = client.get(f"/api/todos?user_id={user['id']}").get_json()
+
+    # Read each streamed body before the next request
+    streamed = client.get(f"/api/todos?user_id={user['id']}&stream=true").get_data(as_text=True)
+    ndjson = client.get(f"/api/todos?user_id={user['id']}&format=ndjson")
+    assert ndjson.mimetype == 'application/x-ndjson'
+    lines = ndjson.get_data(as_text=True).splitlines()
+
+    assert json.loads(streamed) == expected
+    assert [json.loads(line) for line in lines] == expected
@@ -0,0 +1,70 @@
+"""
+In-process reminder scheduler: horizon window and retries
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.services.notification_service import NotificationService
+from backend.services.reminder_scheduler import HORIZON, ReminderScheduler, retry_delay
+from conftest import create_todo
+
+
+@pytest.fixture
+def scheduler(app):
+    """A started scheduler without its thread"""
+    scheduler = ReminderScheduler()
+    scheduler.app = app
+    scheduler.horizon_end = datetime.utcnow() + HORIZON
+    scheduler._running = True
+    return scheduler
+
+
+def _due_in(client, user, hours):
+    due_date = (datetime.utcnow() + timedelta(hours=hours)).replace(microsecond=0)
+    return create_todo(client, user_id=user['id'], due_date=due_date.isoformat())['id']
+
+
+def test_only_reminders_within_the_horizon_are_loaded(app, client, user, scheduler):
+    # Reminders fire 24 hours before the due date
+    inside = [_due_in(client, user, hours) for hours in (2, 24 + HORIZON.total_seconds() / 3600 - 1)]
+    later = _due_in(client, user, 24 + HORIZON.total_seconds() / 3600 + 6)
+
+    with app.app_context():
+        scheduler.rescan()
+    assert sorted(scheduler._scheduled) == inside
+
+    with app.app_context():
+        scheduler.refill(datetime.utcnow() + timedelta(hours=12))
+    assert sorted(scheduler._scheduled) == inside + [later]
+
+
+def test_changes_beyond_the_horizon_wait_for_a_refill(scheduler):
+    beyond = scheduler.horizon_end + timedelta(hours=25)
+    scheduler.schedule(1, beyond)
+    assert scheduler._scheduled == {}
+
+
+def test_failed_reminders_are_retried_with_backoff(app, client, user, scheduler, monkeypatch):
+    todo_id = _due_in(client, user, 2)
+    with app.app_context():
+        scheduler.rescan()
+    due = scheduler._pop_due(datetime.utcnow())
+    assert list(due) == [todo_id]
+
+    def fail(todo_ids=None):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(NotificationService, 'check_due_todos', fail)
+    for attempts in (1, 2):
+        started = datetime.utcnow()
+        scheduler.fire(due)
+        fire_at, _, _ = max(scheduler._heap)
+        assert started + retry_delay(attempts) <= fire_at <= datetime.utcnow() + retry_delay(attempts)
+        due = scheduler._pop_due(fire_at)
+        assert list(due) == [todo_id]
+
+    monkeypatch.undo()
+    scheduler.fire(due)
+    assert scheduler._failures == {}
+    assert not scheduler._pop_due(datetime.utcnow() + timedelta(days=1))
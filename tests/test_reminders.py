@@ -0,0 +1,74 @@
+"""
+Due-soon reminders: sent once per todo and due date, in chunks
+"""
+from datetime import datetime, timedelta
+
+from backend.models import EmailOutbox, ReminderLedger
+from backend.profiler import profile_queries
+from backend.services.notification_service import NotificationService
+from conftest import create_todo
+
+
+def _due_in(hours):
+    return (datetime.utcnow() + timedelta(hours=hours)).isoformat()
+
+
+def _reminder_emails(app):
+    """Subjects of the queued reminder emails, oldest first"""
+    with app.app_context():
+        entries = EmailOutbox.query.filter_by(notification_type='due_soon').order_by(EmailOutbox.id)
+        return [entry.subject for entry in entries]
+
+
+def _check(app, **kwargs):
+    with app.app_context():
+        return NotificationService.check_due_todos(**kwargs)
+
+
+def test_only_pending_todos_due_soon_are_reminded(app, client, user):
+    due = create_todo(client, user_id=user['id'], title='due', due_date=_due_in(2))
+    create_todo(client, user_id=user['id'], title='later', due_date=_due_in(48))
+    create_todo(client, user_id=user['id'], title='overdue', due_date=_due_in(-2))
+    done = create_todo(client, user_id=user['id'], title='done', due_date=_due_in(2))
+    client.post(f"/api/todos/{done['id']}/complete")
+
+    assert _check(app) == [due['id']]
+    assert _reminder_emails(app) == ['Reminder: Todo "due" is due soon!']
+
+
+def test_the_ledger_prevents_repeat_reminders(app, client, user):
+    todo = create_todo(client, user_id=user['id'], due_date=_due_in(2))
+
+    assert _check(app) == [todo['id']]
+    assert _check(app) == []
+    assert len(_reminder_emails(app)) == 1
+
+    # Rescheduling makes the todo eligible again
+    client.put(f"/api/todos/{todo['id']}", json={'due_date': _due_in(3)})
+    assert _check(app) == [todo['id']]
+    with app.app_context():
+        assert ReminderLedger.query.filter_by(todo_id=todo['id']).count() == 2
+
+
+def test_reminders_are_sent_in_chunks_with_one_email_per_user(app, client, user):
+    ids = [create_todo(client, user_id=user['id'], title=f't{i}', due_date=_due_in(2))['id'] for i in range(5)]
+
+    assert _check(app, chunk_size=2) == ids
+    assert _reminder_emails(app) == [
+        'Reminder: 2 Todo(s) Due Soon',
+        'Reminder: 2 Todo(s) Due Soon',
+        'Reminder: Todo "t4" is due soon!',
+    ]
+
+
+def test_queries_do_not_grow_with_the_chunk(app, client, user):
+    create_todo(client, user_id=user['id'], due_date=_due_in(2))
+    with app.app_context(), profile_queries() as few:
+        NotificationService.check_due_todos()
+
+    for _ in range(10):
+        create_todo(client, user_id=user['id'], due_date=_due_in(2))
+    with app.app_context(), profile_queries() as many:
+        NotificationService.check_due_todos()
+
+    assert many.count == few.count
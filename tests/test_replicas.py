@@ -0,0 +1,139 @@
+"""
+Routing GET reads to a read replica
+"""
+import hashlib
+import sqlite3
+
+from flask import Flask
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from backend import replicas
+from backend.database import db
+from backend.engine import engine_options
+from backend.migrations import run_migrations
+from backend.models import User
+from backend.replicas import ReplicaRouter, register_replica_routing, replica_binds
+from backend.routes.notification_routes import notification_bp
+from backend.routes.todo_routes import todo_bp
+from backend.routes.user_routes import user_bp
+from backend.services.search_service import SearchService
+
+
+def _rename_first_user():
+    """A GET view that wrongly writes what it read"""
+    user = User.query.first()
+    user.username = 'renamed'
+    db.session.commit()
+    return 'ok'
+
+
+def _create_app(primary, replica):
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{primary}',
+        SQLALCHEMY_ENGINE_OPTIONS=engine_options(f'sqlite:///{primary}'),
+        SQLALCHEMY_BINDS=replica_binds(f'sqlite:///{replica}', lambda url: engine_options(url, read_only=True)),
+    )
+    db.init_app(app)
+    register_replica_routing(app)
+    app.register_blueprint(todo_bp, url_prefix='/api/todos')
+    app.register_blueprint(notification_bp, url_prefix='/api/notifications')
+    app.register_blueprint(user_bp, url_prefix='/api/users')
+    app.add_url_rule('/rename', view_func=_rename_first_user)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        run_migrations()
+        SearchService.setup()
+    return app
+
+
+def _digest(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    """App with a replica holding a copy of the primary's user and todo"""
+    monkeypatch.setattr(replicas, 'replica_router', ReplicaRouter())
+    primary, replica = tmp_path / 'primary.db', tmp_path / 'replica.db'
+    app = _create_app(primary, replica)
+
+    seed = app.test_client()
+    user = seed.post('/api/users', json={'username': 'alice', 'email': 'alice@example.com'}).get_json()
+    seed.post('/api/todos', json={'title': 'Todo', 'user_id': user['id'], 'due_date': '2020-01-01T00:00:00'})
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+        # Replicas keep whatever journal mode their writer uses
+        target.execute('PRAGMA journal_mode=DELETE')
+
+    app.replica_path = replica
+    app.user_id = user['id']
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def test_get_reads_from_the_replica(replica_app):
+    client = replica_app.test_client()
+
+    response = client.get(f'/api/todos?user_id={replica_app.user_id}')
+
+    assert response.headers['X-DB-Route'] == 'replica_0'
+    assert len(response.get_json()) == 1
+
+
+def test_consistent_reads_and_writes_use_the_primary(replica_app):
+    client = replica_app.test_client()
+    url = f'/api/todos?user_id={replica_app.user_id}'
+
+    assert client.get(url, headers={'X-Consistent-Read': '1'}).headers['X-DB-Route'] == 'primary'
+
+    response = client.post('/api/todos', json={'title': 'New', 'user_id': replica_app.user_id})
+    assert response.headers['X-DB-Route'] == 'primary'
+    # The client now carries the sticky cookie and sees its own write
+    response = client.get(url)
+    assert response.headers['X-DB-Route'] == 'primary'
+    assert len(response.get_json()) == 2
+
+
+def test_unhealthy_replica_falls_back_to_the_primary(replica_app):
+    replica_app.replica_path.unlink()
+    replica_app.replica_path.mkdir()  # Opening a directory as a database fails
+
+    response = replica_app.test_client().get(f'/api/todos?user_id={replica_app.user_id}')
+
+    assert response.status_code == 200
+    assert response.headers['X-DB-Route'] == 'primary'
+
+
+def test_gets_never_write_to_the_replica(replica_app):
+    client = replica_app.test_client()
+    before = _digest(replica_app.replica_path)
+    user_id = replica_app.user_id
+
+    for url in (
+        f'/api/todos?user_id={user_id}', '/api/todos/1', f'/api/todos/stats?user_id={user_id}',
+        f'/api/users/{user_id}', f'/api/users/{user_id}/dashboard',
+        f'/api/notifications?user_id={user_id}', f'/api/notifications/unread-count?user_id={user_id}',
+    ):
+        response = client.get(url)
+        assert response.status_code == 200, url
+        assert response.headers['X-DB-Route'] == 'replica_0', url
+
+    assert _digest(replica_app.replica_path) == before
+
+
+def test_replica_connections_are_read_only(replica_app):
+    with replica_app.app_context():
+        with db.engines['replica_0'].connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.exec_driver_sql("UPDATE users SET username = 'mallory'")
+
+
+def test_get_that_writes_after_a_replica_read_is_an_error(replica_app):
+    with pytest.raises(RuntimeError, match='wrote after reading from replica replica_0'):
+        replica_app.test_client().get('/rename')
@@ -0,0 +1,65 @@
+"""
+Retention pruning of sent notifications into notifications_archive
+"""
+from datetime import datetime
+
+from backend.database import db
+from backend.models import Notification, NotificationArchive
+from backend.services.retention_service import RetentionService
+from conftest import create_todo
+
+
+def _age_all_notifications(app):
+    """Mark every notification as sent and past the retention window"""
+    with app.app_context():
+        Notification.query.update({'sent': True, 'created_at': datetime(2020, 1, 1)})
+        db.session.commit()
+
+
+def _prune(app):
+    with app.app_context():
+        return RetentionService.prune(retention_days=30, max_per_user=0)
+
+
+def test_every_pruned_notification_is_archived(app, client, user):
+    create_todo(client, user_id=user['id'], title='kept')
+    doomed = create_todo(client, user_id=user['id'])
+    _age_all_notifications(app)
+    first = _prune(app)['expired']
+    assert first > 0
+
+    # The todo delete removes the newest notifications; their ids must not
+    # be handed out again and clash with the archived rows
+    client.delete(f"/api/todos/{doomed['id']}")
+    create_todo(client, user_id=user['id'])
+    _age_all_notifications(app)
+    with app.app_context():
+        archived_ids = {row.id for row in NotificationArchive.query}
+        live_ids = {row.id for row in Notification.query}
+        assert not archived_ids & live_ids
+        assert min(live_ids) > max(archived_ids)
+
+    second = _prune(app)['expired']
+
+    with app.app_context():
+        assert Notification.query.count() == 0
+        assert NotificationArchive.query.count() == first + second
+        assert {row.id for row in NotificationArchive.query} == archived_ids | live_ids
+
+
+def test_old_unsent_notifications_are_pruned_with_their_unread_count(app, client, user):
+    create_todo(client, user_id=user['id'])
+    create_todo(client, user_id=user['id'])
+    with app.app_context():
+        Notification.query.update({'created_at': datetime(2020, 1, 1)})
+        db.session.commit()
+    unread = client.get(f"/api/notifications/unread-count?user_id={user['id']}").get_json()['unread']
+
+    with app.app_context():
+        assert RetentionService.prune(unsent_retention_days=0)['expired_unsent'] == 0
+        result = RetentionService.prune(retention_days=30, unsent_retention_days=180)
+
+    assert result['expired'] == 0
+    assert result['expired_unsent'] > 0
+    response = client.get(f"/api/notifications/unread-count?user_id={user['id']}").get_json()
+    assert response['unread'] == 0
@@ -0,0 +1,62 @@
+"""
+Full-text search over todo titles and descriptions
+"""
+from flask import current_app
+
+from backend.database import db
+from conftest import create_todo
+
+
+def _search(client, user, search):
+    todos = client.get(f"/api/todos?user_id={user['id']}&search={search}").get_json()
+    return [todo['title'] for todo in todos]
+
+
+def _indexed(app, word):
+    """Todo ids the FTS index returns for a word, bypassing the todos table"""
+    with app.app_context():
+        rows = db.session.execute(
+            db.text('SELECT rowid FROM todos_fts WHERE todos_fts MATCH :word'), {'word': word}
+        )
+        return [rowid for (rowid,) in rows]
+
+
+def test_search_uses_fts5(app):
+    with app.app_context():
+        assert current_app.extensions['search_backend'] == 'fts5'
+
+
+def test_every_word_matches_as_a_prefix(client, user):
+    create_todo(client, user_id=user['id'], title='Buy groceries', description='milk and bread')
+    create_todo(client, user_id=user['id'], title='Book flights')
+
+    assert _search(client, user, 'groc') == ['Buy groceries']
+    assert _search(client, user, 'bu+mil') == ['Buy groceries']
+    assert _search(client, user, 'bu+flight') == []
+    assert sorted(_search(client, user, 'B')) == ['Book flights', 'Buy groceries']
+
+
+def test_results_are_ordered_by_relevance(client, user):
+    create_todo(client, user_id=user['id'], title='Milk', description='milk, oat milk')
+    create_todo(client, user_id=user['id'], title='Errands', description='post office, bank, pharmacy, milk')
+
+    assert _search(client, user, 'milk') == ['Milk', 'Errands']
+
+
+def test_punctuation_is_not_query_syntax(client, user):
+    create_todo(client, user_id=user['id'], title='Fix "quoted" bug')
+
+    assert _search(client, user, '%22quoted') == ['Fix "quoted" bug']
+    assert _search(client, user, 'bug%20AND%20OR%20NOT*') == []
+
+
+def test_index_follows_inserts_updates_and_deletes(app, client, user):
+    todo = create_todo(client, user_id=user['id'], title='Paint fence')
+    assert _indexed(app, 'fence') == [todo['id']]
+
+    client.put(f"/api/todos/{todo['id']}", json={'title': 'Paint shed', 'description': 'green'})
+    assert _indexed(app, 'fence') == []
+    assert _indexed(app, 'shed') == _indexed(app, 'green') == [todo['id']]
+
+    client.delete(f"/api/todos/{todo['id']}")
+    assert _indexed(app, 'shed') == []
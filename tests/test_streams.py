@@ -0,0 +1,175 @@
+"""
+Server-Sent Event notification streams under the WSGI and ASGI servers
+"""
+import asyncio
+from datetime import timedelta
+import json
+import threading
+
+import pytest
+
+from backend import asgi
+from backend.asgi import AsgiApp
+from backend.database import db
+from backend.models import Notification
+from backend.routes import notification_routes
+from backend.routes.notification_routes import _live_event
+from backend.services import notification_service
+from conftest import create_todo
+
+
+@pytest.fixture
+def coalescing(monkeypatch):
+    """Rewrite the unread notification of a todo edited within a minute"""
+    monkeypatch.setattr(notification_service, 'COALESCE_WINDOW', timedelta(minutes=1))
+
+
+@pytest.fixture
+def fast_polling(monkeypatch):
+    """Check the database for other processes' notifications every 0.1s"""
+    monkeypatch.setattr(notification_routes, 'STREAM_KEEPALIVE_SECONDS', 0.1)
+    monkeypatch.setattr(asgi, 'STREAM_KEEPALIVE_SECONDS', 0.1)
+
+
+def _events(chunks):
+    """(id or None, data) for each event in the streamed chunks"""
+    events = []
+    for chunk in chunks:
+        fields = dict(line.split(': ', 1) for line in chunk.splitlines() if line and not line.startswith(':'))
+        if 'data' in fields:
+            events.append((fields.get('id'), json.loads(fields['data'])))
+    return events
+
+
+def _edit_todo_twice(client, user):
+    todo = create_todo(client, user_id=user['id'], title='draft')
+    client.put(f"/api/todos/{todo['id']}", json={'title': 'final'})
+
+
+def _assert_coalesced(events):
+    (first_id, first), (second_id, second) = events
+    assert first['id'] == second['id']
+    assert first_id == str(first['id']) and second_id is None
+    assert (first['message'], second['message']) == ('Todo created: draft', 'Todo updated: final')
+
+
+def _notify_from_another_process(app, user):
+    """Commit a notification without publishing it to this process's broker"""
+    with app.app_context():
+        db.session.add(Notification(user_id=user['id'], message='Elsewhere', type='browser', sent=False))
+        db.session.commit()
+
+
+def test_replayed_notifications_are_not_sent_twice():
+    notification = {'id': 3, 'message': 'Todo created: a'}
+    replayed = {3: dict(notification)}
+
+    assert _live_event(notification, replayed, last_id=3) is None
+    assert _live_event(notification, replayed, last_id=3) is not None
+
+
+def test_coalesced_update_reaches_an_open_stream(app, client, user, coalescing):
+    subscribed, chunks = threading.Event(), []
+
+    def read_stream():
+        response = app.test_client().get(f"/api/notifications/stream?user_id={user['id']}", buffered=False)
+        for chunk in response.response:
+            chunks.append(chunk.decode() if isinstance(chunk, bytes) else chunk)
+            subscribed.set()
+            if len(_events(chunks)) == 2:
+                break
+        response.close()
+
+    reader = threading.Thread(target=read_stream, daemon=True)
+    reader.start()
+    assert subscribed.wait(5)
+    _edit_todo_twice(client, user)
+    reader.join(5)
+
+    assert not reader.is_alive()
+    _assert_coalesced(_events(chunks))
+
+
+def test_coalesced_update_reaches_an_open_asgi_stream(app, client, user, coalescing):
+    async def scenario():
+        messages, disconnected = asyncio.Queue(), asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/api/notifications/stream',
+            'query_string': f"user_id={user['id']}".encode(), 'headers': [],
+        }
+        stream = asyncio.ensure_future(AsgiApp(app).stream_notifications(scope, receive, messages.put))
+        chunks = []
+        while not chunks:
+            message = await asyncio.wait_for(messages.get(), 5)
+            if message['type'] == 'http.response.body':
+                chunks.append(message['body'].decode())
+
+        await asyncio.get_running_loop().run_in_executor(None, _edit_todo_twice, client, user)
+        while len(_events(chunks)) < 2:
+            chunks.append((await asyncio.wait_for(messages.get(), 5))['body'].decode())
+        disconnected.set()
+        await asyncio.wait_for(stream, 5)
+        return chunks
+
+    _assert_coalesced(_events(asyncio.run(scenario())))
+
+
+def test_open_stream_receives_notifications_from_other_processes(app, client, user, fast_polling):
+    create_todo(client, user_id=user['id'], title='before')
+    subscribed, chunks = threading.Event(), []
+
+    def read_stream():
+        response = app.test_client().get(f"/api/notifications/stream?user_id={user['id']}", buffered=False)
+        for chunk in response.response:
+            chunks.append(chunk.decode() if isinstance(chunk, bytes) else chunk)
+            subscribed.set()
+            if _events(chunks):
+                break
+        response.close()
+
+    reader = threading.Thread(target=read_stream, daemon=True)
+    reader.start()
+    assert subscribed.wait(5)
+    _notify_from_another_process(app, user)
+    reader.join(5)
+
+    assert not reader.is_alive()
+    [(event_id, notification)] = _events(chunks)
+    assert notification['message'] == 'Elsewhere' and event_id == str(notification['id'])
+
+
+def test_open_asgi_stream_receives_notifications_from_other_processes(app, client, user, fast_polling):
+    create_todo(client, user_id=user['id'], title='before')
+
+    async def scenario():
+        messages, disconnected = asyncio.Queue(), asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/api/notifications/stream',
+            'query_string': f"user_id={user['id']}".encode(), 'headers': [],
+        }
+        stream = asyncio.ensure_future(AsgiApp(app).stream_notifications(scope, receive, messages.put))
+        chunks = []
+        while not chunks:
+            message = await asyncio.wait_for(messages.get(), 5)
+            if message['type'] == 'http.response.body':
+                chunks.append(message['body'].decode())
+
+        await asyncio.get_running_loop().run_in_executor(None, _notify_from_another_process, app, user)
+        while not _events(chunks):
+            chunks.append((await asyncio.wait_for(messages.get(), 5))['body'].decode())
+        disconnected.set()
+        await asyncio.wait_for(stream, 5)
+        return chunks
+
+    [(event_id, notification)] = _events(asyncio.run(scenario()))
+    assert notification['message'] == 'Elsewhere' and event_id == str(notification['id'])
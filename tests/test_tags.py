@@ -0,0 +1,30 @@
+"""
+Normalized tags: ordering and concurrent creation
+"""
+from backend.database import dialect_insert
+from backend.models import Tag
+from backend.services import tag_service
+from conftest import create_todo
+
+
+def test_tags_are_returned_in_alphabetical_order(client, user):
+    todo = create_todo(client, user_id=user['id'], tags=['work', 'urgent', 'home'])
+
+    assert todo['tags'] == ['home', 'urgent', 'work']
+    assert client.get(f"/api/todos/{todo['id']}").get_json()['tags'] == todo['tags']
+    listed = client.get(f"/api/todos?user_id={user['id']}&fields=id,tags").get_json()
+    assert listed[0]['tags'] == todo['tags']
+
+
+def test_tag_created_concurrently_is_reused(app, client, user, monkeypatch):
+    def insert_after_rival(conn, table):
+        # Another request creates the tag after our lookup missed it
+        conn.execute(table.insert().values(name='urgent'))
+        return dialect_insert(conn, table)
+
+    monkeypatch.setattr(tag_service, 'dialect_insert', insert_after_rival)
+    todo = create_todo(client, user_id=user['id'], tags=['urgent', 'new'])
+
+    assert todo['tags'] == ['new', 'urgent']
+    with app.app_context():
+        assert sorted(tag.name for tag in Tag.query) == ['new', 'urgent']
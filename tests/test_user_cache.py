@@ -0,0 +1,61 @@
+"""
+In-process user cache used by the notification write paths
+"""
+from backend.database import db
+from backend.models import EmailOutbox, User
+from backend.services.user_cache import UserCache, user_cache
+from conftest import create_todo
+
+
+def test_repeated_lookups_are_cache_hits(app, client, user):
+    create_todo(client, user_id=user['id'])
+    hits, misses = user_cache.hits, user_cache.misses
+
+    create_todo(client, user_id=user['id'])
+    create_todo(client, user_id=user['id'])
+
+    assert (user_cache.hits - hits, user_cache.misses - misses) == (2, 0)
+
+
+def test_user_updates_invalidate_the_cache(app, client, user):
+    create_todo(client, user_id=user['id'])
+    client.put(f"/api/users/{user['id']}", json={'email_notifications_enabled': False})
+
+    create_todo(client, user_id=user['id'])
+
+    with app.app_context():
+        assert EmailOutbox.query.count() == 1
+
+
+def test_changes_by_other_processes_clear_the_cache(app, user):
+    cache = UserCache(version_check_interval=0)
+    with app.app_context():
+        assert cache.get(user['id']).email == 'alice@example.com'
+
+        # Another process updates the user; its flush bumps the 'users' counter
+        db.session.get(User, user['id']).email = 'alice@example.org'
+        db.session.commit()
+
+        assert cache.get(user['id']).email == 'alice@example.org'
+        assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_entries_expire_and_the_oldest_is_evicted(app, client):
+    ids = [
+        client.post('/api/users', json={'username': name, 'email': f'{name}@example.com'}).get_json()['id']
+        for name in ('a', 'b', 'c')
+    ]
+    with app.app_context():
+        cache = UserCache(maxsize=2)
+        for user_id in ids:
+            cache.get(user_id)
+        cache.get(ids[2])
+        cache.get(ids[0])
+        assert (cache.hits, cache.misses) == (1, 4)
+
+        expired = UserCache(ttl=0)
+        expired.get(ids[0])
+        expired.get(ids[0])
+        assert (expired.hits, expired.misses) == (0, 2)
+
+        assert cache.get(999) is None